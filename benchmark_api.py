@@ -0,0 +1,370 @@
+"""
+BENCHMARK DE LA API REST
+========================
+Mide endpoints de VistaRESTSimple con el cliente de pruebas de Flask
+(sin levantar el servidor) a medida que crece la tabla de pedidos.
+Ejecutar: python benchmark_api.py
+"""
+
+import http.client
+import io
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+import tracemalloc
+from contextlib import redirect_stdout
+
+from modelo.pedido import estandar
+from controlador.metricas import RegistroMetricas
+
+
+def crear_vista(pedidos, usuarios=100):
+    """VistaRESTSimple con `pedidos` pedidos registrados en bd"""
+    from vista.vista_rest_simple import crear_vista_rest_simple
+    with redirect_stdout(io.StringIO()):
+        vista = crear_vista_rest_simple()
+        datos = vista.bd_instance
+        datos.__init__()
+        for i in range(usuarios):
+            datos.nuevoUsuario(f"Usuario {i}", "Calle 123", "nuevo")
+        estados = ("pendiente", "pagado", "enviado", "cancelado")
+        for id_pedido in range(1, pedidos + 1):
+            datos.agregarPedido(estandar(id_pedido % usuarios + 1, "Calle 123", id_pedido,
+                                         estados[id_pedido % 4], [], None, None))
+    return vista
+
+
+def medir(cliente, url, repeticiones=20):
+    """(ms promedio, KB pico de memoria) de un GET"""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        respuesta = cliente.get(url)
+        assert respuesta.status_code == 200, respuesta.get_json()
+    duracion = (time.perf_counter() - inicio) / repeticiones
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duracion * 1000, pico / 1024
+
+
+def benchmark_paginacion(tamanos=(10_000, 100_000, 500_000)):
+    """GET /api/pedidos paginado: el costo no depende del tamaño de la tabla"""
+    print("\n📄 PAGINACIÓN DE /api/pedidos (página de 50)")
+    print("=" * 60)
+    consultas = {
+        'primera página': '/api/pedidos',
+        'página profunda': '/api/pedidos?cursor={profundo}',
+        'por usuario': '/api/pedidos?idUsuario=7&cursor={profundo}',
+        'por estado': '/api/pedidos?estado=pagado&fields=idPedido,estado',
+        'estado sin pedidos': '/api/pedidos?estado=entregado',
+        'rango de fechas': '/api/pedidos?desde=0&fields=idPedido'
+    }
+    for tamano in tamanos:
+        cliente = crear_vista(tamano).app.test_client()
+        print(f"   📦 {tamano:,} pedidos")
+        for nombre, url in consultas.items():
+            ms, kb = medir(cliente, url.format(profundo=tamano - 1000))
+            print(f"      {nombre:18}: {ms:7.2f} ms  pico {kb:8.1f} KB")
+
+
+def verificar_indice_estado(pedidos=10_000):
+    """El filtro por estado sigue los cambios de estado de los pedidos ya registrados"""
+    print("\n🔎 ÍNDICE POR ESTADO")
+    print("=" * 60)
+    vista = crear_vista(pedidos)
+    datos = vista.bd_instance
+    cliente = vista.app.test_client()
+    entregados = [datos.listaPedidos[id_pedido] for id_pedido in range(4, pedidos + 1, 997)]
+    for pedido in entregados:
+        pedido.setestado("entregado")
+    # Volver al estado original no debe duplicar la posición en el índice
+    entregados[0].setestado("pagado")
+    entregados[0].setestado("entregado")
+    ids = [p['idPedido'] for p in cliente.get('/api/pedidos?estado=entregado&limite=500').get_json()['pedidos']]
+    assert ids == [pedido.idPedido for pedido in entregados], ids
+    ids = [p['idPedido'] for p in cliente.get('/api/pedidos?estado=cancelado&limite=500').get_json()['pedidos']]
+    assert all(id_pedido % 4 == 3 for id_pedido in ids) and entregados[1].idPedido not in ids
+    pagina, _ = datos.paginarPedidos(estado="entregado", idUsuario=entregados[0].idUsuario)
+    assert entregados[0] in pagina and all(p.estado == "entregado" for p in pagina)
+    print(f"   ✅ {len(entregados)} pedidos movidos a 'entregado' aparecen solo en su estado")
+
+
+def benchmark_exportacion(tamanos=(10_000, 100_000, 500_000)):
+    """Export NDJSON en streaming: la memoria pico no crece con las filas"""
+    print("\n📤 EXPORTACIÓN NDJSON (/api/export/pedidos.ndjson)")
+    print("=" * 60)
+    for tamano in tamanos:
+        cliente = crear_vista(tamano).app.test_client()
+        for gzip in (False, True):
+            url = f"/api/export/pedidos.ndjson?gzip={int(gzip)}"
+            inicio = time.perf_counter()
+            enviados, lineas = exportar(cliente, url, gzip)
+            duracion = time.perf_counter() - inicio
+            assert lineas == tamano, f"Se exportaron {lineas} de {tamano} pedidos"
+            # Segunda pasada solo para medir memoria (tracemalloc hace todo más lento)
+            tracemalloc.start()
+            exportar(cliente, url, gzip)
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"   📦 {tamano:>9,} pedidos {'gzip ' if gzip else 'plano'}: {duracion:6.2f} s "
+                  f"({tamano / duracion:9,.0f} filas/s)  {enviados / 1e6:7.1f} MB enviados  "
+                  f"pico {pico / 1024:8.1f} KB")
+
+
+def exportar(cliente, url, gzip):
+    """Consume la respuesta bloque a bloque; retorna (bytes enviados, líneas)"""
+    respuesta = cliente.get(url, buffered=False)
+    descompresor = zlib.decompressobj(31) if gzip else None
+    enviados = lineas = 0
+    for bloque in respuesta.response:
+        enviados += len(bloque)
+        lineas += (descompresor.decompress(bloque) if gzip else bloque).count(b"\n")
+    respuesta.close()
+    return enviados, lineas
+
+
+def benchmark_creacion_lote(pedidos=5000, usuarios=100):
+    """N solicitudes POST /api/pedidos vs una POST /api/pedidos/lote con N pedidos"""
+    print(f"\n📥 CREACIÓN EN LOTE ({pedidos:,} pedidos)")
+    print("=" * 60)
+    items = [
+        {'idUsuario': i % usuarios + 1, 'direccion': "Calle 123", 'productos': ["celulares", "audifonos"]}
+        for i in range(pedidos)
+    ]
+
+    cliente = crear_vista(0, usuarios).app.test_client()
+    with redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        for item in items:
+            assert cliente.post('/api/pedidos', json=item).status_code == 201
+        individual = time.perf_counter() - inicio
+
+    vista = crear_vista(0, usuarios)
+    cliente = vista.app.test_client()
+    inicio = time.perf_counter()
+    respuesta = cliente.post('/api/pedidos/lote', json={'pedidos': items})
+    lote = time.perf_counter() - inicio
+    cuerpo = respuesta.get_json()
+    assert respuesta.status_code == 201 and cuerpo['creados'] == pedidos, cuerpo.get('error')
+    assert len(vista.bd_instance.listaPedidos) == pedidos
+
+    print(f"   🐢 POST /api/pedidos x{pedidos:,}: {individual:7.2f} s ({pedidos / individual:9,.0f} pedidos/s)")
+    print(f"   🚀 POST /api/pedidos/lote:     {lote:7.2f} s ({pedidos / lote:9,.0f} pedidos/s)")
+    print(f"   📈 Mejora: {individual / lote:.1f}x")
+    return individual, lote
+
+
+def benchmark_metricas(incrementos=1_000_000, hilos=4, tamanos=(10_000, 500_000)):
+    """Costo de incrementar un contador y de renderizar /metrics según el tamaño de la tabla"""
+    print("\n📊 MÉTRICAS (/metrics)")
+    print("=" * 60)
+    registro = RegistroMetricas()
+    contador = registro.contador("prueba_total", "Contador de prueba", ("resultado",)).con("ok")
+    histograma = registro.histograma("prueba_segundos", "Histograma de prueba").con()
+    for nombre, operacion in (("Contador.inc", contador.inc),
+                              ("HistogramaBuckets.observar", lambda: histograma.observar(0.003))):
+        inicio = time.perf_counter_ns()
+        for _ in range(incrementos):
+            operacion()
+        print(f"   ⚡ {nombre:27}: {(time.perf_counter_ns() - inicio) / incrementos:6.0f} ns")
+
+    # Varios hilos sobre el mismo contador: cada uno suma en su celda y no se pierde nada
+    compartido = registro.contador("hilos_total", "Contador compartido").con()
+
+    def sumar():
+        for _ in range(incrementos // hilos):
+            compartido.inc()
+
+    trabajadores = [threading.Thread(target=sumar) for _ in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    print(f"   🧵 {hilos} hilos: {compartido.valor():,} incrementos contados de {incrementos // hilos * hilos:,}")
+    assert compartido.valor() == incrementos // hilos * hilos
+
+    # Un hilo por solicitud, como el servidor threaded: las celdas de los hilos
+    # terminados se juntan en la base y renderizar no crece con las solicitudes
+    efimero = registro.contador("efimeros_total", "Un hilo por incremento").con()
+    for solicitudes in (1000, 10_000):
+        for _ in range(solicitudes):
+            hilo = threading.Thread(target=efimero.inc)
+            hilo.start()
+            hilo.join()
+        inicio = time.perf_counter()
+        registro.renderizar()
+        print(f"   🔁 {efimero.valor():,} hilos efímeros: renderizar en "
+              f"{(time.perf_counter() - inicio) * 1e6:.0f} µs ({len(efimero._celdas.todas())} celdas)")
+
+    for tamano in tamanos:
+        cliente = crear_vista(tamano).app.test_client()
+        with redirect_stdout(io.StringIO()):
+            for _ in range(200):
+                cliente.get('/api/pedidos?limite=10')
+                cliente.get('/api/usuarios')
+        ms, _ = medir(cliente, '/metrics', repeticiones=200)
+        cuerpo = cliente.get('/metrics').get_data(as_text=True)
+        series = sum(1 for linea in cuerpo.splitlines() if linea and not linea.startswith("#"))
+        print(f"   📦 {tamano:,} pedidos: /metrics en {ms:.2f} ms ({series} series)")
+    for linea in cuerpo.splitlines():
+        if linea.startswith(("uvshop_proxy", "uvshop_pagos", "process_resident", "uvshop_http_solicitudes")):
+            print(f"      {linea}")
+
+
+def benchmark_perfilado(solicitudes=2000, pedidos=10_000):
+    """Costo por solicitud del perfilado: apagado, solo endpoint, muestreo 1/100 y 1/1"""
+    print(f"\n🔬 PERFILADO ({solicitudes:,} GET /api/pedidos?limite=10)")
+    print("=" * 60)
+    modos = {
+        'apagado': {},
+        'solo /debug/profile': {'UVSHOP_PERFIL_DEBUG': '1'},
+        'muestreo 1/100': {'UVSHOP_PERFIL_CADA': '100'},
+        'muestreo 1/1': {'UVSHOP_PERFIL_CADA': '1'}
+    }
+    anteriores = {nombre: os.environ.pop(nombre, None) for nombre in ('UVSHOP_PERFIL_CADA', 'UVSHOP_PERFIL_DEBUG')}
+    tiempos = {}
+    try:
+        for modo, entorno in modos.items():
+            os.environ.update(entorno)
+            vista = crear_vista(pedidos)
+            for nombre in entorno:
+                del os.environ[nombre]
+            cliente = vista.app.test_client()
+            cliente.get('/api/pedidos?limite=10')
+            inicio = time.perf_counter()
+            for _ in range(solicitudes):
+                cliente.get('/api/pedidos?limite=10')
+            tiempos[modo] = (time.perf_counter() - inicio) / solicitudes * 1e6
+            extra = tiempos[modo] - tiempos['apagado']
+            print(f"   {modo:20}: {tiempos[modo]:7.1f} µs por solicitud ({extra:+6.1f} µs)")
+    finally:
+        for nombre, valor in anteriores.items():
+            if valor is not None:
+                os.environ[nombre] = valor
+    return tiempos
+
+
+def _cargar_servidor(port, segundos, url, resultados):
+    """Proceso cliente: GETs seguidos (una conexión por solicitud) durante `segundos`"""
+    completadas = 0
+    limite = time.perf_counter() + segundos
+    while time.perf_counter() < limite:
+        conexion = http.client.HTTPConnection("127.0.0.1", port)
+        conexion.request("GET", url)
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        conexion.close()
+        assert respuesta.status == 200, respuesta.status
+        completadas += 1
+    resultados.put(completadas)
+
+
+def _post(port, url, cuerpo):
+    conexion = http.client.HTTPConnection("127.0.0.1", port)
+    conexion.request("POST", url, json.dumps(cuerpo), {"Content-Type": "application/json"})
+    respuesta = conexion.getresponse()
+    datos = json.loads(respuesta.read())
+    conexion.close()
+    return respuesta.status, datos
+
+
+def benchmark_workers(workers=(1, 2, 4), clientes=8, segundos=5, pedidos=10_000, usuarios=100):
+    """Lecturas por segundo del modo producción según la cantidad de workers"""
+    from vista.servidor_produccion import ServidorProduccion
+    url = '/api/pedidos?limite=10'
+    print(f"\n👷 MODO PRODUCCIÓN ({clientes} procesos cliente, GET {url}, {os.cpu_count()} CPU)")
+    print("=" * 60)
+    # Sin log de acceso de werkzeug ni INFO de los modelos en los procesos hijos
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    nivel_anterior = os.environ.get("UVSHOP_LOG_NIVEL")
+    os.environ["UVSHOP_LOG_NIVEL"] = "WARNING"
+    contexto = multiprocessing.get_context("fork")
+    resultados = {}
+    try:
+        for cantidad in workers:
+            with redirect_stdout(io.StringIO()):
+                servidor = ServidorProduccion('127.0.0.1', 0, cantidad).iniciar()
+            try:
+                for i in range(usuarios):
+                    _post(servidor.port, '/api/usuarios',
+                          {'nombre': f"Usuario {i}", 'direccion': "Calle 123", 'tipo': "nuevo"})
+                lote = [{'idUsuario': i % usuarios + 1, 'direccion': "Calle 123", 'productos': ["celulares"]}
+                        for i in range(1000)]
+                for _ in range(pedidos // len(lote)):
+                    codigo, cuerpo = _post(servidor.port, '/api/pedidos/lote', {'pedidos': lote})
+                    assert codigo == 201, cuerpo
+
+                cola = contexto.Queue()
+                procesos = [contexto.Process(target=_cargar_servidor, args=(servidor.port, segundos, url, cola))
+                            for _ in range(clientes)]
+                for proceso in procesos:
+                    proceso.start()
+                completadas = sum(cola.get() for _ in procesos)
+                for proceso in procesos:
+                    proceso.join()
+            finally:
+                servidor.detener()
+            resultados[cantidad] = completadas / segundos
+            print(f"   {cantidad} worker(s): {resultados[cantidad]:8,.0f} solicitudes/s "
+                  f"({resultados[cantidad] / resultados[workers[0]]:.2f}x)")
+    finally:
+        if nivel_anterior is None:
+            os.environ.pop("UVSHOP_LOG_NIVEL", None)
+        else:
+            os.environ["UVSHOP_LOG_NIVEL"] = nivel_anterior
+    if (os.cpu_count() or 1) < max(workers):
+        print(f"   ⚠️ Con {os.cpu_count()} CPU los workers se turnan el procesador; "
+              f"el escalamiento se ve con al menos {max(workers)} CPU")
+    return resultados
+
+
+def verificar_lecturas_concurrentes(espera=1.0):
+    """Una escritura lenta reenviada al dueño del estado no bloquea las lecturas de otro worker"""
+    from concurrent.futures import Future
+    from vista.estado_compartido import OP_HTTP, OP_PAGINAR_PEDIDOS, ClienteEstado, ServidorEstado
+    print("\n🔀 LECTURAS MIENTRAS EL DUEÑO EJECUTA UNA ESCRITURA")
+    print("=" * 60)
+    vista = crear_vista(1000)
+    # Pagos que la pasarela tarda `espera` segundos en resolver
+    def pago_lento(*_, **__):
+        futuro = Future()
+        threading.Timer(espera, futuro.set_result, (200,)).start()
+        return futuro
+    vista.gestor_usuarios.pagarPedidoAsync = pago_lento
+    authkey = os.urandom(32)
+    servidor = ServidorEstado(vista, authkey)
+    dueno = multiprocessing.get_context("fork").Process(target=servidor.servir)
+    dueno.start()
+    escritor = ClienteEstado(servidor.direccion, authkey)
+    comandos = json.dumps({'comandos': [{'tipo': 'pagar', 'idPedido': 1, 'idUsuario': 2, 'tipoPago': 'tarjeta'}]})
+    hilo = threading.Thread(target=escritor.llamar, args=(
+        OP_HTTP, 'POST', '/api/pedidos/comandos', b'', [('Content-Type', 'application/json')], comandos.encode()
+    ))
+    hilo.start()
+    time.sleep(espera / 10)
+    lector = ClienteEstado(servidor.direccion, authkey)
+    inicio = time.perf_counter()
+    lector.llamar(OP_PAGINAR_PEDIDOS, 0, 50, None, None, None, None)
+    lectura = time.perf_counter() - inicio
+    hilo.join()
+    dueno.terminate()
+    dueno.join()
+    servidor.listener.close()
+    assert lectura < espera / 2, f"la lectura esperó a la escritura ({lectura:.2f} s)"
+    print(f"   ✅ página leída en {lectura * 1000:.1f} ms con un lote de pagos de {espera:.1f} s en curso")
+
+
+if __name__ == "__main__":
+    print("🎯 BENCHMARK DE LA API REST - UVShop")
+    benchmark_paginacion()
+    verificar_indice_estado()
+    benchmark_exportacion()
+    benchmark_creacion_lote()
+    benchmark_metricas()
+    benchmark_perfilado()
+    benchmark_workers()
+    verificar_lecturas_concurrentes()
@@ -0,0 +1,75 @@
+"""
+BENCHMARK DE LA BITÁCORA
+========================
+Pedidos por segundo con nuevoPedido según cómo y a qué nivel se registra:
+escritura síncrona (como los print de antes), cola a nivel INFO y cola a
+nivel WARNING (los INFO ni se formatean).
+Ejecutar: python benchmark_bitacora.py
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+from controlador.bitacora import PAQUETES, FORMATO_DEFECTO, configurar_bitacora, detener_bitacora
+from modelo.inventario import inventario
+from modelo.pedido import calcularEnvio
+from benchmark_descuentos import preparar_sistema
+
+
+def crear_pedidos(gestor, id_usuario, pedidos):
+    """Segundos que toma crear `pedidos` pedidos con nuevoPedido"""
+    tienda = inventario()
+    carro = {tienda.items["celulares"]: 1, tienda.items["audifonos"]: 2}
+    envio = calcularEnvio("nacional", "centro")
+    inicio = time.perf_counter()
+    for _ in range(pedidos):
+        gestor.nuevoPedido(id_usuario, "Calle 123", carro, envio, "estandar")
+    return time.perf_counter() - inicio
+
+
+def contar_lineas(archivo):
+    with open(archivo, encoding="utf-8") as entrada:
+        return sum(1 for _ in entrada)
+
+
+def benchmark_niveles(pedidos=20_000):
+    """Síncrono vs cola (INFO) vs cola (WARNING), escribiendo a un archivo"""
+    print(f"\n📝 CREACIÓN DE PEDIDOS SEGÚN LA BITÁCORA ({pedidos:,} pedidos)")
+    print("=" * 60)
+    directorio = tempfile.mkdtemp(prefix="uvshop_bitacora_")
+    resultados = {}
+
+    for modo in ("síncrono INFO", "cola INFO", "cola WARNING"):
+        _, _, gestor, id_usuario = preparar_sistema()
+        archivo = os.path.join(directorio, modo.replace(" ", "_") + ".log")
+        if modo == "síncrono INFO":
+            # Cada registro se escribe en el hilo que lo genera, como un print
+            destino = logging.FileHandler(archivo, encoding="utf-8")
+            destino.setFormatter(logging.Formatter(FORMATO_DEFECTO))
+            for paquete in PAQUETES:
+                logging.getLogger(paquete).addHandler(destino)
+                logging.getLogger(paquete).setLevel(logging.INFO)
+            duracion = crear_pedidos(gestor, id_usuario, pedidos)
+            for paquete in PAQUETES:
+                logging.getLogger(paquete).removeHandler(destino)
+            destino.close()
+            descartados = 0
+        else:
+            manejador = configurar_bitacora(modo.split()[1], archivo=archivo)
+            duracion = crear_pedidos(gestor, id_usuario, pedidos)
+            descartados = manejador.descartados
+            detener_bitacora()
+        resultados[modo] = pedidos / duracion
+        print(f"   {modo:14}: {resultados[modo]:9,.0f} pedidos/s, "
+              f"{contar_lineas(archivo):,} líneas escritas, {descartados:,} descartadas")
+
+    print(f"   📈 Cola INFO vs síncrono: {resultados['cola INFO'] / resultados['síncrono INFO']:.2f}x, "
+          f"WARNING vs INFO: {resultados['cola WARNING'] / resultados['cola INFO']:.2f}x")
+    return resultados
+
+
+if __name__ == "__main__":
+    print("🎯 BENCHMARK DE LA BITÁCORA - UVShop")
+    benchmark_niveles()
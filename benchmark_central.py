@@ -0,0 +1,201 @@
+"""
+BENCHMARK DEL GESTOR CENTRAL
+============================
+Mide el costo de instrumentar las operaciones centralizadas y muestra sus
+percentiles de latencia (sin servidor).
+Ejecutar: python benchmark_central.py
+"""
+
+import io
+import random
+import threading
+import time
+from contextlib import redirect_stdout
+
+from controlador.histograma_latencias import HistogramaLatencias, HistogramasOperacion
+from controlador.gestor_central_pedidos import obtener_gestor_central
+from controlador.ids_pedido import GeneradorIds, fecha_de_id, nodo_de_id
+from modelo.inventario import inventario
+from modelo.pedido import calcularEnvio
+from benchmark_descuentos import preparar_sistema
+
+
+def benchmark_registro_latencia(muestras=1_000_000, hilos=4):
+    """Costo de registrar una latencia: histograma solo y por (operación, resultado)"""
+    print(f"\n⏱️ REGISTRO DE LATENCIAS ({muestras:,} muestras)")
+    print("=" * 60)
+    valores = [(i * 7919) % 5_000_000 for i in range(1000)]
+
+    vacio = time.perf_counter_ns()
+    for i in range(muestras):
+        valores[i % 1000]
+    vacio = time.perf_counter_ns() - vacio
+
+    histograma = HistogramaLatencias()
+    registrar = histograma.registrar
+    inicio = time.perf_counter_ns()
+    for i in range(muestras):
+        registrar(valores[i % 1000])
+    simple = (time.perf_counter_ns() - inicio - vacio) / muestras
+
+    por_operacion = HistogramasOperacion()
+    registrar_operacion = por_operacion.registrar
+    inicio = time.perf_counter_ns()
+    for i in range(muestras):
+        registrar_operacion("CREAR_PEDIDO", "exito", valores[i % 1000])
+    operacion = (time.perf_counter_ns() - inicio - vacio) / muestras
+
+    # Varios hilos escribiendo el mismo histograma: cada uno cuenta en su fragmento
+    compartido = HistogramaLatencias()
+
+    def escribir():
+        for i in range(muestras // hilos):
+            compartido.registrar(valores[i % 1000])
+
+    trabajadores = [threading.Thread(target=escribir) for _ in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+
+    print(f"   📊 HistogramaLatencias.registrar:  {simple:7.0f} ns por muestra")
+    print(f"   📊 HistogramasOperacion.registrar: {operacion:7.0f} ns por muestra")
+    print(f"   🧵 {hilos} hilos: {compartido.total:,} muestras contadas de {muestras // hilos * hilos:,}")
+    assert compartido.total == muestras // hilos * hilos
+
+    # Un hilo por muestra (como un servidor threaded): los fragmentos de los
+    # hilos terminados se juntan en la base y la memoria no crece
+    efimero = HistogramaLatencias()
+    for i in range(2000):
+        hilo = threading.Thread(target=efimero.registrar, args=(valores[i % 1000],))
+        hilo.start()
+        hilo.join()
+    inicio = time.perf_counter()
+    efimero.resumen()
+    print(f"   🔁 {efimero.total:,} hilos efímeros: resumen en {(time.perf_counter() - inicio) * 1e6:.0f} µs, "
+          f"{len(efimero._fragmentos)} fragmentos vivos")
+    assert efimero.total == 2000 and len(efimero._fragmentos) <= 1
+    assert operacion < 1000, "Registrar una latencia debería costar menos de 1 µs"
+    return simple, operacion
+
+
+def benchmark_latencias_operaciones(pedidos=2000):
+    """Crea, consulta y cancela pedidos por el gestor central y muestra p50/p95/p99"""
+    print(f"\n📈 LATENCIAS DEL GESTOR CENTRAL ({pedidos:,} pedidos)")
+    print("=" * 60)
+    proxxy, _, gestor, id_usuario = preparar_sistema()
+    central = obtener_gestor_central()
+    central.registrar_gestor_usuarios(gestor)
+    central.obtener_latencias(reiniciar=True)
+    tienda = inventario()
+    carro = {tienda.items["celulares"]: 1}
+    envio = calcularEnvio("nacional", "centro")
+
+    with redirect_stdout(io.StringIO()):
+        for _ in range(pedidos):
+            central.crear_pedido_centralizado(id_usuario, "Calle 123", carro, envio, "estandar")
+        ids = list(proxxy.datos.listaPedidos)
+        for id_pedido in ids:
+            central.consultar_pedido_centralizado(id_pedido)
+        for id_pedido in ids[::2]:
+            central.cancelar_pedido_centralizado(id_pedido)
+        for id_pedido in ids[::2]:
+            # Ya cancelados: cuentan como fallo
+            central.cancelar_pedido_centralizado(id_pedido)
+
+    for operacion, por_resultado in central.obtener_latencias(reiniciar=True).items():
+        for resultado, r in por_resultado.items():
+            print(f"   {operacion:17} [{resultado:5}] p50 {r['p50_us']:8.1f} µs  p95 {r['p95_us']:8.1f} µs  "
+                  f"p99 {r['p99_us']:8.1f} µs  máx {r['max_us']:9.1f} µs  ({r['muestras']:,})")
+    return central.obtener_latencias()
+
+
+def benchmark_lote_vs_individual(pedidos=2000):
+    """Crear y cancelar pedidos uno a uno vs con ejecutar_lote"""
+    print(f"\n📦 LOTE VS INDIVIDUAL ({pedidos:,} creaciones + {pedidos:,} cancelaciones)")
+    print("=" * 60)
+    tienda = inventario()
+    carro = {tienda.items["celulares"]: 1}
+    envio = calcularEnvio("nacional", "centro")
+    central = obtener_gestor_central()
+    tiempos = {}
+
+    for modo in ("individual", "lote"):
+        proxxy, _, gestor, id_usuario = preparar_sistema()
+        central.registrar_gestor_usuarios(gestor)
+        with redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            if modo == "individual":
+                ids = [central.crear_pedido_centralizado(id_usuario, "Calle 123", carro, envio, "estandar")
+                       for _ in range(pedidos)]
+                cancelados = [central.cancelar_pedido_centralizado(id_pedido) for id_pedido in ids]
+            else:
+                ids = central.ejecutar_lote([
+                    {'tipo': 'crear', 'id_usuario': id_usuario, 'direccion': "Calle 123",
+                     'carro': carro, 'precio_envio': envio, 'tipo_envio': "estandar"}
+                    for _ in range(pedidos)
+                ])
+                cancelados = central.ejecutar_lote([{'tipo': 'cancelar', 'id_pedido': id_pedido} for id_pedido in ids])
+            tiempos[modo] = time.perf_counter() - inicio
+        assert cancelados.count(200) == pedidos, f"{modo}: no se cancelaron todos los pedidos"
+        print(f"   {'🐢' if modo == 'individual' else '🚀'} {modo:10}: {tiempos[modo]:.3f} s "
+              f"({2 * pedidos / tiempos[modo]:,.0f} comandos/s)")
+
+    print(f"   📈 Mejora: {tiempos['individual'] / tiempos['lote']:.2f}x")
+    return tiempos
+
+
+def benchmark_ids_pedido(ids=200_000, hilos=8, nodos=3):
+    """Ids con random.randint(1000, 9999) vs GeneradorIds (varios hilos y nodos)"""
+    print(f"\n🆔 IDS DE PEDIDO ({ids:,} ids, {hilos} hilos, {nodos} nodos)")
+    print("=" * 60)
+    azar = random.Random(1)
+    usados = set()
+    primer_choque = None
+    for i in range(20_000):
+        nuevo = azar.randint(1000, 9999)
+        if nuevo in usados and primer_choque is None:
+            primer_choque = i + 1
+        usados.add(nuevo)
+    print(f"   🎲 randint(1000, 9999): primer choque en el pedido #{primer_choque}, "
+          f"{20_000 - len(usados):,} pedidos pisados de 20,000")
+
+    generadores = [GeneradorIds(nodo) for nodo in range(nodos)]
+    por_hilo = [[] for _ in range(hilos)]
+
+    def generar(indice):
+        generador = generadores[indice % nodos]
+        salida = por_hilo[indice]
+        for _ in range(ids // hilos):
+            salida.append(generador.siguiente())
+
+    trabajadores = [threading.Thread(target=generar, args=(i,)) for i in range(hilos)]
+    inicio = time.perf_counter()
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    duracion = time.perf_counter() - inicio
+
+    todos = [id_pedido for salida in por_hilo for id_pedido in salida]
+    crecientes = all(all(a < b for a, b in zip(salida, salida[1:])) for salida in por_hilo)
+    print(f"   🚀 GeneradorIds: {len(todos) / duracion:,.0f} ids/s, "
+          f"repetidos: {len(todos) - len(set(todos))}, crecientes por hilo: {'✅' if crecientes else '❌'}")
+
+    inicio = time.perf_counter()
+    bloque = generadores[0].reservar(ids)
+    reserva = time.perf_counter() - inicio
+    print(f"   📦 reservar({ids:,}): {reserva * 1000:.1f} ms, crecientes: "
+          f"{'✅' if all(a < b for a, b in zip(bloque, bloque[1:])) else '❌'}")
+    print(f"   🕒 Último id {todos[-1]}: nodo {nodo_de_id(todos[-1])}, "
+          f"generado hace {time.time() - fecha_de_id(todos[-1]):.2f} s")
+    assert len(set(todos)) == len(todos) and crecientes
+    return len(todos) / duracion
+
+
+if __name__ == "__main__":
+    print("🎯 BENCHMARK DEL GESTOR CENTRAL - UVShop")
+    benchmark_registro_latencia()
+    benchmark_latencias_operaciones()
+    benchmark_lote_vs_individual()
+    benchmark_ids_pedido()
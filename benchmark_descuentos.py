@@ -0,0 +1,304 @@
+"""
+BENCHMARK DE PRECIOS Y DESCUENTOS
+=================================
+Mide el costo de crear pedidos y calcular descuentos sin servidor activo.
+Ejecutar: python benchmark_descuentos.py
+"""
+
+import io
+import os
+import time
+from contextlib import redirect_stdout
+
+from modelo.bd import bd
+from modelo.proxy import proxy
+from modelo.inventario import inventario
+from modelo.pedido import calcularEnvio
+from controlador.gestionDescuentos import gestionDescuentos
+from controlador.gestionPedidosUsuarios import gestionPedidosUsuarios
+from controlador.contexto_solicitud import ContextoSolicitud
+from controlador.calculadora_descuentos_avanzada import crear_calculadora_descuentos_avanzada
+from controlador.cache_presupuestos import crear_cache_presupuestos
+from controlador.sistema_beneficios import (
+    ClienteBase, BeneficioDescuentoExtra, BeneficioEnvioGratis, BeneficioCashback, GestorBeneficios
+)
+from modelo.usuario import usuario
+
+
+def inicializar_singleton_seguro(clase, *args):
+    """Inicializa un Singleton con argumentos (igual que vista/interfaz.py)"""
+    clase._instancia = None
+    instancia = object.__new__(clase)
+    instancia.__init__(*args)
+    clase._instancia = instancia
+    return instancia
+
+
+class proxyTrazado(proxy):
+    """Proxy que cuenta cuántas veces se busca un usuario"""
+
+    def __init__(self, datos):
+        super().__init__(datos)
+        self.busquedasUsuario = 0
+
+    def buscarUsuario(self, idUsuario):
+        self.busquedasUsuario += 1
+        return super().buscarUsuario(idUsuario)
+
+
+def preparar_sistema(tipo_cliente="vip"):
+    """Crea bd, proxy trazado, descuentos y gestor de usuarios con un usuario"""
+    datos = bd()
+    proxxy = proxyTrazado(datos)
+    id_usuario, _ = proxxy.nuevoUsuario("Benchmark", "Calle 123", tipo_cliente)
+    descuentos = inicializar_singleton_seguro(gestionDescuentos, proxxy)
+    gestor = inicializar_singleton_seguro(gestionPedidosUsuarios, proxxy, descuentos)
+    return proxxy, descuentos, gestor, id_usuario
+
+
+def benchmark_busquedas_usuario(pedidos=2000):
+    """Traza las búsquedas de usuario por pedido creado con nuevoPedido"""
+    print("\n🔍 BÚSQUEDAS DE USUARIO POR PEDIDO (nuevoPedido)")
+    print("=" * 60)
+    proxxy, _, gestor, id_usuario = preparar_sistema()
+    tienda = inventario()
+    carro = {tienda.items["celulares"]: 1, tienda.items["audifonos"]: 2}
+    envio = calcularEnvio("nacional", "centro")
+
+    with redirect_stdout(io.StringIO()):
+        proxxy.busquedasUsuario = 0
+        gestor.nuevoPedido(id_usuario, "Calle 123", carro, envio, "estandar")
+        busquedas = proxxy.busquedasUsuario
+
+        inicio = time.perf_counter()
+        for _ in range(pedidos):
+            gestor.nuevoPedido(id_usuario, "Calle 123", carro, envio, "estandar")
+        duracion = time.perf_counter() - inicio
+
+    print(f"   📋 Búsquedas de usuario en un pedido: {busquedas}")
+    print(f"   ⏱️ {pedidos} pedidos en {duracion:.3f}s ({pedidos / duracion:,.0f} pedidos/s)")
+    return busquedas
+
+
+def benchmark_descuentos_compilados(descuentos_por_tipo=500, llamadas=20000):
+    """Compara recalcular la lista de descuentos vs el multiplicador compilado"""
+    print(f"\n🧮 DESCUENTOS COMPILADOS ({descuentos_por_tipo} descuentos activos por tipo)")
+    print("=" * 60)
+    proxxy, descuentos, _, id_usuario = preparar_sistema("vip")
+    for tipo in ("nuevo", "frecuente", "vip"):
+        for i in range(descuentos_por_tipo):
+            descuentos.nuevoDescuento(f"promo_{tipo}_{i}", 0.999, tipo)
+    contexto = ContextoSolicitud.resolver(proxxy, id_usuario)
+
+    inicio = time.perf_counter()
+    for _ in range(llamadas):
+        descuentos.calcularLista(descuentos.listaV)
+    sin_cache = time.perf_counter() - inicio
+
+    with redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        for _ in range(llamadas):
+            descuentos.calcularDescuentos(id_usuario, contexto)
+        compilado = time.perf_counter() - inicio
+
+    print(f"   🐢 calcularLista por pedido:   {sin_cache / llamadas * 1e6:8.2f} µs")
+    print(f"   🚀 calcularDescuentos compilado: {compilado / llamadas * 1e6:8.2f} µs")
+    return sin_cache, compilado
+
+
+def benchmark_precios_lote(carritos=5000):
+    """Throughput: calcular_precio_final por carrito (con y sin salida) vs lote"""
+    print(f"\n📦 PRECIOS POR LOTE ({carritos} carritos)")
+    print("=" * 60)
+    _, descuentos, _, _ = preparar_sistema()
+    tienda = inventario()
+    tipos = ("nuevo", "frecuente", "vip")
+    usuarios = [usuario(i, f"Cliente {i}", "Calle 123", tipos[i % 3]) for i in range(carritos)]
+    lista_carritos = [{tienda.items["tablet"]: 1 + i % 4, tienda.items["camaras"]: 1} for i in range(carritos)]
+
+    def por_llamada(calculadora):
+        for usuario_original, carrito in zip(usuarios, lista_carritos):
+            calculadora.calcular_precio_final(calculadora.precio_carrito(carrito), 2000, usuario_original)
+
+    with open(os.devnull, "w") as nulo, redirect_stdout(nulo):
+        inicio = time.perf_counter()
+        por_llamada(crear_calculadora_descuentos_avanzada(descuentos))
+        con_salida = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    por_llamada(crear_calculadora_descuentos_avanzada(descuentos, silencioso=True))
+    silencioso = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    crear_calculadora_descuentos_avanzada(descuentos, silencioso=True).calcular_precios_lote(
+        usuarios, lista_carritos, 2000)
+    lote = time.perf_counter() - inicio
+
+    print(f"   🐢 Por llamada con salida:  {carritos / con_salida:12,.0f} carritos/s")
+    print(f"   🔇 Por llamada silenciosa:  {carritos / silencioso:12,.0f} carritos/s")
+    print(f"   🚀 calcular_precios_lote:   {carritos / lote:12,.0f} carritos/s")
+    return con_salida, silencioso, lote
+
+
+def benchmark_cache_presupuestos(refrescos=20000, carritos_distintos=50):
+    """Refrescos de checkout repetidos sobre pocos carritos distintos"""
+    print(f"\n🗃️ CACHE DE PRESUPUESTOS ({refrescos} refrescos, {carritos_distintos} carritos)")
+    print("=" * 60)
+    _, descuentos, _, _ = preparar_sistema()
+    tienda = inventario()
+    calculadora = crear_calculadora_descuentos_avanzada(descuentos, silencioso=True)
+    cache = crear_cache_presupuestos(calculadora, tienda, capacidad=256)
+    cliente = usuario(1, "Cliente", "Calle 123", "vip")
+    carritos = [{tienda.items["consolas"]: 1 + i} for i in range(carritos_distintos)]
+
+    inicio = time.perf_counter()
+    for i in range(refrescos):
+        cache.cotizar(cliente, carritos[i % carritos_distintos], 2000)
+        if i == refrescos // 2:
+            descuentos.nuevoDescuento("flash", 0.9, "vip")
+    duracion = time.perf_counter() - inicio
+
+    metricas = cache.obtener_metricas()
+    print(f"   🎯 Tasa de aciertos: {metricas['tasa_aciertos']:.1%} "
+          f"({metricas['aciertos']} aciertos / {metricas['fallos']} fallos)")
+    print(f"   ♻️ Invalidaciones por cambio de versión: {metricas['invalidaciones']}")
+    print(f"   ⏱️ Tiempo ahorrado: {metricas['tiempo_ahorrado_s'] * 1000:.1f} ms "
+          f"(total {duracion * 1000:.1f} ms)")
+    return metricas
+
+
+def benchmark_cadenas_beneficios(profundidades=(1, 5, 10, 25, 50), lecturas=20000):
+    """Costo de plegar la cadena de decoradores y de leer el vector ya plegado"""
+    print("\n🎁 CADENAS DE BENEFICIOS (decoradores)")
+    print("=" * 60)
+    print(f"   {'profundidad':>11} {'plegado (µs)':>14} {'lectura (µs)':>14}")
+    decoradores = (
+        lambda c: BeneficioDescuentoExtra(c, 1),
+        BeneficioEnvioGratis,
+        lambda c: BeneficioCashback(c, 1),
+    )
+    cliente = usuario(1, "Cliente", "Calle 123", "frecuente")
+    resultados = {}
+    for profundidad in profundidades:
+        cadena = ClienteBase(cliente)
+        for i in range(profundidad):
+            cadena = decoradores[i % len(decoradores)](cadena)
+
+        inicio = time.perf_counter()
+        cadena.compilar()
+        plegado = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for _ in range(lecturas):
+            cadena.obtener_descuento()
+            cadena.obtener_cashback()
+            cadena.obtener_descripcion()
+        lectura = (time.perf_counter() - inicio) / lecturas
+
+        resultados[profundidad] = (plegado, lectura)
+        print(f"   {profundidad:>11} {plegado * 1e6:>14.2f} {lectura * 1e6:>14.2f}")
+    return resultados
+
+
+def memoria_residente_mb():
+    """Memoria residente actual del proceso (Linux); si no, el máximo histórico"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def benchmark_memoria_beneficios(usuarios=1_000_000, rondas=6, periodo=3600.0):
+    """
+    Promociones rotativas: en cada ronda todos los usuarios reciben una
+    promoción que dura dos rondas (y una repetida). Con vencimientos y
+    deduplicación el estado debe quedar plano tras la segunda ronda.
+    """
+    print(f"\n🧠 MEMORIA DE BENEFICIOS ({usuarios:,} usuarios, {rondas} rondas)")
+    print("=" * 60)
+    reloj = [0.0]
+    gestor = GestorBeneficios(reloj=lambda: reloj[0])
+    clientes = [usuario(i, f"Cliente {i}", "Calle 123", "frecuente") for i in range(usuarios)]
+    promociones = ("descuento_extra", "envio_gratis", "cashback")
+    base = memoria_residente_mb()
+    print(f"   {'ronda':>5} {'registrados':>12} {'activos':>10} {'MB extra':>9} {'seg':>6}")
+
+    resultados = []
+    for ronda in range(rondas):
+        reloj[0] = ronda * periodo
+        inicio = time.perf_counter()
+        for cliente in clientes:
+            promocion = promociones[(cliente.getidUsuario() + ronda) % len(promociones)]
+            gestor.aplicar_beneficio_temporal(cliente, promocion, fin=reloj[0] + 1.5 * periodo,
+                                              silencioso=True)
+            # Reaplicar la misma promoción solo renueva la ventana
+            gestor.aplicar_beneficio_temporal(cliente, promocion, fin=reloj[0] + 1.5 * periodo,
+                                              silencioso=True)
+        gestor.barrer_vencidos()
+        duracion = time.perf_counter() - inicio
+        extra = memoria_residente_mb() - base
+        resultados.append(extra)
+        print(f"   {ronda:>5} {len(gestor.vigencias):>12,} {len(gestor.beneficios_activos):>10,} "
+              f"{extra:>9.1f} {duracion:>6.1f}")
+    return resultados
+
+
+def verificar_vigencias_beneficios():
+    """
+    Registrar un beneficio aplica los bordes que cruzó el reloj para todos:
+    el vencido de otro usuario desaparece y el pendiente se activa.
+    """
+    reloj = [1000.0]
+    gestor = GestorBeneficios(reloj=lambda: reloj[0])
+    vence, pendiente, otro = (usuario(i, f"Cliente {i}", "Calle 123", "vip") for i in (1, 2, 3))
+    gestor.aplicar_beneficio_temporal(vence, "cashback", fin=1010, silencioso=True)
+    gestor.aplicar_beneficio_temporal(pendiente, "envio_gratis", inicio=1005, fin=2000, silencioso=True)
+    reloj[0] = 1020
+    gestor.aplicar_beneficio_temporal(otro, "envio_gratis", silencioso=True)
+    assert 1 not in gestor.beneficios_activos and 1 not in gestor._registrados, gestor.beneficios_activos
+    assert gestor.beneficios_activos.get(2) == ["envio_gratis"], gestor.beneficios_activos
+    print("   ✅ Vencidos retirados y pendientes activados al registrar otro beneficio")
+
+
+def benchmark_promocion_segmento(usuarios=100_000):
+    """Otorgar black_friday a todo un segmento: una llamada por usuario vs regla única"""
+    print(f"\n🏷️ PROMOCIÓN POR SEGMENTO ({usuarios:,} clientes frecuentes)")
+    print("=" * 60)
+    clientes = [usuario(i, f"Cliente {i}", "Calle 123", "frecuente") for i in range(usuarios)]
+
+    por_usuario = GestorBeneficios()
+    inicio = time.perf_counter()
+    for cliente in clientes:
+        por_usuario.aplicar_promocion_especial(cliente, "black_friday", silencioso=True)
+    individual = time.perf_counter() - inicio
+    # La promoción propia también se aplica al cotizar
+    assert por_usuario.promociones_para(0, "frecuente") == ("black_friday",)
+
+    por_segmento = GestorBeneficios()
+    inicio = time.perf_counter()
+    por_segmento.aplicar_promocion_segmento("frecuente", "black_friday", silencioso=True)
+    segmento = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for cliente in clientes:
+        por_segmento.promociones_para(cliente.getidUsuario(), cliente.getTipoCliente())
+    evaluacion = (time.perf_counter() - inicio) / usuarios
+
+    print(f"   🐢 Una llamada por usuario:  {individual * 1000:10.1f} ms")
+    print(f"   🚀 Regla de segmento:        {segmento * 1000:10.3f} ms")
+    print(f"   🔎 Evaluación al cotizar:    {evaluacion * 1e6:10.2f} µs por usuario")
+    return individual, segmento, evaluacion
+
+
+if __name__ == "__main__":
+    print("🎯 BENCHMARK DE PRECIOS Y DESCUENTOS - UVShop")
+    benchmark_busquedas_usuario()
+    benchmark_descuentos_compilados()
+    benchmark_precios_lote()
+    benchmark_cache_presupuestos()
+    benchmark_cadenas_beneficios()
+    verificar_vigencias_beneficios()
+    benchmark_memoria_beneficios()
+    benchmark_promocion_segmento()
@@ -0,0 +1,258 @@
+"""
+BENCHMARK DE PAGOS
+==================
+Mide el pipeline de pagos con pasarelas simuladas (sin input ni servidor).
+Ejecutar: python benchmark_pagos.py
+"""
+
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from controlador import pagar
+from controlador.pagar import PasarelaSimulada, FabricaPasarela
+from controlador.procesador_pagos import ProcesadorPagosAsincrono, procesar_pagos_concurrentes
+from controlador.liquidacion_pagos import ColaLiquidacion
+from controlador.riesgo_pagos import PuntuadorRiesgo
+from controlador.cortacircuitos_pagos import CortaCircuitos, FabricaProtegida
+from modelo.pedido import pedido
+from modelo.inventario import inventario
+from modelo.pedido import calcularEnvio
+from benchmark_descuentos import preparar_sistema
+
+
+def benchmark_pagos_concurrentes(pagos=5000, latencia=(0.05, 0.1), tasa_fallo=0.05):
+    """Secuencial (un pago a la vez) vs driver asyncio con miles en vuelo"""
+    print(f"\n💳 PAGOS CONCURRENTES ({pagos:,} pagos, latencia {latencia[0]}-{latencia[1]}s)")
+    print("=" * 60)
+    fabrica = FabricaPasarela(PasarelaSimulada("tarjeta", latencia, tasa_fallo, semilla=1))
+
+    muestra = 20
+    inicio = time.perf_counter()
+    for i in range(muestra):
+        fabrica.crearMetodoPago().procesarPago(1000, f"user{i}")
+    secuencial = (time.perf_counter() - inicio) / muestra
+
+    lote = [(fabrica, 1000 + i, f"user{i}") for i in range(pagos)]
+    inicio = time.perf_counter()
+    resultados = asyncio.run(procesar_pagos_concurrentes(lote))
+    concurrente = time.perf_counter() - inicio
+    aprobados = resultados.count(200)
+
+    print(f"   🐢 Secuencial (estimado): {secuencial * pagos:8.1f} s ({1 / secuencial:10,.0f} pagos/s)")
+    print(f"   🚀 asyncio:               {concurrente:8.1f} s ({pagos / concurrente:10,.0f} pagos/s)")
+    print(f"   ✅ Aprobados: {aprobados:,}  ❌ Rechazados: {pagos - aprobados:,}")
+    return secuencial, concurrente
+
+
+def benchmark_procesador_en_segundo_plano(pagos=5000, latencia=(0.05, 0.1)):
+    """Envío desde hilos del servidor con enviar(): Futures y callbacks"""
+    print(f"\n📨 PROCESADOR EN SEGUNDO PLANO ({pagos:,} pagos con enviar())")
+    print("=" * 60)
+    fabrica = FabricaPasarela(PasarelaSimulada("qr", latencia, 0.0, semilla=2))
+    procesador = ProcesadorPagosAsincrono()
+    completados = []
+
+    inicio = time.perf_counter()
+    futuros = [procesador.enviar(fabrica, 500, f"user{i}", completados.append) for i in range(pagos)]
+    envio = time.perf_counter() - inicio
+    for futuro in futuros:
+        futuro.result()
+    total = time.perf_counter() - inicio
+    procesador.detener()
+
+    metricas = procesador.obtener_metricas()
+    print(f"   📤 Envío sin bloquear: {envio / pagos * 1e6:8.1f} µs por pago")
+    print(f"   ⏱️ Todos completados en {total:.2f} s ({pagos / total:,.0f} pagos/s)")
+    print(f"   📈 Máximo en vuelo: {metricas['max_en_vuelo_observado']:,}  "
+          f"callbacks: {len(completados):,}")
+    return metricas
+
+
+def crear_pedidos_pendientes(cantidad):
+    """Crea pedidos pendientes de un usuario; retorna (gestor, id_usuario, ids)"""
+    proxxy, _, gestor, id_usuario = preparar_sistema()
+    tienda = inventario()
+    carro = {tienda.items["celulares"]: 1}
+    envio = calcularEnvio("nacional", "centro")
+    with redirect_stdout(io.StringIO()):
+        for _ in range(cantidad):
+            gestor.nuevoPedido(id_usuario, "Calle 123", carro, envio, "estandar")
+    return gestor, id_usuario, list(proxxy.datos.listaPedidos)
+
+
+def benchmark_idempotencia(pedidos=300, reintentos=8, hilos=32):
+    """
+    Prueba de estrés: cada pedido se paga `reintentos` veces en paralelo con la
+    misma clave de idempotencia. La pasarela debe recibir una llamada por clave.
+    """
+    print(f"\n🔁 IDEMPOTENCIA ({pedidos} claves x {reintentos} intentos, {hilos} hilos)")
+    print("=" * 60)
+    gestor, id_usuario, ids = crear_pedidos_pendientes(pedidos)
+    pasarela = PasarelaSimulada("tarjeta", latencia=(0.01, 0.05), tasa_fallo=0.1, semilla=3)
+    original = pagar.pasarelas["tarjeta"]
+    pagar.pasarelas["tarjeta"] = pasarela
+
+    intentos = [(id_pedido, f"pago-{id_pedido}") for id_pedido in ids for _ in range(reintentos)]
+    try:
+        with redirect_stdout(io.StringIO()), ThreadPoolExecutor(hilos) as ejecutor:
+            inicio = time.perf_counter()
+            futuros = list(ejecutor.map(
+                lambda intento: gestor.pagarPedidoAsync(intento[0], id_usuario, "tarjeta",
+                                                        claveIdempotencia=intento[1]),
+                intentos
+            ))
+            resultados = [futuro.result() for futuro in futuros]
+            duracion = time.perf_counter() - inicio
+    finally:
+        pagar.pasarelas["tarjeta"] = original
+
+    por_clave = {}
+    for (_, clave), resultado in zip(intentos, resultados):
+        por_clave.setdefault(clave, set()).add(resultado)
+    consistentes = all(len(valores) == 1 for valores in por_clave.values())
+
+    print(f"   📞 Llamadas a la pasarela: {pasarela.llamadas} (claves: {len(ids)})")
+    print(f"   🎯 Mismo resultado para todos los intentos de una clave: {'✅' if consistentes else '❌'}")
+    print(f"   ⏱️ {len(intentos):,} intentos en {duracion:.2f} s")
+    assert pasarela.llamadas == len(ids), "Se llamó más de una vez a la pasarela por clave"
+    assert consistentes
+    return pasarela.llamadas
+
+
+def benchmark_liquidacion(pagos=100_000, productores=4, configuraciones=((1, 1), (4, 1), (4, 256))):
+    """Carga de 100k resultados de pago: hilos y tamaño de lote de la cola"""
+    print(f"\n🏦 LIQUIDACIÓN ({pagos:,} pagos simulados, {productores} productores)")
+    print("=" * 60)
+    print(f"   {'hilos':>5} {'lote':>5} {'pagos/s':>10} {'prof. máx':>10} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    por_productor = pagos // productores
+    resultados = {}
+    for hilos, tam_lote in configuraciones:
+        pedidos = [pedido(1, "Calle 123", i, "pendiente", [], None, None) for i in range(pagos)]
+        cola = ColaLiquidacion(hilos, tam_lote)
+        cola.iniciar()
+
+        def producir(desde):
+            for i in range(desde, desde + por_productor):
+                cola.encolar(pedidos[i], 200 if i % 20 else 400, 1000)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(productores) as ejecutor:
+            list(ejecutor.map(producir, range(0, por_productor * productores, por_productor)))
+        cola.esperar()
+        duracion = time.perf_counter() - inicio
+        cola.detener()
+
+        metricas = cola.obtener_metricas()
+        resultados[(hilos, tam_lote)] = metricas
+        print(f"   {hilos:>5} {tam_lote:>5} {metricas['liquidados'] / duracion:>10,.0f} "
+              f"{metricas['profundidad_maxima']:>10,} {metricas['latencia_p50_ms']:>8.1f} "
+              f"{metricas['latencia_p95_ms']:>8.1f} {metricas['latencia_p99_ms']:>8.1f}")
+    return resultados
+
+
+def benchmark_riesgo(usuarios=2000, riesgosos=0.05, latencia_verificacion=1.5):
+    """Verificación solo para alto riesgo vs dormir en todos los pagos"""
+    print(f"\n🛡️ PUNTAJE DE RIESGO ({usuarios:,} usuarios, {riesgosos:.0%} riesgosos)")
+    print("=" * 60)
+    puntuador = PuntuadorRiesgo(latencia_verificacion=latencia_verificacion)
+    cantidad_riesgosos = int(usuarios * riesgosos)
+    pagos = []
+    for id_usuario in range(usuarios):
+        riesgoso = id_usuario < cantidad_riesgosos
+        # Historial: los riesgosos hacen ráfagas de pedidos y fallan pagos
+        for i in range(15 if riesgoso else 3):
+            puntuador.registrar_pedido(id_usuario, 1000 + 10 * (i % 3))
+            puntuador.registrar_pago(id_usuario, 400 if riesgoso and i % 2 else 200)
+        pagos.append((id_usuario, 1010))
+
+    inicio = time.perf_counter()
+    for _ in range(5):
+        for id_usuario, monto in pagos:
+            puntuador.evaluar(id_usuario, monto)
+    evaluacion = (time.perf_counter() - inicio) / (5 * usuarios)
+    altos = sum(puntuador.es_alto_riesgo(id_usuario, monto) for id_usuario, monto in pagos)
+    # Un cliente normal que de pronto paga 10 veces su promedio
+    salto = puntuador.evaluar(usuarios - 1, 10100)
+
+    antes = latencia_verificacion
+    ahora = altos * latencia_verificacion / usuarios
+    print(f"   🔎 Evaluación (cache): {evaluacion * 1e6:8.2f} µs por pago")
+    print(f"   🚨 Pagos con verificación costosa: {altos:,} de {usuarios:,}")
+    print(f"   🧾 Monto 10x el promedio -> puntaje {salto:.2f}")
+    print(f"   ⏱️ Demora media de verificación: {antes:.2f}s -> {ahora:.3f}s por pago")
+    return altos, evaluacion
+
+
+def benchmark_cortacircuitos(llamadas=400, plazo=0.1, latencia_lenta=2.0, tiempo_abierto=0.5):
+    """
+    Banco de prueba: la pasarela simulada pasa de sana a lenta y vuelve.
+    Compara la espera por pago sin protección, solo con plazo y con cortacircuitos.
+    """
+    print(f"\n⚡ CORTACIRCUITOS ({llamadas} pagos por fase, plazo {plazo}s, lenta {latencia_lenta}s)")
+    print("=" * 60)
+    pasarela = PasarelaSimulada("tarjeta", latencia=0.01, semilla=4)
+    circuito = CortaCircuitos("tarjeta", tiempo_abierto=tiempo_abierto)
+    protegida = FabricaProtegida(FabricaPasarela(pasarela), circuito, plazo)
+    solo_plazo = FabricaProtegida(FabricaPasarela(pasarela),
+                                  CortaCircuitos("sin_corte", umbral_fallos=2.0), plazo)
+
+    async def cronometrado(metodo, i):
+        inicio = time.perf_counter()
+        codigo = await metodo.procesarPagoAsync(1000, f"user{i}")
+        return codigo, time.perf_counter() - inicio
+
+    async def fase(fabrica, concurrentes=50):
+        # Espera media de cada llamada: lo que sufre el trabajador que paga
+        medidas = []
+        for desde in range(0, llamadas, concurrentes):
+            medidas.extend(await asyncio.gather(*(
+                cronometrado(fabrica.crearMetodoPago(), i)
+                for i in range(desde, min(llamadas, desde + concurrentes))
+            )))
+        codigos = [codigo for codigo, _ in medidas]
+        return codigos, sum(duracion for _, duracion in medidas) / len(medidas)
+
+    async def escenario():
+        filas = []
+        codigos, espera = await fase(protegida)
+        filas.append(("sana", "cortacircuitos", espera, codigos))
+        pasarela.latencia = latencia_lenta
+        codigos, espera = await fase(solo_plazo)
+        filas.append(("lenta", "solo plazo", espera, codigos))
+        codigos, espera = await fase(protegida)
+        filas.append(("lenta", "cortacircuitos", espera, codigos))
+        estado_abierto = circuito.estado
+        pasarela.latencia = 0.01
+        await asyncio.sleep(tiempo_abierto)
+        codigos, espera = await fase(protegida, concurrentes=1)
+        filas.append(("recuperada", "cortacircuitos", espera, codigos))
+        return filas, estado_abierto
+
+    # Sin protección cada pago espera la latencia completa de la pasarela
+    print(f"   {'fase':>10} {'protección':>15} {'espera ms':>10} {'200':>5} {'503':>5} {'504':>5}")
+    print(f"   {'lenta':>10} {'ninguna':>15} {latencia_lenta * 1000:>10.1f} "
+          f"{'-':>5} {'-':>5} {'-':>5}   (latencia completa)")
+    filas, estado_abierto = asyncio.run(escenario())
+    for nombre_fase, proteccion, espera, codigos in filas:
+        print(f"   {nombre_fase:>10} {proteccion:>15} {espera * 1000:>10.1f} {codigos.count(200):>5} "
+              f"{codigos.count(503):>5} {codigos.count(504):>5}")
+
+    metricas = circuito.obtener_metricas()
+    print(f"   🔌 Estado tras la fase lenta: {estado_abierto}; al final: {metricas['estado']}")
+    print(f"   📊 Aperturas: {metricas['aperturas']}, plazos vencidos: {metricas['plazos_vencidos']}, "
+          f"rechazos rápidos: {metricas['rechazos_rapidos']}")
+    return metricas
+
+
+if __name__ == "__main__":
+    print("🎯 BENCHMARK DE PAGOS - UVShop")
+    benchmark_pagos_concurrentes()
+    benchmark_procesador_en_segundo_plano()
+    benchmark_idempotencia()
+    benchmark_liquidacion()
+    benchmark_riesgo()
+    benchmark_cortacircuitos()
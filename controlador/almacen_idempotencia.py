@@ -0,0 +1,65 @@
+"""
+ALMACÉN DE IDEMPOTENCIA - Reintentos de pago sin cobros duplicados
+==================================================================
+Cada clave de idempotencia guarda el Future del primer intento.
+Un reintento con la misma clave recibe ese mismo Future: si el pago sigue en
+curso espera al primero, y si ya terminó obtiene el resultado guardado sin
+volver a llamar a la pasarela.
+El almacén está acotado por capacidad y por tiempo de vida (TTL): al llenarse
+se descartan primero las claves más antiguas.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class AlmacenIdempotencia:
+    """Claves de idempotencia -> Future del primer intento, con TTL y capacidad"""
+
+    def __init__(self, capacidad=10000, ttl=24 * 3600, reloj=time.monotonic):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.reloj = reloj
+        self._entradas = OrderedDict()  # {clave: (futuro, expira)}
+        self._candado = threading.Lock()
+        self.reutilizadas = 0
+
+    def reservar(self, clave):
+        """
+        Reserva una clave o retorna la reserva existente.
+
+        Returns:
+            tuple: (nueva, futuro). Si nueva es True el llamador debe completar
+                   el futuro con set_result; si es False basta con esperarlo.
+        """
+        ahora = self.reloj()
+        with self._candado:
+            self._purgar(ahora)
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self.reutilizadas += 1
+                return False, entrada[0]
+            futuro = Future()
+            self._entradas[clave] = (futuro, ahora + self.ttl)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+            return True, futuro
+
+    def liberar(self, clave):
+        """Olvida una clave (por ejemplo si la solicitud era inválida)"""
+        with self._candado:
+            self._entradas.pop(clave, None)
+
+    def _purgar(self, ahora):
+        # El orden de inserción coincide con el de vencimiento
+        # (TTL fijo desde la reserva): basta con revisar desde el principio
+        while self._entradas:
+            clave, (_, expira) = next(iter(self._entradas.items()))
+            if expira > ahora:
+                break
+            del self._entradas[clave]
+
+    def __len__(self):
+        return len(self._entradas)
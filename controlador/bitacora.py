@@ -0,0 +1,129 @@
+"""
+BITÁCORA - Logging por niveles escrito en segundo plano
+=======================================================
+Reemplaza los print de los caminos calientes (bd, inventario, carrito,
+pedidos, descuentos, beneficios, gestor central). Cada módulo usa su logger:
+
+    _log = logging.getLogger(__name__)
+    _log.info("Pedido %s agregado", idPedido)
+
+Los de modelo/ usan logging directamente y no importan nada de controlador/.
+configurar_bitacora() conecta los loggers de modelo, controlador y vista a
+una cola: el hilo que registra solo encola el registro (el mensaje se arma
+con sus argumentos en el hilo escritor, así que bajo el nivel no se formatea
+nada) y un único hilo escribe en la consola o el archivo. Si la cola se
+llena los registros se descartan y se cuentan, en vez de bloquear.
+Sin configurar, logging muestra solo WARNING o más por stderr.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+from controlador.metricas import obtener_registro_metricas
+
+# Loggers raíz de los paquetes del proyecto
+PAQUETES = ("modelo", "controlador", "vista")
+NIVEL_DEFECTO = "INFO"
+FORMATO_DEFECTO = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+# Solo el mensaje, como los print de la interfaz de consola
+FORMATO_CONSOLA = "%(message)s"
+# Registros pendientes antes de empezar a descartar
+CAPACIDAD_COLA = 100_000
+
+
+class ManejadorCola(logging.handlers.QueueHandler):
+    """QueueHandler que nunca bloquea ni formatea en el hilo que registra"""
+
+    def __init__(self, cola):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def prepare(self, record):
+        # El formateo (msg % args, traceback) queda para el hilo escritor
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+class _Bitacora:
+    """Cola, manejador y hilo escritor configurados (uno por proceso)"""
+
+    def __init__(self, manejador, oyente, destino):
+        self.manejador = manejador
+        self.oyente = oyente
+        self.destino = destino
+
+
+_bitacora = None
+
+
+def configurar_bitacora(nivel=None, archivo=None, formato=FORMATO_DEFECTO, capacidad=CAPACIDAD_COLA):
+    """
+    Conecta los loggers del proyecto a la cola y arranca el hilo escritor.
+    Llamarla de nuevo solo cambia el nivel.
+
+    Args:
+        nivel: Nivel mínimo (nombre o número); por defecto UVSHOP_LOG_NIVEL o INFO
+        archivo: Ruta de salida; por defecto UVSHOP_LOG_ARCHIVO o la consola (stdout)
+        formato: Formato de cada línea
+        capacidad: Registros que caben en la cola antes de descartar
+
+    Returns:
+        ManejadorCola: el manejador instalado (expone `descartados`)
+    """
+    global _bitacora
+    if nivel is None:
+        nivel = os.environ.get("UVSHOP_LOG_NIVEL", NIVEL_DEFECTO)
+    if isinstance(nivel, str):
+        nivel = logging.getLevelName(nivel.upper())
+        if not isinstance(nivel, int):
+            raise ValueError(f"Nivel de log desconocido: {nivel}")
+
+    if _bitacora is None:
+        archivo = archivo or os.environ.get("UVSHOP_LOG_ARCHIVO")
+        if archivo:
+            directorio = os.path.dirname(archivo)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            destino = logging.FileHandler(archivo, encoding="utf-8")
+        else:
+            destino = logging.StreamHandler(sys.stdout)
+        destino.setFormatter(logging.Formatter(formato))
+        manejador = ManejadorCola(queue.Queue(capacidad))
+        oyente = logging.handlers.QueueListener(manejador.queue, destino)
+        oyente.start()
+        atexit.register(detener_bitacora)
+        for paquete in PAQUETES:
+            logger = logging.getLogger(paquete)
+            logger.addHandler(manejador)
+            logger.propagate = False
+        obtener_registro_metricas().derivada(
+            "uvshop_logs_descartados_total", "Registros de log descartados por cola llena",
+            "counter", (), lambda: {(): manejador.descartados}
+        )
+        _bitacora = _Bitacora(manejador, oyente, destino)
+
+    for paquete in PAQUETES:
+        logging.getLogger(paquete).setLevel(nivel)
+    return _bitacora.manejador
+
+
+def detener_bitacora():
+    """Escribe lo pendiente en la cola y detiene el hilo escritor"""
+    global _bitacora
+    if _bitacora is None:
+        return
+    _bitacora.oyente.stop()
+    for paquete in PAQUETES:
+        logging.getLogger(paquete).removeHandler(_bitacora.manejador)
+        logging.getLogger(paquete).propagate = True
+    _bitacora.destino.close()
+    _bitacora = None
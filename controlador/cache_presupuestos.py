@@ -0,0 +1,145 @@
+"""
+CACHE DE PRESUPUESTOS - Memoización de calcular_precio_final
+============================================================
+Al refrescar el checkout se recalcula el mismo precio con los mismos datos.
+El cache guarda el desglose de CalculadorDescuentosAvanzado usando como clave
+(tipo de cliente, beneficios y promociones de segmento, líneas del carrito, envío) y lo descarta
+cuando cambia la versión del catálogo o de los descuentos.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from controlador.contexto_solicitud import ContextoSolicitud
+
+
+class CachePresupuestos:
+    """
+    Cache LRU acotado de presupuestos (cotizaciones de precio).
+    Los resultados se comparten entre llamadas: tratarlos como solo lectura.
+    """
+
+    def __init__(self, calculadora, catalogo=None, capacidad=1024):
+        self.calculadora = calculadora
+        self.catalogo = catalogo
+        self.capacidad = capacidad
+        self._entradas = OrderedDict()  # {clave: (resultado, segundos de cálculo)}
+        self._candado = threading.Lock()
+        self._versiones = self._versiones_actuales()
+        self._aciertos = 0
+        self._fallos = 0
+        self._invalidaciones = 0
+        self._tiempo_ahorrado = 0.0
+        self._tiempo_calculo = 0.0
+
+    def _versiones_actuales(self):
+        return (
+            getattr(self.calculadora.gestor_existente, 'version', 0),
+            getattr(self.catalogo, 'version', 0)
+        )
+
+    def _huella_carrito(self, carrito):
+        """Huella estable de las líneas del carrito (código, precio, cantidad)"""
+        if isinstance(carrito, (int, float)):
+            return ('total', carrito)
+        items = getattr(carrito, 'lista', carrito)
+        return tuple(sorted(
+            (producto.getcodigo(), producto.getprecioUnitario(), cantidad)
+            for producto, cantidad in items.items()
+        ))
+
+    def cotizar(self, usuario_original, carrito, precio_envio, contexto=None):
+        """
+        Retorna el desglose de precio de un carrito, calculándolo solo si
+        no hay una cotización vigente con la misma huella.
+
+        Args:
+            usuario_original: Usuario que cotiza
+            carrito: carrito, dict {producto: cantidad} o precio base
+            precio_envio: Precio del envío
+            contexto: ContextoSolicitud ya resuelto (opcional)
+
+        Returns:
+            dict: Mismo formato que calcular_precio_final
+        """
+        if contexto is None:
+            contexto = ContextoSolicitud.desde_usuario(usuario_original)
+        # Los descuentos vencidos cambian la versión antes de armar la clave
+        actualizar = getattr(self.calculadora.gestor_existente, 'actualizarVigencias', None)
+        if actualizar is not None:
+            actualizar()
+
+        clave = (
+            contexto.tipo_cliente,
+            tuple(sorted(contexto.beneficios_activos)),
+            contexto.promociones_segmento,
+            self._huella_carrito(carrito),
+            precio_envio
+        )
+
+        with self._candado:
+            versiones = self._versiones_actuales()
+            if versiones != self._versiones:
+                self._entradas.clear()
+                self._versiones = versiones
+                self._invalidaciones += 1
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                self._aciertos += 1
+                self._tiempo_ahorrado += entrada[1]
+                return entrada[0]
+            self._fallos += 1
+
+        inicio = time.perf_counter()
+        resultado = self.calculadora.calcular_precio_final(
+            self.calculadora.precio_carrito(carrito), precio_envio, usuario_original, None, contexto
+        )
+        duracion = time.perf_counter() - inicio
+
+        with self._candado:
+            self._tiempo_calculo += duracion
+            # Si las versiones cambiaron durante el cálculo no se guarda
+            if versiones == self._versiones:
+                self._entradas[clave] = (resultado, duracion)
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.capacidad:
+                    self._entradas.popitem(last=False)
+        return resultado
+
+    def invalidar(self):
+        """Vacía el cache manualmente"""
+        with self._candado:
+            self._entradas.clear()
+            self._invalidaciones += 1
+
+    def obtener_metricas(self):
+        """Aciertos, fallos, tasa de aciertos y tiempo de cálculo ahorrado"""
+        with self._candado:
+            consultas = self._aciertos + self._fallos
+            return {
+                'aciertos': self._aciertos,
+                'fallos': self._fallos,
+                'tasa_aciertos': self._aciertos / consultas if consultas else 0.0,
+                'entradas': len(self._entradas),
+                'capacidad': self.capacidad,
+                'invalidaciones': self._invalidaciones,
+                'tiempo_calculo_s': self._tiempo_calculo,
+                'tiempo_ahorrado_s': self._tiempo_ahorrado
+            }
+
+
+def crear_cache_presupuestos(calculadora, catalogo=None, capacidad=1024):
+    """
+    Factory function para crear el cache de presupuestos.
+
+    Args:
+        calculadora: CalculadorDescuentosAvanzado (idealmente silencioso)
+        catalogo: inventario cuya versión invalida el cache (opcional)
+        capacidad: Máximo de cotizaciones guardadas
+
+    Returns:
+        CachePresupuestos: Instancia configurada
+    """
+    return CachePresupuestos(calculadora, catalogo, capacidad)
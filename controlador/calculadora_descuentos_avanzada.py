@@ -5,24 +5,32 @@ Caso de Uso 4: Cálculo automático de descuentos según tipo de cliente.
 Extiende gestionDescuentos existente sin modificarlo.
 """
 
+import logging
+
 from controlador.sistema_beneficios import obtener_gestor_beneficios, ClienteBase
+from controlador.contexto_solicitud import ContextoSolicitud
+
+_log = logging.getLogger(__name__)
 
 
 class CalculadorDescuentosAvanzado:
     """
     Calculadora avanzada que extiende el sistema de descuentos existente.
     Integra con el sistema de beneficios dinámicos.
+    Los resúmenes se registran en la bitácora (INFO); en modo silencioso, o
+    con un nivel mayor, ni siquiera se arman y solo se retornan los diccionarios.
     """
     
-    def __init__(self, gestor_descuentos_existente):
+    def __init__(self, gestor_descuentos_existente, silencioso=False):
         self.gestor_existente = gestor_descuentos_existente
+        self.silencioso = silencioso
         self.descuentos_automaticos = {
             'nuevo': {'porcentaje': 5, 'envio_gratis': False},
             'frecuente': {'porcentaje': 10, 'envio_gratis': False},
             'vip': {'porcentaje': 15, 'envio_gratis': True}
         }
     
-    def calcular_descuentos_completos(self, usuario_original, beneficios_temporales=None):
+    def calcular_descuentos_completos(self, usuario_original, beneficios_temporales=None, contexto=None):
         """
         Calcula descuentos completos combinando:
         1. Sistema existente (gestionDescuentos)
@@ -32,32 +40,54 @@ class CalculadorDescuentosAvanzado:
         Args:
             usuario_original: Instancia de usuario existente
             beneficios_temporales: Lista de beneficios adicionales
+            contexto: ContextoSolicitud ya resuelto (evita volver a buscar al usuario)
         
         Returns:
             dict: Información completa de descuentos
         """
-        print(f"\n💰 CALCULANDO DESCUENTOS PARA: {usuario_original.getnombre()}")
-        print("=" * 50)
+        if contexto is None:
+            contexto = ContextoSolicitud.desde_usuario(usuario_original)
+        
+        detallar = self._detallar()
         
-        # 1. Descuentos del sistema existente
-        descuentos_existentes = self.gestor_existente.calcularDescuentos(usuario_original.getidUsuario())
-        print(f"📊 Sistema existente: {descuentos_existentes}")
+        # 1. Descuentos del sistema existente (por tipo, sin volver a buscar al usuario)
+        descuentos_existentes = self.gestor_existente.calcularDescuentosTipo(contexto.tipo_cliente)
+        if detallar:
+            _log.info("💰 CALCULANDO DESCUENTOS PARA: %s | 📊 Sistema existente: %s",
+                      usuario_original.getnombre(), descuentos_existentes)
         
         # 2. Crear cliente con beneficios dinámicos
         gestor_beneficios = obtener_gestor_beneficios()
         cliente_mejorado = ClienteBase(usuario_original)
         
+        # Promociones del segmento del cliente (reglas por tipo, evaluadas ahora)
+        for promocion in contexto.promociones_segmento:
+            cliente_mejorado = gestor_beneficios.construir_promocion(cliente_mejorado, promocion)
+        
         # Aplicar beneficios temporales si existen
         if beneficios_temporales:
             for beneficio in beneficios_temporales:
                 cliente_mejorado = gestor_beneficios.aplicar_beneficio_temporal(
                     usuario_original, 
                     beneficio['tipo'], 
+                    silencioso=self.silencioso,
                     **beneficio.get('parametros', {})
                 )
         
+        resultado = self._combinar_descuentos(contexto.tipo_cliente, descuentos_existentes, cliente_mejorado)
+        
+        if detallar:
+            self._mostrar_resumen_descuentos(resultado)
+        return resultado
+    
+    def _detallar(self):
+        """True si hay que armar los resúmenes (no silencioso y la bitácora acepta INFO)"""
+        return not self.silencioso and _log.isEnabledFor(logging.INFO)
+    
+    def _combinar_descuentos(self, tipo_cliente, descuentos_existentes, cliente_mejorado):
+        """Combina sistema existente, automáticos por tipo y beneficios en un dict"""
         # 3. Calcular descuentos automáticos por tipo
-        tipo_cliente = usuario_original.getTipoCliente().lower()
+        tipo_cliente = tipo_cliente.lower()
         descuentos_auto = self.descuentos_automaticos.get(tipo_cliente, {'porcentaje': 0, 'envio_gratis': False})
         
         # 4. Combinar todos los descuentos
@@ -101,25 +131,27 @@ class CalculadorDescuentosAvanzado:
             for desc in descuentos_existentes[2]:
                 resultado['descuentos_aplicados'].append(f"Descuento especial: {desc}")
         
-        self._mostrar_resumen_descuentos(resultado)
         return resultado
     
     def _mostrar_resumen_descuentos(self, resultado):
-        """Muestra resumen visual de descuentos"""
-        print(f"\n🎯 RESUMEN DE DESCUENTOS")
-        print(f"👤 Cliente: {resultado['tipo_cliente']}")
-        print(f"💸 Descuento total: {resultado['descuento_porcentaje']}%")
-        print(f"🚚 Envío gratis: {'✅ Sí' if resultado['envio_gratis'] else '❌ No'}")
-        print(f"💰 Cashback: {resultado['cashback_porcentaje']}%")
+        """Registra el resumen visual de descuentos (un solo registro INFO)"""
+        lineas = [
+            "🎯 RESUMEN DE DESCUENTOS",
+            f"👤 Cliente: {resultado['tipo_cliente']}",
+            f"💸 Descuento total: {resultado['descuento_porcentaje']}%",
+            f"🚚 Envío gratis: {'✅ Sí' if resultado['envio_gratis'] else '❌ No'}",
+            f"💰 Cashback: {resultado['cashback_porcentaje']}%"
+        ]
         
         if resultado['descuentos_aplicados']:
-            print(f"📋 Beneficios aplicados:")
+            lineas.append("📋 Beneficios aplicados:")
             for desc in resultado['descuentos_aplicados']:
-                print(f"   • {desc}")
+                lineas.append(f"   • {desc}")
         
-        print("=" * 50)
+        lineas.append("=" * 50)
+        _log.info("%s", "\n".join(lineas))
     
-    def calcular_precio_final(self, precio_base, precio_envio, usuario_original, beneficios_temporales=None):
+    def calcular_precio_final(self, precio_base, precio_envio, usuario_original, beneficios_temporales=None, contexto=None):
         """
         Calcula el precio final aplicando todos los descuentos.
         
@@ -128,12 +160,65 @@ class CalculadorDescuentosAvanzado:
             precio_envio: Precio del envío
             usuario_original: Usuario que realiza la compra
             beneficios_temporales: Beneficios adicionales temporales
+            contexto: ContextoSolicitud ya resuelto (opcional)
         
         Returns:
             dict: Desglose completo del precio final
         """
-        descuentos = self.calcular_descuentos_completos(usuario_original, beneficios_temporales)
+        descuentos = self.calcular_descuentos_completos(usuario_original, beneficios_temporales, contexto)
+        resultado_precio = self._desglosar_precio(precio_base, precio_envio, descuentos)
+        
+        if self._detallar():
+            self._mostrar_desglose_precio(resultado_precio)
+        return resultado_precio
+    
+    def calcular_precios_lote(self, usuarios, carritos, precios_envio=0):
+        """
+        Calcula el precio final de muchos carritos en una sola pasada.
+        Los descuentos se calculan una vez por tipo de cliente (y promociones de
+        segmento que le apliquen) y se comparten entre esos carritos (no se imprime nada).
+        
+        Args:
+            usuarios: Lista de usuarios, uno por carrito
+            carritos: Lista de carritos (carrito, dict {producto: cantidad} o precio base)
+            precios_envio: Precio de envío único o lista con uno por carrito
+        
+        Returns:
+            list: Desglose de precio por carrito, en el mismo orden.
+                  'descuentos_info' es compartido por tipo de cliente (solo lectura).
+        """
+        if not isinstance(precios_envio, (list, tuple)):
+            precios_envio = [precios_envio] * len(carritos)
         
+        gestor_beneficios = obtener_gestor_beneficios()
+        descuentos_por_tipo = {}
+        resultados = []
+        for usuario_original, carrito, precio_envio in zip(usuarios, carritos, precios_envio, strict=True):
+            tipo_cliente = usuario_original.getTipoCliente()
+            promociones = gestor_beneficios.promociones_para(usuario_original.getidUsuario(), tipo_cliente)
+            descuentos = descuentos_por_tipo.get((tipo_cliente, promociones))
+            if descuentos is None:
+                cliente_mejorado = ClienteBase(usuario_original)
+                for promocion in promociones:
+                    cliente_mejorado = gestor_beneficios.construir_promocion(cliente_mejorado, promocion)
+                descuentos = self._combinar_descuentos(
+                    tipo_cliente,
+                    self.gestor_existente.calcularDescuentosTipo(tipo_cliente),
+                    cliente_mejorado
+                )
+                descuentos_por_tipo[(tipo_cliente, promociones)] = descuentos
+            resultados.append(self._desglosar_precio(self.precio_carrito(carrito), precio_envio, descuentos))
+        return resultados
+    
+    def precio_carrito(self, carrito):
+        """Precio base de un carrito (objeto carrito, dict de productos o número)"""
+        if isinstance(carrito, (int, float)):
+            return carrito
+        items = getattr(carrito, 'lista', carrito)
+        return sum(producto.getprecioUnitario() * cantidad for producto, cantidad in items.items())
+    
+    def _desglosar_precio(self, precio_base, precio_envio, descuentos):
+        """Aplica descuentos, envío gratis y cashback a un precio base"""
         # Aplicar descuento al precio base
         precio_con_descuento = precio_base * descuentos['descuento_multiplicador']
         descuento_aplicado = precio_base - precio_con_descuento
@@ -157,27 +242,28 @@ class CalculadorDescuentosAvanzado:
             'precio_neto_final': precio_total - cashback_cantidad,
             'descuentos_info': descuentos
         }
-        
-        self._mostrar_desglose_precio(resultado_precio)
         return resultado_precio
     
     def _mostrar_desglose_precio(self, resultado):
-        """Muestra desglose visual del precio"""
-        print(f"\n💳 DESGLOSE DE PRECIO")
-        print("=" * 40)
-        print(f"💵 Precio original:     ${resultado['precio_original']:.2f}")
-        print(f"💸 Descuento aplicado: -${resultado['descuento_cantidad']:.2f}")
-        print(f"💰 Precio con descuento: ${resultado['precio_con_descuento']:.2f}")
-        print(f"🚚 Envío original:      ${resultado['precio_envio_original']:.2f}")
+        """Registra el desglose visual del precio (un solo registro INFO)"""
+        lineas = [
+            "💳 DESGLOSE DE PRECIO",
+            "=" * 40,
+            f"💵 Precio original:     ${resultado['precio_original']:.2f}",
+            f"💸 Descuento aplicado: -${resultado['descuento_cantidad']:.2f}",
+            f"💰 Precio con descuento: ${resultado['precio_con_descuento']:.2f}",
+            f"🚚 Envío original:      ${resultado['precio_envio_original']:.2f}"
+        ]
         if resultado['ahorro_envio'] > 0:
-            print(f"🎁 Ahorro envío gratis: -${resultado['ahorro_envio']:.2f}")
-        print(f"🚚 Envío final:         ${resultado['precio_envio_final']:.2f}")
-        print("─" * 40)
-        print(f"💳 TOTAL A PAGAR:       ${resultado['precio_total']:.2f}")
+            lineas.append(f"🎁 Ahorro envío gratis: -${resultado['ahorro_envio']:.2f}")
+        lineas.append(f"🚚 Envío final:         ${resultado['precio_envio_final']:.2f}")
+        lineas.append("─" * 40)
+        lineas.append(f"💳 TOTAL A PAGAR:       ${resultado['precio_total']:.2f}")
         if resultado['cashback_cantidad'] > 0:
-            print(f"💰 Cashback a recibir:   ${resultado['cashback_cantidad']:.2f}")
-            print(f"🎯 Precio neto final:    ${resultado['precio_neto_final']:.2f}")
-        print("=" * 40)
+            lineas.append(f"💰 Cashback a recibir:   ${resultado['cashback_cantidad']:.2f}")
+            lineas.append(f"🎯 Precio neto final:    ${resultado['precio_neto_final']:.2f}")
+        lineas.append("=" * 40)
+        _log.info("%s", "\n".join(lineas))
 
 
 class PromotorDescuentosAutomatico:
@@ -185,8 +271,10 @@ class PromotorDescuentosAutomatico:
     Promociona descuentos automáticamente según reglas de negocio.
     """
     
-    def __init__(self, calculadora_descuentos):
+    def __init__(self, calculadora_descuentos, silencioso=None):
         self.calculadora = calculadora_descuentos
+        # Por defecto hereda el modo de la calculadora
+        self.silencioso = calculadora_descuentos.silencioso if silencioso is None else silencioso
         self.reglas_promocion = {
             'upgrade_a_frecuente': {'compras_minimas': 3, 'beneficio': 'descuento_extra'},
             'upgrade_a_vip': {'compras_minimas': 10, 'beneficio': 'vip_mejorado'},
@@ -207,7 +295,6 @@ class PromotorDescuentosAutomatico:
         tipo_cliente = usuario_original.getTipoCliente().lower()
         
         # Simulación de reglas de negocio
-        print(f"\n🔍 EVALUANDO PROMOCIONES PARA: {usuario_original.getnombre()}")
         
         # Regla 1: Cliente nuevo con primera compra grande
         if tipo_cliente == 'nuevo':
@@ -238,25 +325,28 @@ class PromotorDescuentosAutomatico:
                 'razon': 'VIP Premium temporal'
             })
         
-        # Mostrar promociones encontradas
+        # Registrar promociones encontradas
+        if self.silencioso or not _log.isEnabledFor(logging.INFO):
+            return beneficios_sugeridos
+        
         if beneficios_sugeridos:
-            print("🎉 PROMOCIONES DISPONIBLES:")
-            for i, beneficio in enumerate(beneficios_sugeridos, 1):
-                print(f"   {i}. {beneficio['razon']} - {beneficio['tipo']}")
+            _log.info("🔍 %s - 🎉 PROMOCIONES DISPONIBLES: %s", usuario_original.getnombre(),
+                      ", ".join(f"{beneficio['razon']} ({beneficio['tipo']})" for beneficio in beneficios_sugeridos))
         else:
-            print("📋 No hay promociones adicionales disponibles")
+            _log.info("🔍 %s - 📋 No hay promociones adicionales disponibles", usuario_original.getnombre())
         
         return beneficios_sugeridos
 
 
-def crear_calculadora_descuentos_avanzada(gestor_descuentos_existente):
+def crear_calculadora_descuentos_avanzada(gestor_descuentos_existente, silencioso=False):
     """
     Factory function para crear la calculadora avanzada de descuentos.
     
     Args:
         gestor_descuentos_existente: Instancia del gestionDescuentos actual
+        silencioso: True para no registrar resúmenes (uso en producción)
     
     Returns:
         CalculadorDescuentosAvanzado: Instancia configurada
     """
-    return CalculadorDescuentosAvanzado(gestor_descuentos_existente)
+    return CalculadorDescuentosAvanzado(gestor_descuentos_existente, silencioso)
@@ -0,0 +1,73 @@
+"""
+CONTEXTO DE SOLICITUD - Resolución única del usuario por pedido
+===============================================================
+Un pedido pasa por varios componentes de precios y descuentos que antes
+buscaban al mismo usuario cada uno por su cuenta (proxy -> bd).
+El contexto resuelve una sola vez el usuario, su tipo de cliente y sus
+beneficios activos, y se entrega a cada componente que lo necesite.
+"""
+
+from controlador.sistema_beneficios import obtener_gestor_beneficios
+
+
+def desempaquetar_respuesta(respuesta):
+    """
+    Normaliza la respuesta de buscarUsuario o recuperarPedido.
+    El proxy devuelve (valor, codigo) y la bd devuelve (objeto, 200) o 404,
+    por lo que se quitan las tuplas hasta llegar al objeto (o None si es un codigo de error).
+    """
+    while isinstance(respuesta, tuple):
+        respuesta = respuesta[0]
+    if respuesta is None or isinstance(respuesta, int):
+        return None
+    return respuesta
+
+
+class ContextoSolicitud:
+    """
+    Datos del usuario resueltos una única vez por solicitud.
+    Se pasa a gestionDescuentos, gestionPedidosUsuarios y
+    CalculadorDescuentosAvanzado para evitar búsquedas repetidas.
+    """
+
+    def __init__(self, idUsuario, usuario, beneficios_activos=(), promociones_segmento=()):
+        self.idUsuario = idUsuario
+        self.usuario = usuario
+        self.tipo_cliente = usuario.getTipoCliente() if usuario is not None else None
+        self.beneficios_activos = tuple(beneficios_activos)
+        # Promociones otorgadas al segmento (tipo de cliente) del usuario
+        self.promociones_segmento = tuple(promociones_segmento)
+
+    @classmethod
+    def resolver(cls, datos, idUsuario, gestor_beneficios=None):
+        """
+        Busca al usuario una sola vez en la capa de datos.
+
+        Args:
+            datos: proxy o bd con el método buscarUsuario
+            idUsuario: id del usuario de la solicitud
+            gestor_beneficios: GestorBeneficios (por defecto el global)
+
+        Returns:
+            ContextoSolicitud: contexto resuelto (usuario None si no existe)
+        """
+        usuario = desempaquetar_respuesta(datos.buscarUsuario(idUsuario))
+        if usuario is None:
+            return cls(idUsuario, None)
+        return cls.desde_usuario(usuario, gestor_beneficios)
+
+    @classmethod
+    def desde_usuario(cls, usuario, gestor_beneficios=None):
+        """Crea el contexto a partir de un usuario ya resuelto (sin búsqueda)"""
+        if gestor_beneficios is None:
+            gestor_beneficios = obtener_gestor_beneficios()
+        idUsuario = usuario.getidUsuario()
+        return cls(
+            idUsuario, usuario,
+            gestor_beneficios.listar_beneficios_activos(idUsuario),
+            gestor_beneficios.promociones_para(idUsuario, usuario.getTipoCliente())
+        )
+
+    def existe(self):
+        """True si el usuario de la solicitud existe"""
+        return self.usuario is not None
@@ -0,0 +1,236 @@
+"""
+CORTACIRCUITOS DE PAGOS - Plazos por llamada y fallo rápido
+===========================================================
+Las fábricas de FabricaDePagos entregan proveedores que pueden bloquearse sin
+límite: si una pasarela se pone lenta, todos los trabajadores quedan esperando.
+Cada proveedor se envuelve con:
+- un plazo por llamada (504 si se supera)
+- un cortacircuitos cerrado / abierto / semiabierto según la tasa de fallos
+  reciente; mientras está abierto se responde 503 sin llamar a la pasarela
+Un rechazo de la pasarela (400) es una respuesta sana y no cuenta como fallo;
+sí cuentan las excepciones, los plazos vencidos y los códigos 5xx.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TimeoutFuturo
+
+from controlador.pagar import pagar, FabricaDePagos, fabricaPorTipo
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class CortaCircuitos:
+    """Estado del circuito de una pasarela y sus métricas"""
+
+    def __init__(self, nombre, umbral_fallos=0.5, minimo_llamadas=20, ventana=50,
+                 tiempo_abierto=5.0, pruebas_semiabierto=3, reloj=time.monotonic):
+        """
+        Args:
+            nombre: Nombre de la pasarela protegida
+            umbral_fallos: Tasa de fallos en la ventana que abre el circuito
+            minimo_llamadas: Llamadas mínimas en la ventana antes de evaluar
+            ventana: Cantidad de llamadas recientes consideradas
+            tiempo_abierto: Segundos en abierto antes de probar (semiabierto)
+            pruebas_semiabierto: Éxitos seguidos en semiabierto para cerrar
+            reloj: Fuente de tiempo (reemplazable en simulaciones)
+        """
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.minimo_llamadas = minimo_llamadas
+        self.tiempo_abierto = tiempo_abierto
+        self.pruebas_semiabierto = pruebas_semiabierto
+        self.reloj = reloj
+        self.estado = CERRADO
+        self._resultados = deque(maxlen=ventana)  # True = fallo
+        self._fallos_en_ventana = 0
+        self._abierto_desde = 0.0
+        self._prueba_en_curso = False
+        self._exitos_semiabierto = 0
+        self._candado = threading.Lock()
+        self._duraciones = deque(maxlen=1000)
+        self.llamadas = 0
+        self.exitos = 0
+        self.fallos = 0
+        self.plazos_vencidos = 0
+        self.rechazos_rapidos = 0
+        self.aperturas = 0
+
+    def permitir(self):
+        """True si la llamada puede ir a la pasarela; False = fallo rápido"""
+        with self._candado:
+            if self.estado == ABIERTO:
+                if self.reloj() - self._abierto_desde < self.tiempo_abierto:
+                    self.rechazos_rapidos += 1
+                    return False
+                self.estado = SEMIABIERTO
+                self._exitos_semiabierto = 0
+                self._prueba_en_curso = False
+            if self.estado == SEMIABIERTO:
+                # Una sola llamada de prueba a la vez
+                if self._prueba_en_curso:
+                    self.rechazos_rapidos += 1
+                    return False
+                self._prueba_en_curso = True
+            self.llamadas += 1
+            return True
+
+    def registrar(self, fallo, duracion, plazo_vencido=False):
+        """Registra el resultado de una llamada permitida"""
+        with self._candado:
+            self._duraciones.append(duracion)
+            if plazo_vencido:
+                self.plazos_vencidos += 1
+            if fallo:
+                self.fallos += 1
+            else:
+                self.exitos += 1
+
+            if self.estado == SEMIABIERTO:
+                self._prueba_en_curso = False
+                if fallo:
+                    self._abrir()
+                else:
+                    self._exitos_semiabierto += 1
+                    if self._exitos_semiabierto >= self.pruebas_semiabierto:
+                        self.estado = CERRADO
+                        self._resultados.clear()
+                        self._fallos_en_ventana = 0
+                return
+
+            if len(self._resultados) == self._resultados.maxlen and self._resultados[0]:
+                self._fallos_en_ventana -= 1
+            self._resultados.append(fallo)
+            self._fallos_en_ventana += fallo
+            if (self.estado == CERRADO and len(self._resultados) >= self.minimo_llamadas
+                    and self._fallos_en_ventana / len(self._resultados) >= self.umbral_fallos):
+                self._abrir()
+
+    def _abrir(self):
+        self.estado = ABIERTO
+        self._abierto_desde = self.reloj()
+        self.aperturas += 1
+
+    def obtener_metricas(self):
+        """Estado del circuito, contadores y tiempos de llamada (ms)"""
+        with self._candado:
+            duraciones = sorted(self._duraciones)
+            metricas = {
+                'pasarela': self.nombre,
+                'estado': self.estado,
+                'llamadas': self.llamadas,
+                'exitos': self.exitos,
+                'fallos': self.fallos,
+                'plazos_vencidos': self.plazos_vencidos,
+                'rechazos_rapidos': self.rechazos_rapidos,
+                'aperturas': self.aperturas,
+                'tasa_fallos_ventana': (self._fallos_en_ventana / len(self._resultados)
+                                        if self._resultados else 0.0)
+            }
+        if duraciones:
+            metricas['duracion_promedio_ms'] = sum(duraciones) / len(duraciones) * 1000
+            metricas['duracion_p99_ms'] = duraciones[min(len(duraciones) - 1, int(0.99 * len(duraciones)))] * 1000
+        else:
+            metricas['duracion_promedio_ms'] = metricas['duracion_p99_ms'] = 0.0
+        return metricas
+
+
+class PasarelaProtegida(pagar):
+    """Envuelve un método de pago con plazo por llamada y cortacircuitos"""
+
+    # Hilos para aplicar plazos a métodos que solo son sincronos
+    _ejecutor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="pasarela-plazo")
+
+    def __init__(self, metodo, circuito, plazo):
+        self.metodo = metodo
+        self.circuito = circuito
+        self.plazo = plazo
+
+    def _es_fallo(self, resultado):
+        return not isinstance(resultado, int) or resultado >= 500
+
+    async def procesarPagoAsync(self, monto, usuario):
+        if not self.circuito.permitir():
+            return 503
+        inicio = time.perf_counter()
+        try:
+            procesar_async = getattr(self.metodo, 'procesarPagoAsync', None)
+            if procesar_async is not None:
+                llamada = procesar_async(monto, usuario)
+            else:
+                llamada = asyncio.to_thread(self.metodo.procesarPago, monto, usuario)
+            resultado = await asyncio.wait_for(llamada, self.plazo)
+        except asyncio.TimeoutError:
+            self.circuito.registrar(True, time.perf_counter() - inicio, plazo_vencido=True)
+            return 504
+        except asyncio.CancelledError:
+            # Liberar la prueba de semiabierto antes de propagar la cancelación
+            self.circuito.registrar(True, time.perf_counter() - inicio)
+            raise
+        except Exception:
+            self.circuito.registrar(True, time.perf_counter() - inicio)
+            return 502
+        self.circuito.registrar(self._es_fallo(resultado), time.perf_counter() - inicio)
+        return resultado
+
+    def procesarPago(self, monto, usuario):
+        if not self.circuito.permitir():
+            return 503
+        inicio = time.perf_counter()
+        futuro = self._ejecutor.submit(self.metodo.procesarPago, monto, usuario)
+        try:
+            resultado = futuro.result(timeout=self.plazo)
+        except TimeoutFuturo:
+            # La llamada sigue en su hilo, pero el llamador queda libre
+            self.circuito.registrar(True, time.perf_counter() - inicio, plazo_vencido=True)
+            return 504
+        except Exception:
+            self.circuito.registrar(True, time.perf_counter() - inicio)
+            return 502
+        self.circuito.registrar(self._es_fallo(resultado), time.perf_counter() - inicio)
+        return resultado
+
+
+class FabricaProtegida(FabricaDePagos):
+    """Fábrica que envuelve otra fábrica con el cortacircuitos de su pasarela"""
+
+    def __init__(self, fabrica, circuito, plazo=2.0):
+        self.fabrica = fabrica
+        self.circuito = circuito
+        self.plazo = plazo
+
+    def crearMetodoPago(self) -> pagar:
+        return PasarelaProtegida(self.fabrica.crearMetodoPago(), self.circuito, self.plazo)
+
+
+# Un cortacircuitos por tipo de pago, compartido por todas las llamadas
+_circuitos = {}
+_candado_circuitos = threading.Lock()
+
+
+def obtener_circuito(tipoPago, **opciones_circuito):
+    """Cortacircuitos de un tipo de pago (se crea en el primer uso)"""
+    with _candado_circuitos:
+        circuito = _circuitos.get(tipoPago)
+        if circuito is None:
+            circuito = _circuitos[tipoPago] = CortaCircuitos(tipoPago, **opciones_circuito)
+        return circuito
+
+
+def obtener_fabrica_protegida(tipoPago, plazo=2.0):
+    """Fábrica del tipo de pago envuelta con plazo y cortacircuitos, o None si no existe"""
+    fabrica = fabricaPorTipo(tipoPago)
+    if fabrica is None:
+        return None
+    return FabricaProtegida(fabrica, obtener_circuito(tipoPago), plazo)
+
+
+def obtener_metricas_pasarelas():
+    """Métricas del cortacircuitos de cada pasarela usada"""
+    with _candado_circuitos:
+        circuitos = list(_circuitos.values())
+    return {circuito.nombre: circuito.obtener_metricas() for circuito in circuitos}
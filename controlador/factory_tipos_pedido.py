@@ -5,10 +5,13 @@ Caso de Uso 2: Nuevos tipos de pedido con reglas específicas sin modificar cód
 Extiende las clases de pedido existentes usando Factory Pattern.
 """
 
+import logging
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
 from modelo.pedido import pedido, internacional, programado, express, estandar
 
+_log = logging.getLogger(__name__)
+
 
 class TipoPedidoExtendido(ABC):
     """
@@ -352,7 +355,7 @@ class FactoryTiposPedido:
         
         if not tipo_clase:
             # Fallback a estándar si el tipo no existe
-            print(f"⚠️ Tipo '{tipo_envio}' no reconocido, usando estándar")
+            _log.warning("⚠️ Tipo '%s' no reconocido, usando estándar", tipo_envio)
             tipo_clase = PedidoEstandarExtendido
         
         # Crear instancia con parámetros específicos
@@ -373,7 +376,7 @@ class FactoryTiposPedido:
             clase_tipo: Clase que implementa TipoPedidoExtendido
         """
         cls._tipos_registrados[nombre_tipo.lower()] = clase_tipo
-        print(f"✅ Nuevo tipo de pedido registrado: {nombre_tipo}")
+        _log.info("✅ Nuevo tipo de pedido registrado: %s", nombre_tipo)
     
     @classmethod
     def obtener_tipos_disponibles(cls):
@@ -13,12 +13,19 @@ Clientes
 ○ Frecuente: 10%.
 ○ VIP: 15% + envío gratis.
 """
+import logging
+import threading
+import time
+from controlador.contexto_solicitud import ContextoSolicitud
+from controlador.indice_vigencia import IndiceVigencia
+
+_log = logging.getLogger(__name__)
 
 
 class gestionDescuentos:
     _instancia = None
 
-    def __new__(cls):
+    def __new__(cls, *args, **kwargs):
         if cls._instancia is None:
             cls._instancia = super().__new__(cls)
         return cls._instancia
@@ -29,11 +36,29 @@ class gestionDescuentos:
         self.listaN = {}
         self.listaF = {}
         self.listaV = {}
-    def calcularDescuentosTipoCliente(self, idUsuario):
-        usuario = self.datos.buscarUsuario(idUsuario)
+        #cache por tipo de cliente: (multiplicador, nombres aplicados)
+        #solo cambia con nuevoDescuento/quitarDescuento, asi cada pedido es O(1)
+        self.compilados = {}
+        self.candado = threading.Lock()
+        #aumenta con cada cambio de descuentos, lo usan los caches de precios
+        self.version = 0
+        #ventanas de vigencia de los descuentos por tiempo limitado
+        #las listas solo contienen los descuentos vigentes
+        self.vigencias = IndiceVigencia()
+        self.proximoCambio = self.vigencias.proximo_cambio()
+        for tipo in ("nuevo", "frecuente", "vip"):
+            self.compilados[tipo] = self.compilarDescuentos(tipo)
+    #contexto: ContextoSolicitud ya resuelto, si no viene se busca el usuario una sola vez
+    def calcularDescuentosTipoCliente(self, idUsuario, contexto=None):
+        if contexto is None:
+            contexto = ContextoSolicitud.resolver(self.datos, idUsuario)
+        usuario = contexto.usuario
+        _log.debug("tipo : %s", usuario.getTipoCliente())
+        return self.descuentoBaseTipo(usuario.getTipoCliente())
+    #[multiplicador, envio gratis, aplicados] segun el tipo de cliente
+    def descuentoBaseTipo(self, tipoCliente):
         descuento = [1, 0, 0]
-        print(f"tipo : {usuario.getTipoCliente()}")
-        match usuario.getTipoCliente():
+        match tipoCliente:
             case "nuevo":
                 descuento[0] = 0.95
             case "frecuente":
@@ -42,22 +67,80 @@ class gestionDescuentos:
                 descuento[0] = 0.85
                 descuento[1] = 1
         return descuento
-    def nuevoDescuento(self, nombre, descuento,tipoCliente):
-        match tipoCliente:
-            case "nuevo":
-                self.listaN[nombre] = descuento
-            case "frecuente":
-                self.listaF[nombre] = descuento
-            case "vip":
-                self.listaV[nombre] = descuento
+    #inicio y fin (segundos epoch o datetime) limitan la vigencia del descuento
+    #sin ventana el descuento queda activo hasta que se llame a quitarDescuento
+    def nuevoDescuento(self, nombre, descuento,tipoCliente, inicio=None, fin=None):
+        lista = self.listaTipo(tipoCliente)
+        if lista is None:
+            return
+        with self.candado:
+            #los bordes ya ocurridos se aplican antes de agregar, si no se perderian
+            tipos = self._aplicarTransiciones(*self.vigencias.avanzar())
+            if self.vigencias.agregar((tipoCliente, nombre), descuento, inicio, fin):
+                lista[nombre] = descuento
+            else:
+                lista.pop(nombre, None)
+            tipos.add(tipoCliente)
+            for tipo in tipos:
+                self.recompilar(tipo)
+            self.proximoCambio = self.vigencias.proximo_cambio()
     def quitarDescuento(self, nombre,tipoCliente):
+        lista = self.listaTipo(tipoCliente)
+        if lista is None:
+            return
+        with self.candado:
+            programado = self.vigencias.quitar((tipoCliente, nombre))
+            if nombre in lista or not programado:
+                del lista[nombre]
+            self.recompilar(tipoCliente)
+            self.proximoCambio = self.vigencias.proximo_cambio()
+    #aplica los inicios y vencimientos ocurridos hasta t
+    #si no hay ningun borde pendiente es solo una comparacion
+    def actualizarVigencias(self, t=None):
+        t = time.time() if t is None else t
+        if t < self.proximoCambio:
+            return
+        with self.candado:
+            for tipoCliente in self._aplicarTransiciones(*self.vigencias.avanzar(t)):
+                self.recompilar(tipoCliente)
+            self.proximoCambio = self.vigencias.proximo_cambio()
+    #pasa a las listas los descuentos que empezaron o vencieron (con el candado tomado)
+    #retorna los tipos de cliente que hay que recompilar
+    def _aplicarTransiciones(self, activadas, retiradas):
+        tipos = set()
+        for tipoCliente, nombre in activadas:
+            self.listaTipo(tipoCliente)[nombre] = self.vigencias.obtener((tipoCliente, nombre))
+            tipos.add(tipoCliente)
+        for tipoCliente, nombre in retiradas:
+            self.listaTipo(tipoCliente).pop(nombre, None)
+            tipos.add(tipoCliente)
+        return tipos
+    def listaTipo(self, tipoCliente):
         match tipoCliente:
             case "nuevo":
-                del self.listaN[nombre]
+                return self.listaN
             case "frecuente":
-                del self.listaF[nombre]
+                return self.listaF
             case "vip":
-                del self.listaV[nombre]
+                return self.listaV
+        return None
+    #multiplicador total y tupla de nombres (incluye el descuento base del tipo)
+    def compilarDescuentos(self, tipoCliente):
+        lista = self.listaTipo(tipoCliente)
+        if lista is None:
+            return None
+        calcularlista = self.calcularLista(lista)
+        aplicados = tuple(calcularlista[1]) + (f"cliente {tipoCliente}",)
+        return (calcularlista[0], aplicados)
+    #se reemplaza la entrada completa de una vez, los lectores ven la version
+    #anterior o la nueva, nunca una mezcla
+    def recompilar(self, tipoCliente):
+        compilado = self.compilarDescuentos(tipoCliente)
+        if compilado is not None:
+            self.compilados[tipoCliente] = compilado
+            self.version += 1
+    def obtenerCompilado(self, tipoCliente):
+        return self.compilados.get(tipoCliente)
     def calcularLista(self,lista):
         variable = 1
         aplicados = []
@@ -66,28 +149,21 @@ class gestionDescuentos:
             aplicados.append(llave)
         return [variable, aplicados]
 
-    def calcularDescuentos(self, idUsuario):
-        usuario = self.datos.buscarUsuario(idUsuario)
-        descuentos = [0,0,0]
-        descuentos = self.calcularDescuentosTipoCliente(idUsuario)
-        match usuario.getTipoCliente():
-            # todo implementar bien
-            #funciona con el codigo ya existente pero xd
-            case "nuevo":
-                calcularlista = self.calcularLista(self.listaN)
-                descuentos[0]= descuentos[0] * calcularlista[0]
-                descuentos[2] = calcularlista[1]
-                descuentos[2].append("cliente nuevo")
-            case "frecuente":
-                calcularlista = self.calcularLista(self.listaF)
-                descuentos[0]= descuentos[0] * calcularlista[0]
-                descuentos[2] = calcularlista[1]
-                descuentos[2].append("cliente frecuente")
-            case "vip":
-                calcularlista = self.calcularLista(self.listaV)
-                descuentos[0]= descuentos[0] * calcularlista[0]
-                descuentos[2] = calcularlista[1]
-                descuentos[2].append("cliente vip")
+    def calcularDescuentos(self, idUsuario, contexto=None):
+        if contexto is None:
+            contexto = ContextoSolicitud.resolver(self.datos, idUsuario)
+        _log.debug("tipo : %s", contexto.tipo_cliente)
+        return self.calcularDescuentosTipo(contexto.tipo_cliente)
+    #igual que calcularDescuentos pero solo con el tipo de cliente:
+    #sin buscar al usuario y sin imprimir, sirve para calcular por lotes
+    def calcularDescuentosTipo(self, tipoCliente):
+        self.actualizarVigencias()
+        descuentos = self.descuentoBaseTipo(tipoCliente)
+        #descuentos[2] es una tupla compartida, no se debe modificar
+        compilado = self.obtenerCompilado(tipoCliente)
+        if compilado is not None:
+            descuentos[0]= descuentos[0] * compilado[0]
+            descuentos[2] = compilado[1]
         return descuentos
 """
 datos = bd()
@@ -1,9 +1,10 @@
 from abc import abstractmethod
 from modelo.pedido import *
+import logging
 
 class gestionPedidos(ABC):
     def __init__(self):
-        print("gestionPedidos creado")
+        logging.getLogger(__name__).debug("gestionPedidos creado")
 
     @abstractmethod
     def modificarPedido(self, idPedido, operacion, cambio):
@@ -1,4 +1,7 @@
 from controlador.gestionPedidos import gestionPedidos
+import logging
+
+_log = logging.getLogger(__name__)
 
 class gestionPedidosDueno(gestionPedidos):
     _instancia = None
@@ -54,12 +57,12 @@ class gestionPedidosDueno(gestionPedidos):
                 case 1:
                     retorno.setestado(cambio)
                 case _:
-                    print("modificacion NO valida")
+                    _log.info("modificacion NO valida")
                     return 0
             return 1
 
         else:
-            print("No se encuentra el pedido, esta cancelado o pendiente")
+            _log.info("No se encuentra el pedido, esta cancelado o pendiente")
             return 0
 
     def prepararEnvio(self, idPedido):
@@ -68,7 +71,7 @@ class gestionPedidosDueno(gestionPedidos):
             retorno.setestado("preparacion")
 
         else:
-            print("No se encuentra el pedido, esta cancelado o pendiente")
+            _log.info("No se encuentra el pedido, esta cancelado o pendiente")
             return 0
 
     def enviarEnvio(self, idPedido):
@@ -76,14 +79,14 @@ class gestionPedidosDueno(gestionPedidos):
         if(retorno.getestado() == "preparacion"):
             retorno.setestado("enviado")
         else:
-            print("No se encuentra el pedido, esta cancelado o pendiente")
+            _log.info("No se encuentra el pedido, esta cancelado o pendiente")
             return 0
     def cancelarEnvio(self, idPedido):
         retorno = self.recuperarPedido(idPedido)
         if(retorno.getestado() != "cancelado"):
             retorno.setestado("cancelado")
         else:
-            print("No se encuentra el pedido, esta cancelado o pendiente")
+            _log.info("No se encuentra el pedido, esta cancelado o pendiente")
             return 0
     #es bastante redundante con la funcion anterior,pero asi es la vida
     def cancelarPedido(self, idPedido):
@@ -91,7 +94,7 @@ class gestionPedidosDueno(gestionPedidos):
         if (retorno != 0 and retorno.getestado() != "cancelado"):
             retorno.setestado("cancelado")
         else:
-            print("No se encuentra el pedido o esta cancelado")
+            _log.info("No se encuentra el pedido o esta cancelado")
             return 0
     def mostrar(self):
         self.datos.mostrarPedidos()
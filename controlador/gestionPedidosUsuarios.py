@@ -2,12 +2,41 @@ from controlador.gestionPedidos import *
 from modelo.factura import *
 from modelo.pedido import *
 from controlador.pagar import *
+from controlador.contexto_solicitud import ContextoSolicitud, desempaquetar_respuesta
+from controlador.procesador_pagos import obtener_procesador_pagos
+from controlador.almacen_idempotencia import AlmacenIdempotencia
+from controlador.liquidacion_pagos import obtener_cola_liquidacion
+from controlador.riesgo_pagos import obtener_puntuador_riesgo
+from controlador.cortacircuitos_pagos import obtener_fabrica_protegida
+from controlador.ids_pedido import obtener_generador_ids
+from concurrent.futures import CancelledError, Future, InvalidStateError, TimeoutError
+import logging
+import threading
+import time
+
+_log = logging.getLogger(__name__)
+
+
+#pasa el resultado (o el error) de un Future a otro; si el destino ya se resolvio no hace nada
+def _copiarResultado(origen, destino):
+    try:
+        if origen.cancelled():
+            destino.set_exception(CancelledError())
+        elif origen.exception() is not None:
+            destino.set_exception(origen.exception())
+        else:
+            destino.set_result(origen.result())
+    except InvalidStateError:
+        pass
 
 
 class gestionPedidosUsuarios(gestionPedidos):
     _instancia = None
+    #segundos que pagarPedido espera el resultado (504 si se supera)
+    plazoPago = 30
 
-    def __new__(cls):
+    #acepta los argumentos de __init__ para poder crearse como gestionPedidosUsuarios(datos, descuentos)
+    def __new__(cls, *args, **kwargs):
         if cls._instancia is None:
             cls._instancia = super().__new__(cls)
         return cls._instancia
@@ -22,66 +51,74 @@ class gestionPedidosUsuarios(gestionPedidos):
         if descuentos is None:
             try:
                 from controlador.gestionDescuentos import gestionDescuentos
-                descuentos = gestionDescuentos()
+                descuentos = gestionDescuentos(datos)
             except:
                 descuentos = None
                 
         self.datos = datos #la bd
-        self.idConteo = 1
+        #ids de pedido de 64 bits ordenados por tiempo (compartidos con la vista REST)
+        self.ids = obtener_generador_ids()
         self.descuentos = descuentos
+        #pagos: claves de idempotencia y pagos en curso por pedido
+        self.idempotencia = AlmacenIdempotencia()
+        self.pagosEnCurso = {}
+        self.candadoPagos = threading.Lock()
     #recuperar pedido por id
     def recuperarPedido(self, idPedido):
-        pedido = self.datos.recuperarPedido(idPedido)
-        if(pedido != 404):
+        #el proxy y la bd devuelven tuplas (pedido, codigo)
+        pedido = desempaquetar_respuesta(self.datos.recuperarPedido(idPedido))
+        if(pedido is not None):
             return pedido
         else:
-            print("Pedido no existe")
+            _log.info("Pedido %s no existe", idPedido)
             return 404
 
     #Ingresa los datos para un nuevo pedido, si el retorno es 0 se produjo un error
     #de lo contrario se retorna el idPedido
-    def nuevoPedido(self,idUsuario, direccion, carro, precioEnvio, tipoEnvio):
-        if(self.datos.buscarUsuario(idUsuario) == 404):
-            print("Usuario no existe")
+    #el contexto resuelve el usuario una sola vez y se comparte con los descuentos
+    def nuevoPedido(self,idUsuario, direccion, carro, precioEnvio, tipoEnvio, contexto=None):
+        if contexto is None:
+            contexto = ContextoSolicitud.resolver(self.datos, idUsuario)
+        if(not contexto.existe()):
+            _log.info("Usuario %s no existe", idUsuario)
             return 404
         nuevaCompra = ""
         precioCarro = self.mostrarPrecioCarrito(carro)
         precioEnvio2 = precioEnvio.getprecioEnvio()
-        precioDescuentos = self.descuentos.calcularDescuentos(idUsuario)
+        precioDescuentos = self.descuentos.calcularDescuentos(idUsuario, contexto)
         if(precioDescuentos[1] == 1):
             precioEnvio2 = 0
-        print("***** Descuentos *****")
-        for i in precioDescuentos[2]:
-            print(f"Descuento '{i}' aplicado")
-        print("*****            *****\n")
+        if precioDescuentos[2]:
+            _log.info("Descuentos aplicados al usuario %s: %s", idUsuario, precioDescuentos[2])
         descuento = precioDescuentos[0]
+        idPedido = self.ids.siguiente()
         match tipoEnvio:
             case "internacional":
                 impuestos = 1.3
                 boleta = factura(carro, precioCarro, precioEnvio2, precioDescuentos[0], precioEnvio2, impuestos)
-                nuevaCompra = internacional(idUsuario, direccion,self.idConteo, "pendiente", carro, precioEnvio, boleta)
+                nuevaCompra = internacional(idUsuario, direccion, idPedido, "pendiente", carro, precioEnvio, boleta)
             case "programado":
                 impuestos = 1
                 boleta = factura(carro, precioCarro, precioEnvio2, precioDescuentos[0], precioEnvio2, impuestos)
-                nuevaCompra = programado(idUsuario, direccion, self.idConteo, "pendiente", carro, precioEnvio, boleta)
+                nuevaCompra = programado(idUsuario, direccion, idPedido, "pendiente", carro, precioEnvio, boleta)
             case "express":
                 impuestos = 1.15
                 boleta = factura(carro, precioCarro, precioEnvio2, precioDescuentos[0], precioEnvio2, impuestos)
-                nuevaCompra = express(idUsuario, direccion, self.idConteo, "pendiente", carro, precioEnvio, boleta)
+                nuevaCompra = express(idUsuario, direccion, idPedido, "pendiente", carro, precioEnvio, boleta)
             case "estandar":
                 impuestos = 1
                 boleta = factura(carro, precioCarro, precioEnvio2, precioDescuentos[0], precioEnvio2, impuestos)
-                nuevaCompra = estandar(idUsuario, direccion, self.idConteo, "pendiente", carro, precioEnvio, boleta)
+                nuevaCompra = estandar(idUsuario, direccion, idPedido, "pendiente", carro, precioEnvio, boleta)
             case _:
-                print("wtf?")#TODO devolver items al carrito
+                _log.warning("Tipo de envio no valido: %s", tipoEnvio)#TODO devolver items al carrito
                 return 400
-        self.idConteo += 1
-        print("Pedido agregado de manera satisfactoria :D")
+        _log.info("Pedido %s agregado de manera satisfactoria", idPedido)
         self.datos.agregarPedido(nuevaCompra)
-        return self.idConteo-1
+        obtener_puntuador_riesgo().registrar_pedido(idUsuario, nuevaCompra.gettotalReal())
+        return idPedido
     def modificarPedido(self, idPedido,operacion,cambio):
         retorno = self.recuperarPedido(idPedido)
-        if(retorno != 404 and retorno.getestado() != "cancelado"):
+        if(retorno != 404 and desempaquetar_respuesta(retorno.getestado()) != "cancelado"):
             #1 cambiar direccion
             #2 cambiar estado
             #3 cambiar productos
@@ -92,62 +129,148 @@ class gestionPedidosUsuarios(gestionPedidos):
                 case 2:
                     retorno.setestado(cambio)
                 case 3:
-                    if(retorno.getestado() == "pendiente"):
+                    if(desempaquetar_respuesta(retorno.getestado()) == "pendiente"):
                         retorno.setproductos(cambio)
                     else:
-                        print("Pedido solo se puede cambiar si esta pendiente")
+                        _log.info("Pedido %s solo se puede cambiar si esta pendiente", idPedido)
                 case 4:
-                    if(retorno.getestado() == "pendiente"):
+                    if(desempaquetar_respuesta(retorno.getestado()) == "pendiente"):
                         retorno.setprecioEnvioPedido2(cambio) #todo ver que onda
                     else:
-                        print("Pedido solo se puede cambiar si esta pendiente")
+                        _log.info("Pedido %s solo se puede cambiar si esta pendiente", idPedido)
 
                 case _:
-                    print("modificacion NO valida")
+                    _log.info("modificacion NO valida: %s", operacion)
                     return 400
             return 200
 
         else:
-            print("No se encuentra el pedido o esta cancelado")
+            _log.info("No se encuentra el pedido %s o esta cancelado", idPedido)
             return 0
     #es bastante redundante con la funcion anterior,pero asi es la vida
     def cancelarPedido(self, idPedido):
         retorno = self.recuperarPedido(idPedido)
-        if (retorno != 0 and retorno.getestado() != "cancelado"):
+        if (retorno != 404 and desempaquetar_respuesta(retorno.getestado()) != "cancelado"):
             retorno.setestado("cancelado")
             return 200
         else:
-            print("No se encuentra el pedido o ya esta cancelado")
+            _log.info("No se encuentra el pedido %s o ya esta cancelado", idPedido)
             return 404
 
 #gestionPedidosUsuarios realiza muchas acciones: gestionar pedidos, calcular descuentos, manejar pagos, etc.
-    def pagarPedido(self, idPedido, idUsuario,tipoPago):
-        usuario = self.datos.buscarUsuario(idUsuario)
-        pedido = self.datos.recuperarPedido(idPedido)
-        if(pedido != 404 and usuario != 404 and pedido.getestado() == "pendiente" ):
-            res = 0
-            fabrica = None
-            match tipoPago:
-                case "transferencia":
-                    fabrica = Fabricatransferencia()
-                case "tarjeta":
-                    fabrica = FabricaTarjeta()
-                case "entrega":
-                    fabrica = FabricaEntrega()
-                case "cripto":
-                    fabrica = FabricaCripto()
-                case "qr":
-                    fabrica = FabricaQR()
-            res = procesarPago(fabrica, pedido.gettotalReal(), usuario.getnombre())
-            if (res == 400):
-                print("Pago no completado")
-            elif(res == 200 ):
-                print("Pago completado")
-                pedido.setestado("pagado")
-            return 201
-        else:
-            print("No se pudo completar el pago")
+    #espera el resultado del pago, pero el cobro corre en el procesador asincrono
+    #con claveIdempotencia los reintentos retornan el resultado del primer intento
+    def pagarPedido(self, idPedido, idUsuario,tipoPago, claveIdempotencia=None):
+        try:
+            futuro = self.pagarPedidoAsync(idPedido, idUsuario, tipoPago, claveIdempotencia=claveIdempotencia)
+            if futuro is None:
+                return 400
+            resultado = futuro.result(timeout=self.plazoPago)
+        except TimeoutError:
+            _log.warning("Pago del pedido %s sin resultado tras %s s", idPedido, self.plazoPago)
+            return 504
+        except (CancelledError, Exception) as e:
+            _log.warning("Pago del pedido %s fallo: %r", idPedido, e)
+            return 500
+        if resultado is None:
             return 400
+        return 201
+
+    #envia el pago sin bloquear: retorna un Future (200/400) o None si no se puede pagar
+    #el Future se resuelve cuando la cola de liquidacion ya aplico el estado del pedido
+    #callback(resultado) se llama al terminar, despues de actualizar el estado del pedido
+    #un reintento con la misma claveIdempotencia, o un pago del mismo pedido que ya
+    #esta en curso, recibe el Future del primer intento y no vuelve a cobrar
+    def pagarPedidoAsync(self, idPedido, idUsuario, tipoPago, callback=None, claveIdempotencia=None):
+        reserva = None
+        if claveIdempotencia is not None:
+            nueva, reserva = self.idempotencia.reservar(claveIdempotencia)
+            if not nueva:
+                return reserva
+
+        try:
+            futuro = self._enviarPago(idPedido, idUsuario, tipoPago, callback)
+        except Exception as e:
+            #el pago no llego a enviarse: la clave no queda consumida y quien
+            #espera el Future del primer intento recibe el error
+            if reserva is not None:
+                self.idempotencia.liberar(claveIdempotencia)
+                reserva.set_exception(e)
+            raise
+        if reserva is not None:
+            if futuro is None:
+                #solicitud invalida: la clave no queda consumida
+                self.idempotencia.liberar(claveIdempotencia)
+                reserva.set_result(None)
+                return None
+            def alResolver(f):
+                #si el pago no llego a procesarse la clave no queda consumida
+                if f.cancelled() or f.exception() is not None:
+                    self.idempotencia.liberar(claveIdempotencia)
+                _copiarResultado(f, reserva)
+            futuro.add_done_callback(alResolver)
+            return reserva
+        return futuro
+
+    def _enviarPago(self, idPedido, idUsuario, tipoPago, callback):
+        contexto = ContextoSolicitud.resolver(self.datos, idUsuario)
+        pedido = desempaquetar_respuesta(self.datos.recuperarPedido(idPedido))
+        #pasarela con plazo por llamada y cortacircuitos
+        fabrica = obtener_fabrica_protegida(tipoPago)
+        if(pedido is None or not contexto.existe() or fabrica is None):
+            _log.info("No se pudo completar el pago del pedido %s", idPedido)
+            return None
+
+        #revisar el estado y marcar el pago en curso de forma atomica
+        with self.candadoPagos:
+            enCurso = self.pagosEnCurso.get(idPedido)
+            if enCurso is not None:
+                return enCurso
+            #getestado retorna (estado, 200)
+            if desempaquetar_respuesta(pedido.getestado()) != "pendiente":
+                _log.info("No se pudo completar el pago: el pedido %s no esta pendiente", idPedido)
+                return None
+
+            inicio = time.perf_counter()
+            monto = pedido.gettotalReal()
+            liquidado = Future()
+
+            #corre en el hilo de la liquidacion, con el estado ya aplicado
+            def alLiquidar(res):
+                _log.info("Pago del pedido %s %s", idPedido, "completado" if res == 200 else "no completado")
+                with self.candadoPagos:
+                    self.pagosEnCurso.pop(idPedido, None)
+                try:
+                    if callback is not None:
+                        callback(res)
+                finally:
+                    try:
+                        liquidado.set_result(res)
+                    except InvalidStateError:
+                        pass
+
+            #el cambio de estado y los contadores se aplican por lotes en la cola
+            def alTerminar(res):
+                obtener_puntuador_riesgo().registrar_pago(idUsuario, res)
+                obtener_cola_liquidacion().encolar(pedido, res, monto, inicio, alLiquidar)
+
+            #si el procesador falla o se cancela alLiquidar nunca corre:
+            #se libera el pedido para reintentos y se propaga el error
+            def alProcesar(procesado):
+                if not procesado.cancelled() and procesado.exception() is None:
+                    return
+                _log.warning("Pago del pedido %s no se pudo procesar", idPedido)
+                with self.candadoPagos:
+                    if self.pagosEnCurso.get(idPedido) is liquidado:
+                        del self.pagosEnCurso[idPedido]
+                _copiarResultado(procesado, liquidado)
+
+            #el verificador de riesgo recibe el id del usuario (no el nombre)
+            procesado = obtener_procesador_pagos().enviar(fabrica, monto, idUsuario, alTerminar)
+            self.pagosEnCurso[idPedido] = liquidado
+        #fuera del candado: si ya termino, alProcesar corre en este hilo y lo toma
+        procesado.add_done_callback(alProcesar)
+        return liquidado
 
     def mostrarPrecioCarrito(self, carrito):
         resultado = [0,0,0,0,0]
@@ -169,12 +292,11 @@ class gestionPedidosUsuarios(gestionPedidos):
             # Validar que el usuario existe
             if hasattr(self.datos, 'buscarUsuario'):
                 if self.datos.buscarUsuario(idUsuario) == 404:
-                    print("Usuario no existe")
+                    _log.info("Usuario %s no existe", idUsuario)
                     return 404
             
             # Crear pedido simple
-            import random
-            nuevo_id_pedido = random.randint(1000, 9999)
+            nuevo_id_pedido = self.ids.siguiente()
             
             nuevo_pedido = pedido(
                 idUsuario,      # idUsuario
@@ -190,6 +312,8 @@ class gestionPedidosUsuarios(gestionPedidos):
             if hasattr(self.datos, 'agregarPedido'):
                 resultado = self.datos.agregarPedido(nuevo_pedido)
                 if resultado == 200:
+                    #los productos llegan por nombre: solo cuenta para la frecuencia
+                    obtener_puntuador_riesgo().registrar_pedido(idUsuario)
                     return {
                         'idPedido': nuevo_pedido.getidPedido(),
                         'idUsuario': nuevo_pedido.getidUsuario(),
@@ -201,9 +325,94 @@ class gestionPedidosUsuarios(gestionPedidos):
             return 400
             
         except Exception as e:
-            print(f"Error al crear pedido: {e}")
+            _log.exception("Error al crear pedido: %s", e)
             return 400
 
+    #reserva `cantidad` ids de pedido crecientes de una vez
+    def reservarIds(self, cantidad):
+        return self.ids.reservar(cantidad)
+
+    # Creación en lote para la API REST
+    def crearPedidosLote(self, items, catalogo=None):
+        """
+        Crear varios pedidos en una sola operación.
+        Se valida todo el arreglo antes de crear nada, los usuarios y productos
+        se resuelven una sola vez, los ids se reservan en bloque y los pedidos
+        válidos se registran con una sola escritura en la base de datos.
+        
+        Args:
+            items: lista de dicts con idUsuario, direccion, productos (lista de
+                   nombres o {nombre: cantidad}) y estado opcional
+            catalogo: dict {nombre: producto} para resolver los productos
+                      (None = se guardan los nombres tal cual, como crearPedido)
+        
+        Returns:
+            list: (201, pedido) o (400/404, mensaje de error) por item, en orden
+        """
+        resultados = [None] * len(items)
+        validos = []
+        for indice, item in enumerate(items):
+            if not isinstance(item, dict):
+                resultados[indice] = (400, 'El pedido debe ser un objeto')
+                continue
+            faltantes = [campo for campo in ('idUsuario', 'direccion', 'productos') if campo not in item]
+            if faltantes:
+                resultados[indice] = (400, f'Campos requeridos: {", ".join(faltantes)}')
+                continue
+            if not isinstance(item['idUsuario'], int):
+                resultados[indice] = (400, 'idUsuario debe ser un entero')
+                continue
+            productos = item['productos']
+            if not isinstance(productos, (list, dict)):
+                resultados[indice] = (400, 'productos debe ser una lista o un objeto {nombre: cantidad}')
+                continue
+            if not all(isinstance(nombre, str) for nombre in productos):
+                resultados[indice] = (400, 'Los productos se indican por nombre (string)')
+                continue
+            if isinstance(productos, list):
+                cantidades = {}
+                for nombre in productos:
+                    cantidades[nombre] = cantidades.get(nombre, 0) + 1
+            else:
+                cantidades = productos
+            #bool es subclase de int: true no es una cantidad
+            if not all(isinstance(cantidad, int) and not isinstance(cantidad, bool) and cantidad > 0
+                       for cantidad in cantidades.values()):
+                resultados[indice] = (400, 'Las cantidades deben ser enteros positivos')
+                continue
+            validos.append((indice, item, cantidades))
+
+        #usuarios: una busqueda para todos los ids distintos
+        usuarios = self.datos.buscarUsuarios({item['idUsuario'] for _, item, _ in validos})
+        listos = []
+        for indice, item, cantidades in validos:
+            if item['idUsuario'] not in usuarios:
+                resultados[indice] = (404, f'Usuario {item["idUsuario"]} no existe')
+                continue
+            if catalogo is not None:
+                desconocidos = [nombre for nombre in cantidades if nombre not in catalogo]
+                if desconocidos:
+                    resultados[indice] = (400, f'Productos no válidos: {", ".join(map(str, desconocidos))}')
+                    continue
+                carro = {catalogo[nombre]: cantidad for nombre, cantidad in cantidades.items()}
+            else:
+                carro = item['productos']
+            listos.append((indice, item, carro))
+
+        nuevos = []
+        eventos = []
+        for (indice, item, carro), idPedido in zip(listos, self.reservarIds(len(listos))):
+            nuevo = pedido(item['idUsuario'], item['direccion'], idPedido,
+                           item.get('estado', 'pendiente'), carro, None, None)
+            nuevos.append(nuevo)
+            resultados[indice] = (201, nuevo)
+            #con catalogo el monto se conoce, sin el solo cuenta la frecuencia
+            eventos.append((item['idUsuario'], self.mostrarPrecioCarrito(carro) if catalogo is not None else None))
+        if nuevos:
+            self.datos.agregarPedidos(nuevos)
+            obtener_puntuador_riesgo().registrar_pedidos(eventos)
+        return resultados
+
 """
     def pagarPedido(self, idPedido, idUsuario,tipoPago):
         usuario = self.datos.buscarUsuario(idUsuario)
@@ -5,8 +5,34 @@ Caso de Uso 1: Gestión centralizada de pedidos con patrón Singleton
 Mantiene la estructura existente pero centraliza las operaciones críticas.
 """
 
+import logging
+import os
+import threading
+import time
+from concurrent.futures import CancelledError
+
 from controlador.gestionPedidosUsuarios import gestionPedidosUsuarios
 from controlador.gestionPedidosDueno import gestionPedidosDueno
+from controlador.registro_auditoria import RegistroAuditoria, INICIO, RESULTADO, ERROR, NOMBRES_EVENTO
+from controlador.histograma_latencias import HistogramasOperacion
+from controlador.contexto_solicitud import ContextoSolicitud
+from controlador.metricas import obtener_registro_metricas
+
+_log = logging.getLogger(__name__)
+
+# Archivo de auditoría del gestor central (rotativo, escrito en segundo plano)
+ARCHIVO_AUDITORIA = os.path.join("logs", "auditoria_central.log")
+
+# Tipos de comando de ejecutar_lote y la operación central que representan
+OPERACIONES_LOTE = {
+    'crear': "CREAR_PEDIDO",
+    'modificar': "MODIFICAR_PEDIDO",
+    'cancelar': "CANCELAR_PEDIDO",
+    'pagar': "PAGAR_PEDIDO",
+    'consultar': "CONSULTAR_PEDIDO"
+}
+# Comandos que el dueño también puede ejecutar (es_dueno=True)
+COMANDOS_DUENO = ('modificar', 'cancelar', 'consultar')
 
 
 class GestorCentralPedidos:
@@ -26,120 +52,322 @@ class GestorCentralPedidos:
         # Evitar reinicialización
         if not GestorCentralPedidos._inicializado:
             self._gestores_existentes = {}
-            self._log_operaciones = []
+            self._auditoria = RegistroAuditoria(archivo=ARCHIVO_AUDITORIA)
+            self._auditoria.iniciar()
+            # Contadores por operación: {operacion: [total, exitosas, fallidas]}
+            self._contadores = {}
+            self._candado_contadores = threading.Lock()
+            # Latencias por operación y resultado ("exito" / "fallo")
+            self._latencias = HistogramasOperacion()
+            obtener_registro_metricas().derivada(
+                "uvshop_central_operaciones_total", "Operaciones del gestor central por resultado",
+                "counter", ("operacion", "resultado"), self.contadores_metricas
+            )
             GestorCentralPedidos._inicializado = True
-            print("✅ Gestor Central de Pedidos inicializado (Singleton)")
+            _log.info("✅ Gestor Central de Pedidos inicializado (Singleton)")
     
     def registrar_gestor_usuarios(self, gestor_usuarios):
         """Registra el gestor de usuarios existente"""
         self._gestores_existentes['usuarios'] = gestor_usuarios
-        self._log_operacion("REGISTRO_GESTOR", "usuarios")
+        self._log_operacion("REGISTRO_GESTOR", estado="usuarios")
     
     def registrar_gestor_dueno(self, gestor_dueno):
         """Registra el gestor del dueño existente"""
         self._gestores_existentes['dueno'] = gestor_dueno
-        self._log_operacion("REGISTRO_GESTOR", "dueno")
+        self._log_operacion("REGISTRO_GESTOR", estado="dueno")
     
     # ===== OPERACIONES CENTRALIZADAS =====
     
     def crear_pedido_centralizado(self, id_usuario, direccion, carro, precio_envio, tipo_envio):
         """Operación crítica centralizada: Crear Pedido"""
-        self._log_operacion("CREAR_PEDIDO", f"usuario_{id_usuario}")
+        inicio = time.perf_counter_ns()
+        self._log_operacion("CREAR_PEDIDO", id_usuario=id_usuario)
         
         # Usar gestor existente sin modificarlo
         gestor = self._gestores_existentes.get('usuarios')
         if gestor:
             resultado = gestor.nuevoPedido(id_usuario, direccion, carro, precio_envio, tipo_envio)
-            self._log_resultado("CREAR_PEDIDO", resultado)
+            self._log_resultado("CREAR_PEDIDO", resultado, inicio, self._es_exito("CREAR_PEDIDO", resultado))
             return resultado
         else:
-            self._log_error("CREAR_PEDIDO", "Gestor usuarios no registrado")
+            self._log_error("CREAR_PEDIDO", "Gestor usuarios no registrado", inicio)
             return 0
     
     def modificar_pedido_centralizado(self, id_pedido, operacion, cambio, es_dueno=False):
         """Operación crítica centralizada: Modificar Pedido"""
+        inicio = time.perf_counter_ns()
         tipo_gestor = "dueno" if es_dueno else "usuarios"
-        self._log_operacion("MODIFICAR_PEDIDO", f"{tipo_gestor}_{id_pedido}")
+        self._log_operacion("MODIFICAR_PEDIDO", id_pedido=id_pedido)
         
         gestor = self._gestores_existentes.get(tipo_gestor)
         if gestor:
             resultado = gestor.modificarPedido(id_pedido, operacion, cambio)
-            self._log_resultado("MODIFICAR_PEDIDO", resultado)
+            self._log_resultado("MODIFICAR_PEDIDO", resultado, inicio,
+                                self._es_exito("MODIFICAR_PEDIDO", resultado, tipo_gestor))
             return resultado
         else:
-            self._log_error("MODIFICAR_PEDIDO", f"Gestor {tipo_gestor} no registrado")
+            self._log_error("MODIFICAR_PEDIDO", f"Gestor {tipo_gestor} no registrado", inicio)
             return 0
     
     def cancelar_pedido_centralizado(self, id_pedido, es_dueno=False):
         """Operación crítica centralizada: Cancelar Pedido"""
+        inicio = time.perf_counter_ns()
         tipo_gestor = "dueno" if es_dueno else "usuarios"
-        self._log_operacion("CANCELAR_PEDIDO", f"{tipo_gestor}_{id_pedido}")
+        self._log_operacion("CANCELAR_PEDIDO", id_pedido=id_pedido)
         
         gestor = self._gestores_existentes.get(tipo_gestor)
         if gestor:
             resultado = gestor.cancelarPedido(id_pedido)
-            self._log_resultado("CANCELAR_PEDIDO", resultado)
+            self._log_resultado("CANCELAR_PEDIDO", resultado, inicio,
+                                self._es_exito("CANCELAR_PEDIDO", resultado, tipo_gestor))
             return resultado
         else:
-            self._log_error("CANCELAR_PEDIDO", f"Gestor {tipo_gestor} no registrado")
+            self._log_error("CANCELAR_PEDIDO", f"Gestor {tipo_gestor} no registrado", inicio)
             return 0
     
-    def pagar_pedido_centralizado(self, id_pedido, id_usuario, tipo_pago):
-        """Operación crítica centralizada: Pagar Pedido"""
-        self._log_operacion("PAGAR_PEDIDO", f"usuario_{id_usuario}_pedido_{id_pedido}")
+    def pagar_pedido_centralizado(self, id_pedido, id_usuario, tipo_pago, clave_idempotencia=None):
+        """Operación crítica centralizada: Pagar Pedido (clave opcional para reintentos)"""
+        inicio = time.perf_counter_ns()
+        self._log_operacion("PAGAR_PEDIDO", id_usuario=id_usuario, id_pedido=id_pedido)
         
         gestor = self._gestores_existentes.get('usuarios')
         if gestor:
-            resultado = gestor.pagarPedido(id_pedido, id_usuario, tipo_pago)
-            self._log_resultado("PAGAR_PEDIDO", resultado)
+            resultado = gestor.pagarPedido(id_pedido, id_usuario, tipo_pago, clave_idempotencia)
+            self._log_resultado("PAGAR_PEDIDO", resultado, inicio, self._es_exito("PAGAR_PEDIDO", resultado))
             return resultado
         else:
-            self._log_error("PAGAR_PEDIDO", "Gestor usuarios no registrado")
+            self._log_error("PAGAR_PEDIDO", "Gestor usuarios no registrado", inicio)
             return 0
     
     def consultar_pedido_centralizado(self, id_pedido, es_dueno=False):
         """Operación crítica centralizada: Consultar Pedido"""
+        inicio = time.perf_counter_ns()
         tipo_gestor = "dueno" if es_dueno else "usuarios"
         gestor = self._gestores_existentes.get(tipo_gestor)
         
         if gestor:
             resultado = gestor.recuperarPedido(id_pedido)
-            self._log_operacion("CONSULTAR_PEDIDO", f"{tipo_gestor}_{id_pedido}")
+            self._log_operacion("CONSULTAR_PEDIDO", id_pedido=id_pedido)
+            self._contar("CONSULTAR_PEDIDO", self._es_exito("CONSULTAR_PEDIDO", resultado, tipo_gestor), inicio)
             return resultado
         else:
-            self._log_error("CONSULTAR_PEDIDO", f"Gestor {tipo_gestor} no registrado")
+            self._log_error("CONSULTAR_PEDIDO", f"Gestor {tipo_gestor} no registrado", inicio)
             return 0
     
+    # ===== OPERACIONES EN LOTE =====
+    
+    def ejecutar_lote(self, comandos):
+        """
+        Ejecuta una lista de comandos agrupándolos por tipo y gestor: cada grupo
+        busca su gestor una vez, deja un solo registro de inicio y de resultado
+        y actualiza los contadores con una sola toma del candado.
+        
+        Args:
+            comandos: lista de dicts con 'tipo' ('crear', 'modificar', 'cancelar',
+                      'pagar' o 'consultar') y los mismos argumentos que la
+                      operación individual (id_usuario, direccion, carro,
+                      precio_envio, tipo_envio, id_pedido, operacion, cambio,
+                      tipo_pago, clave_idempotencia, es_dueno)
+        
+        Los grupos se ejecutan en el orden de su primer comando, por lo que
+        comandos de distinto tipo sobre un mismo pedido no conservan su orden.
+        
+        Returns:
+            list: el retorno de cada comando en el orden recibido
+                  (400 si el comando es inválido, 0 si su gestor no está registrado)
+        """
+        resultados = [400] * len(comandos)
+        grupos = {}
+        for posicion, comando in enumerate(comandos):
+            tipo = comando.get('tipo') if isinstance(comando, dict) else None
+            if tipo not in OPERACIONES_LOTE:
+                continue
+            tipo_gestor = "dueno" if comando.get('es_dueno') and tipo in COMANDOS_DUENO else "usuarios"
+            grupos.setdefault((tipo, tipo_gestor), []).append(posicion)
+        
+        invalidos = len(comandos) - sum(len(posiciones) for posiciones in grupos.values())
+        if invalidos:
+            self._log_operacion("LOTE", evento=ERROR, estado=f"{invalidos} comandos inválidos")
+        
+        for (tipo, tipo_gestor), posiciones in grupos.items():
+            operacion = OPERACIONES_LOTE[tipo]
+            inicio = time.perf_counter_ns()
+            self._log_operacion(operacion, estado=f"lote de {len(posiciones)}")
+            gestor = self._gestores_existentes.get(tipo_gestor)
+            if gestor is None:
+                for posicion in posiciones:
+                    resultados[posicion] = 0
+                self._log_operacion(operacion, evento=ERROR, estado=f"Gestor {tipo_gestor} no registrado")
+                self._contar_lote(operacion, 0, len(posiciones), inicio)
+                continue
+            
+            grupo = self._ejecutar_grupo(tipo, gestor, [comandos[posicion] for posicion in posiciones])
+            exitosas = 0
+            for posicion, resultado in zip(posiciones, grupo):
+                resultados[posicion] = resultado
+                exitosas += self._es_exito(operacion, resultado, tipo_gestor)
+            self._log_operacion(operacion, evento=RESULTADO, estado=f"lote: {exitosas}/{len(posiciones)} exitosas")
+            self._contar_lote(operacion, exitosas, len(posiciones) - exitosas, inicio)
+        return resultados
+    
+    def _ejecutar_grupo(self, tipo, gestor, comandos):
+        """Ejecuta comandos del mismo tipo con un gestor; un comando inválido no corta el grupo"""
+        resultados = []
+        if tipo == 'pagar':
+            # Todos los pagos quedan en vuelo a la vez y luego se esperan,
+            # con el mismo plazo que pagarPedido para el lote completo
+            futuros = []
+            for comando in comandos:
+                try:
+                    futuros.append(gestor.pagarPedidoAsync(
+                        comando['id_pedido'], comando['id_usuario'], comando['tipo_pago'],
+                        claveIdempotencia=comando.get('clave_idempotencia')
+                    ))
+                except (KeyError, TypeError):
+                    futuros.append(400)
+                except Exception as e:
+                    self._log_operacion(OPERACIONES_LOTE[tipo], evento=ERROR, estado=str(e))
+                    futuros.append(500)
+            limite = time.monotonic() + gestor.plazoPago
+            for futuro in futuros:
+                if futuro is None or isinstance(futuro, int):
+                    resultados.append(futuro or 400)
+                    continue
+                try:
+                    resultado = futuro.result(timeout=max(0, limite - time.monotonic()))
+                except TimeoutError:
+                    resultados.append(504)
+                    continue
+                except (CancelledError, Exception) as e:
+                    self._log_operacion(OPERACIONES_LOTE[tipo], evento=ERROR, estado=repr(e))
+                    resultados.append(500)
+                    continue
+                resultados.append(400 if resultado is None else 201)
+            return resultados
+        
+        contextos = {}  # un contexto por usuario para todos sus pedidos del lote
+        for comando in comandos:
+            try:
+                match tipo:
+                    case 'crear':
+                        id_usuario = comando['id_usuario']
+                        contexto = contextos.get(id_usuario)
+                        if contexto is None:
+                            contexto = contextos[id_usuario] = ContextoSolicitud.resolver(gestor.datos, id_usuario)
+                        resultado = gestor.nuevoPedido(id_usuario, comando['direccion'], comando['carro'],
+                                                       comando['precio_envio'], comando['tipo_envio'], contexto)
+                    case 'modificar':
+                        resultado = gestor.modificarPedido(comando['id_pedido'], comando['operacion'], comando['cambio'])
+                    case 'cancelar':
+                        resultado = gestor.cancelarPedido(comando['id_pedido'])
+                    case 'consultar':
+                        resultado = gestor.recuperarPedido(comando['id_pedido'])
+            except (KeyError, TypeError):
+                resultado = 400
+            except Exception as e:
+                self._log_operacion(OPERACIONES_LOTE[tipo], evento=ERROR, estado=str(e))
+                resultado = 500
+            resultados.append(resultado)
+        return resultados
+    
+    def _es_exito(self, operacion, resultado, tipo_gestor="usuarios"):
+        """Interpreta el retorno de un gestor (cada operación usa sus propios códigos)"""
+        if isinstance(resultado, tuple):
+            # (datos, código) del gestor del dueño
+            resultado = resultado[-1]
+        match operacion:
+            case "PAGAR_PEDIDO":
+                return resultado == 201
+            case "MODIFICAR_PEDIDO" | "CANCELAR_PEDIDO" if tipo_gestor == "usuarios":
+                return resultado == 200
+            case _:
+                # ids de pedido, objetos o los retornos del dueño (0 = fallo)
+                return resultado not in (0, 400, 404, 500)
+    
     # ===== SISTEMA DE LOGGING Y CONTROL =====
     
-    def _log_operacion(self, operacion, detalle):
-        """Log de operaciones centralizadas"""
-        from datetime import datetime
-        log_entry = f"[{datetime.now().strftime('%H:%M:%S')}] {operacion}: {detalle}"
-        self._log_operaciones.append(log_entry)
-        print(f"🔍 LOG CENTRAL: {log_entry}")
+    def _log_operacion(self, operacion, id_usuario=None, id_pedido=None, evento=INICIO, estado=None):
+        """Log de operaciones centralizadas (registro compacto, sin I/O)"""
+        self._auditoria.registrar(operacion, evento, id_usuario, id_pedido, estado)
     
-    def _log_resultado(self, operacion, resultado):
-        """Log de resultados"""
-        estado = "ÉXITO" if resultado != 0 else "FALLO"
-        self._log_operacion(f"{operacion}_RESULTADO", f"{estado} ({resultado})")
+    def _log_resultado(self, operacion, resultado, inicio=None, exito=None):
+        """Log de resultados (por defecto 0 = fallo; `exito` para operaciones con código HTTP)"""
+        self._log_operacion(operacion, evento=RESULTADO, estado=resultado)
+        self._contar(operacion, resultado != 0 if exito is None else exito, inicio)
     
-    def _log_error(self, operacion, error):
+    def _log_error(self, operacion, error, inicio=None):
         """Log de errores"""
-        self._log_operacion(f"{operacion}_ERROR", error)
+        self._log_operacion(operacion, evento=ERROR, estado=error)
+        self._contar(operacion, False, inicio)
+    
+    def _contar(self, operacion, exito, inicio=None):
+        """Actualiza contadores y latencia (desde `inicio`, perf_counter_ns) de una operación terminada"""
+        if inicio is not None:
+            self._latencias.registrar(operacion, "exito" if exito else "fallo", time.perf_counter_ns() - inicio)
+        with self._candado_contadores:
+            contador = self._contadores.get(operacion)
+            if contador is None:
+                contador = self._contadores[operacion] = [0, 0, 0]
+            contador[0] += 1
+            contador[1 if exito else 2] += 1
+    
+    def obtener_latencias(self, reiniciar=False):
+        """
+        Percentiles de latencia por operación y resultado.
+        
+        Args:
+            reiniciar: True para empezar una ventana nueva tras leer
+        
+        Returns:
+            dict: {operacion: {"exito"/"fallo"/"lote": {muestras, p50_us, p95_us, p99_us, max_us, promedio_us}}}
+        """
+        return self._latencias.resumen(reiniciar)
+    
+    def contadores_metricas(self):
+        """{(operacion, "exito"/"fallo"): cantidad} para /metrics"""
+        with self._candado_contadores:
+            contadores = list(self._contadores.items())
+        metricas = {}
+        for operacion, (_, exitosas, fallidas) in contadores:
+            metricas[(operacion, "exito")] = exitosas
+            metricas[(operacion, "fallo")] = fallidas
+        return metricas
+    
+    def _contar_lote(self, operacion, exitosas, fallidas, inicio):
+        """Contadores de un grupo de comandos con una sola toma del candado"""
+        self._latencias.registrar(operacion, "lote", time.perf_counter_ns() - inicio)
+        with self._candado_contadores:
+            contador = self._contadores.get(operacion)
+            if contador is None:
+                contador = self._contadores[operacion] = [0, 0, 0]
+            contador[0] += exitosas + fallidas
+            contador[1] += exitosas
+            contador[2] += fallidas
+    
+    def _formatear_registro(self, registro):
+        detalle = ", ".join(
+            f"{nombre}={valor}" for nombre, valor in (
+                ("usuario", registro.id_usuario), ("pedido", registro.id_pedido), ("estado", registro.estado)
+            ) if valor is not None
+        )
+        return f"{registro.operacion} {NOMBRES_EVENTO[registro.evento]}: {detalle}"
     
     def obtener_estadisticas_centralizadas(self):
-        """Estadísticas del sistema centralizado"""
-        total_ops = len(self._log_operaciones)
-        errores = len([log for log in self._log_operaciones if 'ERROR' in log])
-        exitos = len([log for log in self._log_operaciones if 'ÉXITO' in log])
+        """Estadísticas del sistema centralizado, O(tipos de operación)"""
+        with self._candado_contadores:
+            por_operacion = {
+                operacion: {'total': total, 'exitosas': exitosas, 'fallidas': fallidas}
+                for operacion, (total, exitosas, fallidas) in self._contadores.items()
+            }
         
         return {
-            'total_operaciones': total_ops,
-            'operaciones_exitosas': exitos,
-            'operaciones_fallidas': errores,
+            'total_operaciones': sum(c['total'] for c in por_operacion.values()),
+            'operaciones_exitosas': sum(c['exitosas'] for c in por_operacion.values()),
+            'operaciones_fallidas': sum(c['fallidas'] for c in por_operacion.values()),
+            'por_operacion': por_operacion,
+            'latencias': self.obtener_latencias(),
             'gestores_registrados': list(self._gestores_existentes.keys()),
-            'ultimas_operaciones': self._log_operaciones[-5:] if self._log_operaciones else []
+            'ultimas_operaciones': [self._formatear_registro(r) for r in self._auditoria.ultimos(5)]
         }
     
     def mostrar_resumen_sistema(self):
@@ -153,6 +381,19 @@ class GestorCentralPedidos:
         print(f"❌ Operaciones fallidas: {stats['operaciones_fallidas']}")
         print(f"🎯 Gestores registrados: {', '.join(stats['gestores_registrados'])}")
         
+        if stats['por_operacion']:
+            print("\n📋 Por operación (total / exitosas / fallidas):")
+            for operacion, contador in stats['por_operacion'].items():
+                print(f"   {operacion}: {contador['total']} / {contador['exitosas']} / {contador['fallidas']}")
+        
+        latencias = self.obtener_latencias()
+        if latencias:
+            print("\n⏱️  Latencias (p50 / p95 / p99 / máx, µs):")
+            for operacion, por_resultado in latencias.items():
+                for resultado, r in por_resultado.items():
+                    print(f"   {operacion} [{resultado}]: {r['p50_us']:.1f} / {r['p95_us']:.1f} / "
+                          f"{r['p99_us']:.1f} / {r['max_us']:.1f} ({r['muestras']} muestras)")
+        
         if stats['ultimas_operaciones']:
             print("\n📋 Últimas operaciones:")
             for op in stats['ultimas_operaciones']:
@@ -0,0 +1,222 @@
+"""
+HISTOGRAMAS DE LATENCIA - Buckets logarítmicos estilo HDR
+=========================================================
+Cada latencia (en ns, de time.perf_counter_ns) se cuenta en un bucket cuyo
+ancho crece con la magnitud del valor: los primeros 2^p valores tienen
+bucket propio y luego cada potencia de dos se divide en 2^(p-1) buckets.
+El error relativo queda acotado (< 2^-(p-1), ~1.6% con p=7), la memoria es
+fija por orden de magnitud y registrar es O(1) sin ordenar nada.
+Cada hilo cuenta en su propio fragmento (sin candado en el camino caliente);
+las lecturas suman los fragmentos. Al terminar un hilo su fragmento se suma
+a uno base y se libera, así hay a lo más un fragmento por hilo vivo.
+"""
+
+import itertools
+import threading
+import weakref
+
+
+class _Fragmento:
+    """Conteos de un hilo; solo ese hilo los escribe"""
+
+    __slots__ = ('conteos', 'total', 'suma_ns', 'maximo_ns')
+
+    def __init__(self, buckets):
+        self.conteos = [0] * buckets
+        self.total = 0
+        self.suma_ns = 0
+        self.maximo_ns = 0
+
+    def sumar(self, otro):
+        self.conteos = [a + b for a, b in zip(self.conteos, otro.conteos)]
+        self.total += otro.total
+        self.suma_ns += otro.suma_ns
+        self.maximo_ns = max(self.maximo_ns, otro.maximo_ns)
+
+    def vaciar(self):
+        self.conteos[:] = [0] * len(self.conteos)
+        self.total = 0
+        self.suma_ns = 0
+        self.maximo_ns = 0
+
+
+class _TestigoHilo:
+    """Vive en el threading.local del hilo: se libera cuando el hilo termina"""
+
+    __slots__ = ('__weakref__',)
+
+
+class HistogramaLatencias:
+    """Histograma de latencias en ns con percentiles aproximados"""
+
+    def __init__(self, precision=7):
+        """
+        Args:
+            precision: bits de sub-bucket (p); más bits = menos error y más buckets
+        """
+        self.precision = precision
+        self._lineales = 1 << precision           # valores con bucket propio
+        self._mitad = 1 << (precision - 1)        # sub-buckets por potencia de dos
+        self._corrimiento = precision - 1
+        # 2^p valores lineales + 40 potencias de dos (hasta ~2^(p+40) ns, días)
+        self._buckets = self._lineales + 40 * self._mitad
+        self._ultimo = self._buckets - 1
+        self._local = threading.local()
+        # Lo registrado por hilos que ya terminaron
+        self._base = _Fragmento(self._buckets)
+        self._fragmentos = {}  # {clave: fragmento} de los hilos vivos
+        self._claves = itertools.count()
+        self._candado = threading.Lock()
+
+    def _indice(self, valor):
+        # Con 2^p = 2 * 2^(p-1) el índice se reduce a e * 2^(p-1) + (valor >> e)
+        exponente = valor.bit_length() - self.precision
+        if exponente <= 0:
+            return valor
+        return (exponente << self._corrimiento) + (valor >> exponente)
+
+    def _valor(self, indice):
+        """Límite superior del bucket (el percentil nunca subestima)"""
+        if indice < self._lineales:
+            return indice
+        exponente = (indice >> self._corrimiento) - 1
+        base = indice - (exponente << self._corrimiento)
+        return (base << exponente) | ((1 << exponente) - 1)
+
+    def _fragmento_nuevo(self):
+        fragmento = _Fragmento(self._buckets)
+        testigo = _TestigoHilo()
+        clave = next(self._claves)
+        with self._candado:
+            self._fragmentos[clave] = fragmento
+        weakref.finalize(testigo, self._retirar, clave).atexit = False
+        self._local.testigo = testigo
+        self._local.fragmento = fragmento
+        return fragmento
+
+    def _retirar(self, clave):
+        """Suma el fragmento de un hilo terminado a la base (nadie más lo escribe)"""
+        with self._candado:
+            fragmento = self._fragmentos.pop(clave, None)
+            if fragmento is not None:
+                self._base.sumar(fragmento)
+
+    def registrar(self, duracion_ns):
+        """Cuenta una latencia en ns (O(1), sin asignar memoria ni tomar candados)"""
+        try:
+            fragmento = self._local.fragmento
+        except AttributeError:
+            fragmento = self._fragmento_nuevo()
+        if duracion_ns < 0:
+            duracion_ns = 0
+        exponente = duracion_ns.bit_length() - self.precision
+        indice = duracion_ns if exponente <= 0 else (exponente << self._corrimiento) + (duracion_ns >> exponente)
+        fragmento.conteos[indice if indice < self._ultimo else self._ultimo] += 1
+        fragmento.total += 1
+        fragmento.suma_ns += duracion_ns
+        if duracion_ns > fragmento.maximo_ns:
+            fragmento.maximo_ns = duracion_ns
+
+    def _combinar(self):
+        """(conteos, total, suma_ns, maximo_ns) sumando los fragmentos de todos los hilos"""
+        # Copia de la base: un hilo que termina después no se cuenta dos veces
+        with self._candado:
+            base = _Fragmento(self._buckets)
+            base.sumar(self._base)
+            fragmentos = [base, *self._fragmentos.values()]
+        conteos = [0] * self._buckets
+        total = suma = maximo = 0
+        for fragmento in fragmentos:
+            if fragmento.total:
+                conteos = [a + b for a, b in zip(conteos, fragmento.conteos)]
+                total += fragmento.total
+                suma += fragmento.suma_ns
+                maximo = max(maximo, fragmento.maximo_ns)
+        return conteos, total, suma, maximo
+
+    @property
+    def total(self):
+        return self._combinar()[1]
+
+    def _percentil(self, conteos, total, maximo, p):
+        if total == 0:
+            return 0
+        objetivo = max(1, int(total * p / 100 + 0.5))
+        acumulado = 0
+        for indice, conteo in enumerate(conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                return min(self._valor(indice), maximo)
+        return maximo
+
+    def percentil(self, p):
+        """Latencia (ns) bajo la cual queda el p% de las muestras"""
+        conteos, total, _, maximo = self._combinar()
+        return self._percentil(conteos, total, maximo, p)
+
+    def resumen(self):
+        """p50/p95/p99/máx y promedio en microsegundos"""
+        conteos, total, suma, maximo = self._combinar()
+        return {
+            'muestras': total,
+            'p50_us': self._percentil(conteos, total, maximo, 50) / 1000,
+            'p95_us': self._percentil(conteos, total, maximo, 95) / 1000,
+            'p99_us': self._percentil(conteos, total, maximo, 99) / 1000,
+            'max_us': maximo / 1000,
+            'promedio_us': suma / total / 1000 if total else 0.0
+        }
+
+    def reiniciar(self):
+        """
+        Vacía el histograma (inicio de una nueva ventana).
+        Una muestra registrada justo durante el reinicio puede quedar en
+        cualquiera de las dos ventanas.
+        """
+        with self._candado:
+            self._base.vaciar()
+            fragmentos = list(self._fragmentos.values())
+        for fragmento in fragmentos:
+            fragmento.vaciar()
+
+
+class HistogramasOperacion:
+    """Un histograma por (operación, resultado)"""
+
+    def __init__(self, precision=7):
+        self.precision = precision
+        self._histogramas = {}
+        self._candado = threading.Lock()
+
+    def registrar(self, operacion, resultado, duracion_ns):
+        histograma = self._histogramas.get((operacion, resultado))
+        if histograma is None:
+            with self._candado:
+                histograma = self._histogramas.setdefault(
+                    (operacion, resultado), HistogramaLatencias(self.precision)
+                )
+        histograma.registrar(duracion_ns)
+
+    def resumen(self, reiniciar=False):
+        """
+        Percentiles por operación y resultado.
+
+        Args:
+            reiniciar: True para vaciar los histogramas tras leerlos (ventanas)
+
+        Returns:
+            dict: {operacion: {resultado: resumen}}
+        """
+        with self._candado:
+            histogramas = list(self._histogramas.items())
+        resultado_resumen = {}
+        for (operacion, resultado), histograma in histogramas:
+            resultado_resumen.setdefault(operacion, {})[resultado] = histograma.resumen()
+            if reiniciar:
+                histograma.reiniciar()
+        return resultado_resumen
+
+    def reiniciar(self):
+        with self._candado:
+            histogramas = list(self._histogramas.values())
+        for histograma in histogramas:
+            histograma.reiniciar()
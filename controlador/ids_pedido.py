@@ -0,0 +1,120 @@
+"""
+IDS DE PEDIDO - Ids de 64 bits ordenados por tiempo
+===================================================
+crearPedido y el camino alternativo de la vista REST usaban
+random.randint(1000, 9999), que pisa pedidos existentes después de unos
+miles, y nuevoPedido usaba un contador propio que podía chocar con ellos.
+Todos los caminos piden ahora el id a un único generador:
+
+    | 41 bits: ms desde EPOCA_MS | 10 bits: nodo | 12 bits: secuencia |
+
+Los ids son únicos entre nodos (cada uno con su número), crecen con el
+tiempo dentro de un nodo y sirven para recorrer rangos de fechas.
+Si en un milisegundo se agotan las 4096 secuencias, o el reloj retrocede,
+el generador sigue desde el último milisegundo usado en vez de repetir.
+"""
+
+import os
+import threading
+import time
+
+EPOCA_MS = 1704067200000          # 2024-01-01T00:00:00Z
+BITS_NODO = 10
+BITS_SECUENCIA = 12
+MAXIMO_NODO = (1 << BITS_NODO) - 1
+MAXIMO_SECUENCIA = (1 << BITS_SECUENCIA) - 1
+DESPLAZAMIENTO_TIEMPO = BITS_NODO + BITS_SECUENCIA
+
+
+class GeneradorIds:
+    """Genera ids de pedido únicos, monotónicos y con el nodo incluido"""
+
+    def __init__(self, nodo=0, reloj=time.time_ns):
+        """
+        Args:
+            nodo: Número del nodo/proceso (0..1023), distinto en cada uno
+            reloj: Fuente de tiempo en ns (reemplazable en simulaciones)
+        """
+        if not 0 <= nodo <= MAXIMO_NODO:
+            raise ValueError(f"El nodo debe estar entre 0 y {MAXIMO_NODO}")
+        self.nodo = nodo
+        self.reloj = reloj
+        self._bits_nodo = nodo << BITS_SECUENCIA
+        self._ultimo_ms = 0
+        self._secuencia = -1
+        # Sección crítica de unas pocas operaciones aritméticas
+        self._candado = threading.Lock()
+
+    def _avanzar(self, cantidad):
+        """Reserva `cantidad` secuencias; retorna [(ms, primera, última)] (con el candado tomado)"""
+        ahora = self.reloj() // 1_000_000 - EPOCA_MS
+        if ahora > self._ultimo_ms:
+            self._ultimo_ms = ahora
+            self._secuencia = -1
+        tramos = []
+        while cantidad > 0:
+            if self._secuencia == MAXIMO_SECUENCIA:
+                # Milisegundo agotado: se usa el siguiente (el reloj lo alcanzará)
+                self._ultimo_ms += 1
+                self._secuencia = -1
+            primera = self._secuencia + 1
+            ultima = min(MAXIMO_SECUENCIA, primera + cantidad - 1)
+            tramos.append((self._ultimo_ms, primera, ultima))
+            cantidad -= ultima - primera + 1
+            self._secuencia = ultima
+        return tramos
+
+    def siguiente(self):
+        """Un id nuevo"""
+        with self._candado:
+            ahora = self.reloj() // 1_000_000 - EPOCA_MS
+            if ahora > self._ultimo_ms:
+                self._ultimo_ms = ahora
+                self._secuencia = 0
+            elif self._secuencia < MAXIMO_SECUENCIA:
+                self._secuencia += 1
+            else:
+                self._ultimo_ms += 1
+                self._secuencia = 0
+            return (self._ultimo_ms << DESPLAZAMIENTO_TIEMPO) | self._bits_nodo | self._secuencia
+
+    def reservar(self, cantidad):
+        """
+        Bloque de `cantidad` ids crecientes con una sola toma del candado.
+
+        Returns:
+            list: ids en orden creciente
+        """
+        if cantidad <= 0:
+            return []
+        with self._candado:
+            tramos = self._avanzar(cantidad)
+        ids = []
+        for ms, primera, ultima in tramos:
+            base = (ms << DESPLAZAMIENTO_TIEMPO) | self._bits_nodo
+            ids.extend(range(base | primera, (base | ultima) + 1))
+        return ids
+
+
+def fecha_de_id(id_pedido):
+    """Instante (epoch en segundos) en que se generó un id"""
+    return ((id_pedido >> DESPLAZAMIENTO_TIEMPO) + EPOCA_MS) / 1000
+
+
+def nodo_de_id(id_pedido):
+    """Nodo que generó un id"""
+    return (id_pedido >> BITS_SECUENCIA) & MAXIMO_NODO
+
+
+def id_minimo_desde(fecha):
+    """Menor id posible generado en `fecha` (epoch en segundos) o después, para rangos"""
+    return max(0, int(fecha * 1000) - EPOCA_MS) << DESPLAZAMIENTO_TIEMPO
+
+
+# Instancia global; el nodo se toma de UVSHOP_NODO (uno distinto por proceso/servidor)
+generador_ids_global = GeneradorIds(int(os.environ.get("UVSHOP_NODO", "0")))
+
+
+def obtener_generador_ids():
+    """Función utilitaria para obtener el generador de ids de pedido"""
+    return generador_ids_global
@@ -0,0 +1,168 @@
+"""
+ÍNDICE DE VIGENCIA - Ventanas de tiempo para descuentos y promociones
+=====================================================================
+Guarda entradas con ventana [inicio, fin) en dos montículos (heaps):
+- pendientes: ordenadas por inicio, aún no comienzan
+- vencimientos: ordenadas por fin, actualmente activas
+
+avanzar(t) solo toca las entradas que cruzan un borde de su ventana,
+O(log n) por entrada activada o retirada, sin recorrer todas las promociones.
+El tiempo debe avanzar de forma monótona (time.time() por defecto).
+"""
+
+import heapq
+import itertools
+import time
+
+INFINITO = float('inf')
+
+
+def a_segundos(valor, por_defecto):
+    """Acepta None, segundos epoch o datetime"""
+    if valor is None:
+        return por_defecto
+    if hasattr(valor, 'timestamp'):
+        return valor.timestamp()
+    return float(valor)
+
+
+class IndiceVigencia:
+    """Índice de intervalos de vigencia con barrido incremental de vencidos"""
+
+    def __init__(self):
+        self._entradas = {}      # {clave: (inicio, fin, valor, secuencia)}
+        self._activos = {}       # {clave: valor} vigentes al último avanzar()
+        self._pendientes = []    # heap de (inicio, secuencia, clave)
+        self._vencimientos = []  # heap de (fin, secuencia, clave)
+        self._secuencia = itertools.count()
+        self._ultimo_t = -INFINITO
+
+    def agregar(self, clave, valor, inicio=None, fin=None):
+        """
+        Registra (o reemplaza) una entrada con su ventana de vigencia.
+
+        Args:
+            clave: identificador único de la entrada
+            valor: dato asociado (porcentaje, tipo de beneficio, etc.)
+            inicio: comienzo de la vigencia (None = desde ya)
+            fin: término de la vigencia, exclusivo (None = sin vencimiento)
+
+        Returns:
+            bool: True si la entrada quedó activa inmediatamente
+        """
+        inicio = a_segundos(inicio, -INFINITO)
+        fin = a_segundos(fin, INFINITO)
+        self.quitar(clave)
+        secuencia = next(self._secuencia)
+        self._entradas[clave] = (inicio, fin, valor, secuencia)
+        self._compactar()
+        if inicio > self._ultimo_t:
+            heapq.heappush(self._pendientes, (inicio, secuencia, clave))
+            return False
+        if fin <= self._ultimo_t:
+            del self._entradas[clave]
+            return False
+        self._activar(clave, fin, valor, secuencia)
+        return True
+
+    def quitar(self, clave):
+        """Elimina una entrada; sus registros en los heaps se descartan al salir"""
+        if clave not in self._entradas:
+            return False
+        del self._entradas[clave]
+        self._activos.pop(clave, None)
+        return True
+
+    def _activar(self, clave, fin, valor, secuencia):
+        self._activos[clave] = valor
+        if fin != INFINITO:
+            heapq.heappush(self._vencimientos, (fin, secuencia, clave))
+
+    def _compactar(self):
+        """
+        Reconstruye los heaps cuando acumulan demasiados registros obsoletos
+        (entradas renovadas o quitadas), para que la memoria siga a len(self).
+        """
+        if len(self._pendientes) + len(self._vencimientos) <= 2 * len(self._entradas) + 64:
+            return
+        self._pendientes = [r for r in self._pendientes if self._vigente(r[1], r[2])]
+        self._vencimientos = [r for r in self._vencimientos if self._vigente(r[1], r[2])]
+        heapq.heapify(self._pendientes)
+        heapq.heapify(self._vencimientos)
+
+    def _vigente(self, secuencia, clave):
+        entrada = self._entradas.get(clave)
+        return entrada is not None and entrada[3] == secuencia
+
+    def proximo_cambio(self):
+        """Instante del próximo inicio o fin pendiente (INFINITO si no hay)"""
+        for heap in (self._pendientes, self._vencimientos):
+            while heap and not self._vigente(heap[0][1], heap[0][2]):
+                heapq.heappop(heap)
+        proximo = INFINITO
+        if self._pendientes:
+            proximo = self._pendientes[0][0]
+        if self._vencimientos:
+            proximo = min(proximo, self._vencimientos[0][0])
+        return proximo
+
+    def avanzar(self, t=None):
+        """
+        Barre las ventanas que cruzaron el instante t.
+
+        Returns:
+            tuple: (claves activadas, claves retiradas)
+        """
+        t = time.time() if t is None else a_segundos(t, time.time())
+        self._ultimo_t = max(self._ultimo_t, t)
+        activadas = []
+        retiradas = []
+
+        while self._pendientes and self._pendientes[0][0] <= t:
+            _, secuencia, clave = heapq.heappop(self._pendientes)
+            if not self._vigente(secuencia, clave):
+                continue
+            _, fin, valor, _ = self._entradas[clave]
+            if fin <= t:
+                # La ventana completa quedó atrás sin llegar a activarse
+                del self._entradas[clave]
+                retiradas.append(clave)
+                continue
+            self._activar(clave, fin, valor, secuencia)
+            activadas.append(clave)
+
+        while self._vencimientos and self._vencimientos[0][0] <= t:
+            _, secuencia, clave = heapq.heappop(self._vencimientos)
+            if not self._vigente(secuencia, clave):
+                continue
+            del self._entradas[clave]
+            self._activos.pop(clave, None)
+            retiradas.append(clave)
+
+        return activadas, retiradas
+
+    def activos(self, t=None):
+        """Entradas vigentes en t ({clave: valor}), tras barrer lo vencido"""
+        self.avanzar(t)
+        return self._activos
+
+    def esta_activo(self, clave, t=None):
+        """Consulta O(1) de la ventana de una clave en el instante t"""
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return False
+        t = time.time() if t is None else a_segundos(t, time.time())
+        return entrada[0] <= t < entrada[1]
+
+    def obtener(self, clave):
+        """Valor asociado a una clave registrada (o None)"""
+        entrada = self._entradas.get(clave)
+        return entrada[2] if entrada else None
+
+    def ventana(self, clave):
+        """Retorna (inicio, fin) de una clave o None"""
+        entrada = self._entradas.get(clave)
+        return (entrada[0], entrada[1]) if entrada else None
+
+    def __len__(self):
+        return len(self._entradas)
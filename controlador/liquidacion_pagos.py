@@ -0,0 +1,192 @@
+"""
+LIQUIDACIÓN DE PAGOS - Cola con pool de hilos y actualizaciones por lotes
+=========================================================================
+Antes cada pago exitoso cambiaba el estado del pedido dentro de pagarPedido y
+el único registro global era la lista `validas` de pagar.py (hoy el contador
+uvshop_pagos_total de controlador/metricas.py).
+Ahora el resultado del pago se encola; un pool de hilos vacía la cola por
+lotes, aplica los cambios de estado y actualiza los contadores una vez por
+lote. Se reporta throughput, profundidad de la cola y percentiles de latencia
+de liquidación (desde que se inició el pago hasta que quedó aplicado).
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+from controlador.metricas import PAGOS
+
+_log = logging.getLogger(__name__)
+
+
+class ColaLiquidacion:
+    """Liquida resultados de pago en segundo plano, en lotes"""
+
+    def __init__(self, hilos=4, tam_lote=256, muestras_latencia=100000):
+        """
+        Args:
+            hilos: Cantidad de hilos trabajadores
+            tam_lote: Máximo de pagos aplicados por lote
+            muestras_latencia: Últimas latencias guardadas para percentiles
+        """
+        self.hilos = hilos
+        self.tam_lote = tam_lote
+        self._cola = queue.Queue()
+        self._trabajadores = []
+        self._candado = threading.Lock()
+        self._latencias = deque(maxlen=muestras_latencia)
+        self.encolados = 0
+        self.liquidados = 0
+        self.aprobados = 0
+        self.rechazados = 0
+        self.monto_liquidado = 0
+        self.lotes = 0
+        self.profundidad_maxima = 0
+        self._inicio = None
+        self._ultimo = None
+
+    def iniciar(self):
+        """Arranca el pool de hilos (idempotente)"""
+        with self._candado:
+            if self._trabajadores:
+                return
+            for i in range(self.hilos):
+                trabajador = threading.Thread(
+                    target=self._trabajar, name=f"liquidacion-{i}", daemon=True
+                )
+                trabajador.start()
+                self._trabajadores.append(trabajador)
+
+    def detener(self):
+        """Liquida lo pendiente y detiene los hilos"""
+        with self._candado:
+            trabajadores, self._trabajadores = self._trabajadores, []
+        for _ in trabajadores:
+            self._cola.put(None)
+        for trabajador in trabajadores:
+            trabajador.join()
+
+    def encolar(self, pedido, resultado, monto=0, inicio=None, al_liquidar=None):
+        """
+        Encola el resultado de un pago para liquidarlo.
+
+        Args:
+            pedido: Pedido pagado (None si solo se registran contadores)
+            resultado: 200 aprobado, otro código = rechazado
+            monto: Monto cobrado
+            inicio: time.perf_counter() del inicio del pago (por defecto ahora)
+            al_liquidar: función opcional al_liquidar(resultado), se llama tras
+                         aplicar el lote desde el hilo trabajador
+        """
+        self.iniciar()
+        if inicio is None:
+            inicio = time.perf_counter()
+        self._cola.put((pedido, resultado, monto, inicio, al_liquidar))
+        with self._candado:
+            if self._inicio is None:
+                self._inicio = time.perf_counter()
+            self.encolados += 1
+            self.profundidad_maxima = max(self.profundidad_maxima, self._cola.qsize())
+
+    def _trabajar(self):
+        while True:
+            item = self._cola.get()
+            if item is None:
+                self._cola.task_done()
+                return
+            lote = [item]
+            while len(lote) < self.tam_lote:
+                try:
+                    item = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Devolver la señal de término para después del lote
+                    self._cola.task_done()
+                    self._cola.put(None)
+                    break
+                lote.append(item)
+            try:
+                self._aplicar_lote(lote)
+            except Exception as e:
+                # Un lote con error no detiene al trabajador
+                _log.exception("❌ Error liquidando un lote de %s pagos: %s", len(lote), e)
+            finally:
+                for _ in lote:
+                    self._cola.task_done()
+
+    def _aplicar_lote(self, lote):
+        aprobados = 0
+        monto = 0
+        for pedido, resultado, monto_pago, _, _ in lote:
+            if resultado == 200:
+                aprobados += 1
+                monto += monto_pago
+                if pedido is not None:
+                    try:
+                        pedido.setestado("pagado")
+                    except Exception as e:
+                        _log.exception("❌ Error marcando pagado el pedido %s: %s",
+                                       getattr(pedido, 'idPedido', None), e)
+        rechazados = len(lote) - aprobados
+        fin = time.perf_counter()
+
+        try:
+            with self._candado:
+                self.liquidados += len(lote)
+                self.aprobados += aprobados
+                self.rechazados += rechazados
+                self.monto_liquidado += monto
+                self.lotes += 1
+                self._ultimo = fin
+                self._latencias.extend(fin - item[3] for item in lote)
+                #contador global de pagos (/metrics), una vez por lote
+                PAGOS.con("aprobado").inc(aprobados)
+                PAGOS.con("rechazado").inc(rechazados)
+        finally:
+            # Quien espera el pago se entera aunque el lote haya fallado
+            for _, resultado, _, _, al_liquidar in lote:
+                if al_liquidar is not None:
+                    try:
+                        al_liquidar(resultado)
+                    except Exception as e:
+                        _log.exception("❌ Error en callback de liquidación: %s", e)
+
+    def esperar(self):
+        """Bloquea hasta que todo lo encolado quede liquidado"""
+        self._cola.join()
+
+    def obtener_metricas(self):
+        """Throughput, profundidad de la cola y percentiles de latencia (ms)"""
+        with self._candado:
+            latencias = sorted(self._latencias)
+            # Desde el primer pago encolado hasta el último lote aplicado
+            transcurrido = self._ultimo - self._inicio if self._ultimo and self._inicio else 0.0
+            metricas = {
+                'encolados': self.encolados,
+                'liquidados': self.liquidados,
+                'aprobados': self.aprobados,
+                'rechazados': self.rechazados,
+                'monto_liquidado': self.monto_liquidado,
+                'lotes': self.lotes,
+                'tam_lote_promedio': self.liquidados / self.lotes if self.lotes else 0.0,
+                'profundidad': self._cola.qsize(),
+                'profundidad_maxima': self.profundidad_maxima,
+                'throughput_por_s': self.liquidados / transcurrido if transcurrido else 0.0
+            }
+        for nombre, percentil in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+            valor = latencias[min(len(latencias) - 1, int(percentil * len(latencias)))] if latencias else 0.0
+            metricas[f'latencia_{nombre}_ms'] = valor * 1000
+        metricas['latencia_max_ms'] = latencias[-1] * 1000 if latencias else 0.0
+        return metricas
+
+
+# Instancia global de la cola de liquidación
+cola_liquidacion_global = ColaLiquidacion()
+
+
+def obtener_cola_liquidacion():
+    """Función utilitaria para obtener la cola de liquidación"""
+    return cola_liquidacion_global
@@ -0,0 +1,238 @@
+"""
+MÉTRICAS - Registro y exposición en formato de texto de Prometheus
+==================================================================
+Contadores e histogramas que se actualizan sin tomar candados: cada hilo
+suma en su propia celda (igual que histograma_latencias) y solo la lectura
+junta las celdas. Los valores que ya llevan otros componentes (proxy,
+inventario, gestor central, memoria del proceso) se leen con funciones al
+renderizar, así que renderizar cuesta lo mismo sin importar cuántos
+pedidos o usuarios haya: solo depende de la cantidad de series.
+Cuando un hilo termina (el servidor threaded crea uno por conexión) su celda
+se suma a una celda base y se descarta, así las celdas vivas son a lo más
+las de los hilos vivos.
+"""
+
+import itertools
+import os
+import threading
+import weakref
+from bisect import bisect_left
+
+# Límites (segundos) de los buckets de latencia HTTP
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _TestigoHilo:
+    """Vive en el threading.local del hilo: se libera cuando el hilo termina"""
+
+    __slots__ = ('__weakref__',)
+
+
+class _Celdas:
+    """Valores por hilo; cada hilo escribe solo la suya"""
+
+    def __init__(self, crear):
+        self._crear = crear
+        self._local = threading.local()
+        # Lo acumulado por hilos que ya terminaron
+        self._base = crear()
+        self._vivas = {}  # {clave: celda} de los hilos vivos
+        self._claves = itertools.count()
+        self._candado = threading.Lock()
+
+    def propia(self):
+        try:
+            return self._local.celda
+        except AttributeError:
+            celda = self._local.celda = self._crear()
+            testigo = self._local.testigo = _TestigoHilo()
+            clave = next(self._claves)
+            with self._candado:
+                self._vivas[clave] = celda
+            weakref.finalize(testigo, self._retirar, clave).atexit = False
+            return celda
+
+    def _retirar(self, clave):
+        """Suma la celda de un hilo terminado a la base (nadie más la escribe)"""
+        with self._candado:
+            celda = self._vivas.pop(clave, None)
+            if celda is not None:
+                for i, valor in enumerate(celda):
+                    self._base[i] += valor
+
+    def todas(self):
+        # Copia de la base: un hilo que termina después no se cuenta dos veces
+        with self._candado:
+            return [list(self._base), *self._vivas.values()]
+
+
+class Contador:
+    """Contador monotónico"""
+
+    def __init__(self):
+        self._celdas = _Celdas(lambda: [0])
+
+    def inc(self, cantidad=1):
+        self._celdas.propia()[0] += cantidad
+
+    def valor(self):
+        return sum(celda[0] for celda in self._celdas.todas())
+
+
+class HistogramaBuckets:
+    """Histograma con buckets fijos (le) como los de Prometheus"""
+
+    def __init__(self, buckets=BUCKETS_LATENCIA):
+        self.buckets = tuple(buckets)
+        # conteos por bucket (el último es +Inf) y la suma al final
+        self._celdas = _Celdas(lambda: [0] * (len(self.buckets) + 1) + [0.0])
+
+    def observar(self, valor):
+        celda = self._celdas.propia()
+        celda[bisect_left(self.buckets, valor)] += 1
+        celda[-1] += valor
+
+    def instantanea(self):
+        """(conteos acumulados por bucket incluyendo +Inf, suma)"""
+        conteos = [0] * (len(self.buckets) + 1)
+        suma = 0.0
+        for celda in self._celdas.todas():
+            for i in range(len(conteos)):
+                conteos[i] += celda[i]
+            suma += celda[-1]
+        acumulado = 0
+        for i, conteo in enumerate(conteos):
+            acumulado += conteo
+            conteos[i] = acumulado
+        return conteos, suma
+
+
+class Familia:
+    """Una métrica con etiquetas: un hijo (Contador/Histograma) por combinación de valores"""
+
+    def __init__(self, nombre, ayuda, tipo, etiquetas, crear_hijo):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.tipo = tipo
+        self.etiquetas = tuple(etiquetas)
+        self._crear_hijo = crear_hijo
+        self._hijos = {}
+        self._candado = threading.Lock()
+
+    def con(self, *valores):
+        """Hijo para los valores de etiqueta dados (se crea en el primer uso)"""
+        hijo = self._hijos.get(valores)
+        if hijo is None:
+            with self._candado:
+                hijo = self._hijos.get(valores)
+                if hijo is None:
+                    hijo = self._hijos[valores] = self._crear_hijo()
+        return hijo
+
+    def hijos(self):
+        with self._candado:
+            return list(self._hijos.items())
+
+
+class RegistroMetricas:
+    """Conjunto de métricas del proceso y su renderizado para /metrics"""
+
+    def __init__(self):
+        self._familias = {}
+        self._derivadas = {}
+        self._candado = threading.Lock()
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._familia(nombre, ayuda, "counter", etiquetas, Contador)
+
+    def histograma(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        return self._familia(nombre, ayuda, "histogram", etiquetas, lambda: HistogramaBuckets(buckets))
+
+    def _familia(self, nombre, ayuda, tipo, etiquetas, crear_hijo):
+        with self._candado:
+            familia = self._familias.get(nombre)
+            if familia is None:
+                familia = self._familias[nombre] = Familia(nombre, ayuda, tipo, etiquetas, crear_hijo)
+            return familia
+
+    def derivada(self, nombre, ayuda, tipo, etiquetas, funcion):
+        """
+        Métrica calculada al renderizar a partir del estado de otro componente.
+
+        Args:
+            tipo: "counter" o "gauge"
+            etiquetas: nombres de las etiquetas
+            funcion: retorna {tupla de valores de etiqueta: valor}
+        """
+        with self._candado:
+            self._derivadas[nombre] = (ayuda, tipo, tuple(etiquetas), funcion)
+
+    def renderizar(self):
+        """Texto en formato de exposición de Prometheus (versión 0.0.4)"""
+        with self._candado:
+            familias = list(self._familias.values())
+            derivadas = list(self._derivadas.items())
+        lineas = []
+        for familia in familias:
+            lineas.append(f"# HELP {familia.nombre} {familia.ayuda}")
+            lineas.append(f"# TYPE {familia.nombre} {familia.tipo}")
+            for valores, hijo in familia.hijos():
+                etiquetas = _etiquetas(familia.etiquetas, valores)
+                if familia.tipo == "histogram":
+                    conteos, suma = hijo.instantanea()
+                    for limite, conteo in zip(hijo.buckets + ("+Inf",), conteos):
+                        con_le = _etiquetas(familia.etiquetas + ("le",), valores + (str(limite),))
+                        lineas.append(f"{familia.nombre}_bucket{con_le} {conteo}")
+                    lineas.append(f"{familia.nombre}_sum{etiquetas} {suma}")
+                    lineas.append(f"{familia.nombre}_count{etiquetas} {conteos[-1]}")
+                else:
+                    lineas.append(f"{familia.nombre}{etiquetas} {hijo.valor()}")
+        for nombre, (ayuda, tipo, nombres_etiquetas, funcion) in derivadas:
+            try:
+                valores_derivados = funcion()
+            except Exception as e:
+                lineas.append(f"# ERROR {nombre}: {e}")
+                continue
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for valores, valor in valores_derivados.items():
+                lineas.append(f"{nombre}{_etiquetas(nombres_etiquetas, valores)} {valor}")
+        return "\n".join(lineas) + "\n"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(nombres, valores):
+    if not nombres:
+        return ""
+    return "{" + ",".join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)) + "}"
+
+
+def memoria_residente_bytes():
+    """Memoria residente actual del proceso (Linux); si no, el máximo histórico"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Instancia global del registro de métricas
+registro_metricas_global = RegistroMetricas()
+registro_metricas_global.derivada(
+    "process_resident_memory_bytes", "Memoria residente del proceso", "gauge", (),
+    lambda: {(): memoria_residente_bytes()}
+)
+
+# Resultados de pagos (reemplaza la lista `validas` de pagar.py)
+PAGOS = registro_metricas_global.contador(
+    "uvshop_pagos_total", "Pagos terminados por resultado", ("resultado",)
+)
+
+
+def obtener_registro_metricas():
+    """Función utilitaria para obtener el registro de métricas"""
+    return registro_metricas_global
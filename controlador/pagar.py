@@ -1,6 +1,13 @@
 from abc import ABC, abstractmethod
+import asyncio
+import logging
+import random
+import threading
 import time
-validas = [0,0]
+from controlador.riesgo_pagos import obtener_puntuador_riesgo
+#registro de transacciones: contador uvshop_pagos_total{resultado} de /metrics
+from controlador.metricas import PAGOS
+_log = logging.getLogger(__name__)
 class pagar(ABC):
     @abstractmethod
     def procesarPago(self, monto, idUsuario):
@@ -82,10 +89,10 @@ class QR(pagar):
             time.sleep(0.5)
             print("Pago Procesado")
             #registro de transacciones exitosas
-            validas[0] += 1
+            PAGOS.con("aprobado").inc()
             return 200
         else:
-            validas[1] += 1
+            PAGOS.con("rechazado").inc()
             return 400
 
 class FabricaDePagos(ABC):
@@ -116,17 +123,79 @@ class FabricaQR(FabricaDePagos):
         return QR()
 
 
+#PASARELAS SIMULADAS
+#no piden input ni bloquean el servidor: latencia y tasa de fallo configurables
+class PasarelaSimulada(pagar):
+    """
+    Pasarela local de prueba. procesarPagoAsync espera con asyncio.sleep,
+    procesarPago (sincrono) con time.sleep; ambas retornan 200 o 400.
+    latencia: segundos fijos o tupla (minimo, maximo) para una latencia aleatoria.
+    tasa_fallo: pagos rechazados (400); tasa_error: caidas de la pasarela (ConnectionError)
+    """
+    def __init__(self, nombre, latencia=0.05, tasa_fallo=0.0, semilla=None, tasa_error=0.0):
+        self.nombre = nombre
+        self.latencia = latencia
+        self.tasa_fallo = tasa_fallo
+        self.tasa_error = tasa_error
+        self.azar = random.Random(semilla)
+        self.llamadas = 0
+        self.candado = threading.Lock()
+
+    def demora(self):
+        if isinstance(self.latencia, tuple):
+            return self.azar.uniform(*self.latencia)
+        return self.latencia
+
+    def resultado(self):
+        with self.candado:
+            self.llamadas += 1
+            azar = self.azar.random()
+        if azar < self.tasa_error:
+            raise ConnectionError(f"pasarela {self.nombre} no disponible")
+        return 400 if azar < self.tasa_error + self.tasa_fallo else 200
+
+    async def procesarPagoAsync(self, monto, usuario):
+        await asyncio.sleep(self.demora())
+        return self.resultado()
+
+    def procesarPago(self, monto, usuario):
+        time.sleep(self.demora())
+        return self.resultado()
+
+class FabricaPasarela(FabricaDePagos):
+    #entrega siempre la misma pasarela, asi se comparten sus contadores
+    def __init__(self, pasarela):
+        self.pasarela = pasarela
+
+    def crearMetodoPago(self) -> pagar:
+        return self.pasarela
+
+#una pasarela simulada por cada tipo de pago
+pasarelas = {
+    "transferencia": PasarelaSimulada("transferencia", latencia=(0.1, 0.3), tasa_fallo=0.02),
+    "tarjeta": PasarelaSimulada("tarjeta", latencia=(0.02, 0.08), tasa_fallo=0.03),
+    "cripto": PasarelaSimulada("cripto", latencia=(0.2, 0.5), tasa_fallo=0.05),
+    "entrega": PasarelaSimulada("entrega", latencia=0.0),
+    "qr": PasarelaSimulada("qr", latencia=(0.05, 0.15), tasa_fallo=0.02),
+}
+
+def fabricaPorTipo(tipoPago):
+    #retorna None si el tipo de pago no existe
+    pasarela = pasarelas.get(tipoPago)
+    return FabricaPasarela(pasarela) if pasarela is not None else None
+
+
 #verificacion control de identidad, fraude, auditoria,etc
 
-def verificador(idUsuario):
-    print(f"\nSe implementarom medidas de seguridad, lo estamos verificando {idUsuario}")
-    time.sleep(1.5)
-    print("Identidad verificada correctamente\n")
+#solo los pagos de alto riesgo pasan por la verificacion lenta (ver riesgo_pagos.py)
+def verificador(idUsuario, monto=None):
+    if obtener_puntuador_riesgo().verificar_sincrono(idUsuario, monto):
+        _log.info("Se implementaron medidas de seguridad, verificando al usuario %s: identidad verificada", idUsuario)
 
 #Funcion de uso
 def procesarPago(fabrica: FabricaDePagos, monto, idUsuario):
     metodoPagar = fabrica.crearMetodoPago()
-    verificador(idUsuario)
+    verificador(idUsuario, monto)
     resultado = metodoPagar.procesarPago(monto, idUsuario)
     return resultado
 
@@ -0,0 +1,166 @@
+"""
+PROCESADOR DE PAGOS ASÍNCRONO - Pagos sin bloquear hilos del servidor
+=====================================================================
+Los métodos de pagar.py piden input() y duermen con time.sleep, por lo que
+un pago ocupaba un hilo del servidor durante segundos.
+El procesador corre un event loop de asyncio en un hilo propio: los pagos se
+envían con enviar() y se completan con un Future y/o un callback, manteniendo
+miles de pagos en vuelo sin un hilo por pago.
+"""
+
+import asyncio
+import logging
+import threading
+
+from controlador.riesgo_pagos import obtener_puntuador_riesgo
+
+_log = logging.getLogger(__name__)
+
+
+class ProcesadorPagosAsincrono:
+    """
+    Driver asyncio para pagos.
+    Los métodos con procesarPagoAsync (PasarelaSimulada) se esperan en el loop;
+    los métodos heredados solo sincronos se ejecutan con asyncio.to_thread.
+    """
+
+    def __init__(self, max_en_vuelo=10000, verificador=None):
+        """
+        Args:
+            max_en_vuelo: Máximo de pagos concurrentes en el loop
+            verificador: corrutina opcional verificador(idUsuario, monto) que
+                         se espera antes de cobrar
+        """
+        self.max_en_vuelo = max_en_vuelo
+        self.verificador = verificador
+        self._loop = None
+        self._hilo = None
+        self._semaforo = None
+        self._candado = threading.Lock()
+        self.en_vuelo = 0
+        self.max_en_vuelo_observado = 0
+        self.aprobados = 0
+        self.rechazados = 0
+        self.errores = 0
+
+    def iniciar(self):
+        """Arranca el event loop en segundo plano (idempotente)"""
+        with self._candado:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._loop = asyncio.new_event_loop()
+            listo = threading.Event()
+            self._hilo = threading.Thread(
+                target=self._ejecutar_loop, args=(listo,), name="procesador-pagos", daemon=True
+            )
+            self._hilo.start()
+            listo.wait()
+
+    def _ejecutar_loop(self, listo):
+        asyncio.set_event_loop(self._loop)
+        self._semaforo = asyncio.Semaphore(self.max_en_vuelo)
+        listo.set()
+        self._loop.run_forever()
+
+    def detener(self):
+        """Detiene el event loop; los pagos pendientes se cancelan"""
+        with self._candado:
+            if self._loop is None:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._hilo.join()
+            self._loop.close()
+            self._loop = None
+            self._hilo = None
+
+    async def procesar(self, fabrica, monto, idUsuario):
+        """
+        Corrutina de un pago: verificación opcional y cobro en la pasarela.
+        Puede usarse directamente desde cualquier event loop.
+
+        Returns:
+            int: 200 aprobado, 400 rechazado
+        """
+        metodo = fabrica.crearMetodoPago()
+        if self.verificador is not None:
+            await self.verificador(idUsuario, monto)
+        procesar_async = getattr(metodo, 'procesarPagoAsync', None)
+        if procesar_async is not None:
+            return await procesar_async(monto, idUsuario)
+        return await asyncio.to_thread(metodo.procesarPago, monto, idUsuario)
+
+    async def _procesar_contado(self, fabrica, monto, idUsuario, callback):
+        async with self._semaforo:
+            self.en_vuelo += 1
+            self.max_en_vuelo_observado = max(self.max_en_vuelo_observado, self.en_vuelo)
+            try:
+                resultado = await self.procesar(fabrica, monto, idUsuario)
+            except Exception as e:
+                _log.error("❌ Error procesando pago de %s: %s", idUsuario, e)
+                self.errores += 1
+                resultado = 500
+            finally:
+                self.en_vuelo -= 1
+        if resultado == 200:
+            self.aprobados += 1
+        elif resultado == 400:
+            self.rechazados += 1
+        # El callback corre en el loop antes de resolver el Future
+        if callback is not None:
+            callback(resultado)
+        return resultado
+
+    def enviar(self, fabrica, monto, idUsuario, callback=None):
+        """
+        Envía un pago sin bloquear al llamador.
+
+        Args:
+            fabrica: FabricaDePagos del método de pago
+            monto: Monto a cobrar
+            idUsuario: Usuario que paga
+            callback: función opcional callback(resultado), corre en el hilo
+                      del loop: debe ser breve y no bloquear
+
+        Returns:
+            concurrent.futures.Future: se resuelve con 200, 400 o 500
+        """
+        self.iniciar()
+        return asyncio.run_coroutine_threadsafe(
+            self._procesar_contado(fabrica, monto, idUsuario, callback), self._loop
+        )
+
+    def obtener_metricas(self):
+        """Pagos en vuelo, máximo observado y resultados"""
+        return {
+            'en_vuelo': self.en_vuelo,
+            'max_en_vuelo_observado': self.max_en_vuelo_observado,
+            'aprobados': self.aprobados,
+            'rechazados': self.rechazados,
+            'errores': self.errores
+        }
+
+
+async def procesar_pagos_concurrentes(pagos, max_en_vuelo=10000, verificador=None):
+    """
+    Procesa una lista de pagos [(fabrica, monto, idUsuario), ...] en el loop actual.
+
+    Returns:
+        list: resultados (200/400) en el mismo orden
+    """
+    procesador = ProcesadorPagosAsincrono(max_en_vuelo, verificador)
+    semaforo = asyncio.Semaphore(max_en_vuelo)
+
+    async def uno(fabrica, monto, idUsuario):
+        async with semaforo:
+            return await procesador.procesar(fabrica, monto, idUsuario)
+
+    return await asyncio.gather(*(uno(*pago) for pago in pagos))
+
+
+# Instancia global del procesador de pagos (verificación solo para alto riesgo)
+procesador_pagos_global = ProcesadorPagosAsincrono(verificador=obtener_puntuador_riesgo().verificar)
+
+
+def obtener_procesador_pagos():
+    """Función utilitaria para obtener la instancia del procesador de pagos"""
+    return procesador_pagos_global
@@ -0,0 +1,157 @@
+"""
+REGISTRO DE AUDITORÍA - Buffer circular con escritura en segundo plano
+======================================================================
+El log central guardaba cadenas formateadas en una lista sin límite y las
+imprimía en cada operación (I/O sincrono en el hilo de la solicitud).
+Ahora cada evento es un registro compacto en un buffer circular de capacidad
+fija; un hilo en segundo plano lo vuelca a un archivo rotativo (JSON por
+línea). Registrar nunca hace I/O: si el hilo no alcanza a vaciar el buffer,
+los registros más antiguos se pierden y se cuentan como descartados.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+# Tipos de evento de un registro
+INICIO = 0
+RESULTADO = 1
+ERROR = 2
+NOMBRES_EVENTO = ("INICIO", "RESULTADO", "ERROR")
+
+RegistroOperacion = namedtuple(
+    'RegistroOperacion', ['t_ns', 'operacion', 'evento', 'id_usuario', 'id_pedido', 'estado']
+)
+
+
+class RegistroAuditoria:
+    """Buffer circular de registros de operación con volcado a archivo rotativo"""
+
+    def __init__(self, capacidad=65536, archivo=None, max_bytes=5 * 1024 * 1024,
+                 respaldos=3, intervalo=0.5, eco=False):
+        """
+        Args:
+            capacidad: Registros que caben en memoria
+            archivo: Ruta del archivo de auditoría (None = solo memoria)
+            max_bytes: Tamaño desde el cual se rota el archivo
+            respaldos: Archivos rotados que se conservan (.1, .2, ...)
+            intervalo: Segundos entre volcados
+            eco: True para imprimir los registros desde el hilo de volcado
+        """
+        self.capacidad = capacidad
+        self.archivo = archivo
+        self.max_bytes = max_bytes
+        self.respaldos = respaldos
+        self.intervalo = intervalo
+        self.eco = eco
+        self._buffer = [None] * capacidad
+        self._escritos = 0   # total de registros escritos (la posición es escritos % capacidad)
+        self._volcados = 0   # registros ya enviados al archivo
+        self.descartados = 0
+        self._candado = threading.Lock()
+        self._candado_archivo = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._salida = None
+
+    def registrar(self, operacion, evento=INICIO, id_usuario=None, id_pedido=None, estado=None):
+        """Agrega un registro al buffer (O(1), sin I/O)"""
+        registro = RegistroOperacion(time.monotonic_ns(), operacion, evento, id_usuario, id_pedido, estado)
+        with self._candado:
+            self._buffer[self._escritos % self.capacidad] = registro
+            self._escritos += 1
+
+    def ultimos(self, cantidad=5):
+        """Los últimos registros, del más antiguo al más reciente"""
+        with self._candado:
+            cantidad = min(cantidad, self._escritos, self.capacidad)
+            return [self._buffer[i % self.capacidad] for i in range(self._escritos - cantidad, self._escritos)]
+
+    def __len__(self):
+        return min(self._escritos, self.capacidad)
+
+    # ===== VOLCADO EN SEGUNDO PLANO =====
+
+    def iniciar(self):
+        """Arranca el hilo de volcado (idempotente)"""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="auditoria-central", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Vuelca lo pendiente, detiene el hilo y cierra el archivo"""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+        with self._candado_archivo:
+            if self._salida is not None:
+                self._salida.close()
+                self._salida = None
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            self.volcar()
+        self.volcar()
+
+    def _pendientes(self):
+        with self._candado:
+            desde = self._volcados
+            if self._escritos - desde > self.capacidad:
+                self.descartados += self._escritos - desde - self.capacidad
+                desde = self._escritos - self.capacidad
+            pendientes = [self._buffer[i % self.capacidad] for i in range(desde, self._escritos)]
+            self._volcados = self._escritos
+        return pendientes
+
+    def volcar(self):
+        """Escribe en el archivo los registros nuevos; retorna cuántos escribió"""
+        pendientes = self._pendientes()
+        if not pendientes:
+            return 0
+        lineas = "".join(
+            json.dumps({
+                't_ns': registro.t_ns,
+                'op': registro.operacion,
+                'evento': NOMBRES_EVENTO[registro.evento],
+                'usuario': registro.id_usuario,
+                'pedido': registro.id_pedido,
+                'estado': registro.estado
+            }, ensure_ascii=False, default=str) + "\n"
+            for registro in pendientes
+        )
+        with self._candado_archivo:
+            if self.eco:
+                print(lineas, end="")
+            if self.archivo is not None:
+                salida = self._abrir()
+                salida.write(lineas)
+                salida.flush()
+                if salida.tell() >= self.max_bytes:
+                    self._rotar()
+        return len(pendientes)
+
+    def _abrir(self):
+        if self._salida is None:
+            carpeta = os.path.dirname(self.archivo)
+            if carpeta:
+                os.makedirs(carpeta, exist_ok=True)
+            self._salida = open(self.archivo, "a", encoding="utf-8")
+        return self._salida
+
+    def _rotar(self):
+        self._salida.close()
+        self._salida = None
+        for i in range(self.respaldos - 1, 0, -1):
+            origen = f"{self.archivo}.{i}"
+            if os.path.exists(origen):
+                os.replace(origen, f"{self.archivo}.{i + 1}")
+        if self.respaldos > 0:
+            os.replace(self.archivo, f"{self.archivo}.1")
+        else:
+            os.remove(self.archivo)
+        self._abrir()
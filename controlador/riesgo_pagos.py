@@ -0,0 +1,180 @@
+"""
+RIESGO DE PAGOS - Puntaje de fraude incremental y en cache
+==========================================================
+pagar.verificador dormía 1.5s en cada pago sin importar el usuario.
+El puntuador mantiene por usuario, de forma incremental, las señales que
+salen del historial de pedidos y pagos:
+- tasa de pedidos en la ventana reciente
+- desviación del monto respecto del promedio del usuario (Welford)
+- proporción de pagos rechazados (los 5xx de pasarela caída, plazo vencido o
+  cortacircuitos abierto no son culpa del usuario y no cuentan)
+El puntaje base de cada usuario se guarda en cache y se invalida con cada
+evento; solo los pagos de alto riesgo pasan por la verificación costosa.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+
+
+class _HistorialUsuario:
+    """Señales acumuladas de un usuario (O(1) por evento)"""
+
+    __slots__ = ('pedidos_recientes', 'n', 'media', 'm2', 'pagos', 'fallidos')
+
+    def __init__(self):
+        self.pedidos_recientes = deque()  # instantes de pedidos dentro de la ventana
+        self.n = 0          # pedidos con monto
+        self.media = 0.0    # monto promedio
+        self.m2 = 0.0       # suma de cuadrados de diferencias (Welford)
+        self.pagos = 0
+        self.fallidos = 0
+
+
+class PuntuadorRiesgo:
+    """
+    Puntaje de riesgo 0..1 por pago.
+    base = max(frecuencia, fallos), en cache por usuario; el pago suma la
+    desviación de su monto: max(base, desviación) + la mitad de la menor.
+    """
+
+    def __init__(self, umbral_alto=0.7, ventana=3600.0, pedidos_por_ventana=10,
+                 latencia_verificacion=1.5, reloj=time.time):
+        """
+        Args:
+            umbral_alto: Puntaje desde el cual se hace la verificación costosa
+            ventana: Segundos considerados para la tasa de pedidos
+            pedidos_por_ventana: Pedidos en la ventana que cuentan como riesgo máximo
+            latencia_verificacion: Duración de la verificación costosa (s)
+            reloj: Fuente de tiempo (reemplazable en simulaciones)
+        """
+        self.umbral_alto = umbral_alto
+        self.ventana = ventana
+        self.pedidos_por_ventana = pedidos_por_ventana
+        self.latencia_verificacion = latencia_verificacion
+        self.reloj = reloj
+        self._historial = {}       # {idUsuario: _HistorialUsuario}
+        self._cache_base = {}      # {idUsuario: (puntaje base, vence)}
+        self._candado = threading.Lock()
+        self.verificaciones_costosas = 0
+        self.verificaciones_rapidas = 0
+        self.aciertos_cache = 0
+
+    def _historial_de(self, idUsuario):
+        historial = self._historial.get(idUsuario)
+        if historial is None:
+            historial = self._historial[idUsuario] = _HistorialUsuario()
+        return historial
+
+    def registrar_pedido(self, idUsuario, monto=None, t=None):
+        """Evento: el usuario creó un pedido por `monto` (None = monto desconocido, solo cuenta la frecuencia)"""
+        self.registrar_pedidos(((idUsuario, monto),), t)
+
+    def registrar_pedidos(self, pedidos, t=None):
+        """Eventos de varios pedidos [(idUsuario, monto), ...] con una sola toma del candado"""
+        t = self.reloj() if t is None else t
+        with self._candado:
+            for idUsuario, monto in pedidos:
+                historial = self._historial_de(idUsuario)
+                historial.pedidos_recientes.append(t)
+                if monto is not None:
+                    historial.n += 1
+                    delta = monto - historial.media
+                    historial.media += delta / historial.n
+                    historial.m2 += delta * (monto - historial.media)
+                self._cache_base.pop(idUsuario, None)
+
+    def registrar_pago(self, idUsuario, resultado):
+        """
+        Evento: terminó un pago del usuario (200 aprobado, 4xx rechazado).
+        Los errores de infraestructura (5xx, ej. 502/503/504 del cortacircuitos)
+        no dicen nada del usuario y se ignoran.
+        """
+        if not isinstance(resultado, int) or resultado >= 500:
+            return
+        with self._candado:
+            historial = self._historial_de(idUsuario)
+            historial.pagos += 1
+            if resultado != 200:
+                historial.fallidos += 1
+            self._cache_base.pop(idUsuario, None)
+
+    def _puntaje_base(self, idUsuario, t):
+        """Frecuencia y fallos; se guarda hasta que salga un pedido de la ventana"""
+        entrada = self._cache_base.get(idUsuario)
+        if entrada is not None and t < entrada[1]:
+            self.aciertos_cache += 1
+            return entrada[0]
+
+        historial = self._historial.get(idUsuario)
+        if historial is None:
+            return 0.0
+        recientes = historial.pedidos_recientes
+        while recientes and recientes[0] <= t - self.ventana:
+            recientes.popleft()
+        frecuencia = min(1.0, len(recientes) / self.pedidos_por_ventana)
+        # Pocos pagos no alcanzan para sospechar: se suaviza con 2 pagos "buenos"
+        fallos = historial.fallidos / (historial.pagos + 2)
+        base = max(frecuencia, fallos)
+        vence = recientes[0] + self.ventana if recientes else math.inf
+        self._cache_base[idUsuario] = (base, vence)
+        return base
+
+    def evaluar(self, idUsuario, monto=None, t=None):
+        """
+        Puntaje de riesgo de un pago.
+
+        Returns:
+            float: entre 0 (sin riesgo) y 1 (riesgo máximo)
+        """
+        t = self.reloj() if t is None else t
+        with self._candado:
+            base = self._puntaje_base(idUsuario, t)
+            historial = self._historial.get(idUsuario)
+            desviacion = 0.0
+            if monto is not None and historial is not None and historial.n >= 3:
+                desvio = math.sqrt(historial.m2 / (historial.n - 1))
+                if desvio > 0:
+                    # z-score: 4 desvíos sobre el promedio es riesgo máximo
+                    desviacion = min(1.0, max(0.0, (monto - historial.media) / desvio) / 4)
+        return min(1.0, max(base, desviacion) + 0.5 * min(base, desviacion))
+
+    def es_alto_riesgo(self, idUsuario, monto=None):
+        return self.evaluar(idUsuario, monto) >= self.umbral_alto
+
+    async def verificar(self, idUsuario, monto=None):
+        """Verificador para ProcesadorPagosAsincrono: solo espera si el riesgo es alto"""
+        if self.es_alto_riesgo(idUsuario, monto):
+            self.verificaciones_costosas += 1
+            await asyncio.sleep(self.latencia_verificacion)
+        else:
+            self.verificaciones_rapidas += 1
+
+    def verificar_sincrono(self, idUsuario, monto=None):
+        """Igual que verificar, para el flujo sincrono de pagar.procesarPago"""
+        if self.es_alto_riesgo(idUsuario, monto):
+            self.verificaciones_costosas += 1
+            time.sleep(self.latencia_verificacion)
+            return True
+        self.verificaciones_rapidas += 1
+        return False
+
+    def obtener_metricas(self):
+        """Verificaciones costosas vs rápidas y aciertos del cache"""
+        return {
+            'usuarios': len(self._historial),
+            'verificaciones_costosas': self.verificaciones_costosas,
+            'verificaciones_rapidas': self.verificaciones_rapidas,
+            'aciertos_cache': self.aciertos_cache
+        }
+
+
+# Instancia global del puntuador de riesgo
+puntuador_riesgo_global = PuntuadorRiesgo()
+
+
+def obtener_puntuador_riesgo():
+    """Función utilitaria para obtener el puntuador de riesgo"""
+    return puntuador_riesgo_global
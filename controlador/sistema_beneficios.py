@@ -3,10 +3,25 @@ SISTEMA DE BENEFICIOS DINÁMICOS PARA CLIENTES - Patrón Decorator
 ================================================================
 Caso de Uso 3: Beneficios que pueden agregarse/quitarse sin alterar las clases cliente.
 Mantiene la clase usuario existente intacta.
+
+Cada cadena de decoradores se pliega en un VectorBeneficios inmutable
+(descuento, envío gratis, cashback, descripción). Los getters leen el vector
+en O(1) y la cadena solo se vuelve a plegar si cambia el tipo del cliente base.
 """
 
+import logging
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import namedtuple
 from modelo.usuario import usuario
+from controlador.indice_vigencia import IndiceVigencia, INFINITO, a_segundos
+
+_log = logging.getLogger(__name__)
+
+
+# Registro plano e inmutable con el resultado de toda la cadena de beneficios
+VectorBeneficios = namedtuple('VectorBeneficios', ['descuento', 'envio_gratis', 'cashback', 'descripcion'])
 
 
 class ComponenteCliente(ABC):
@@ -31,35 +46,67 @@ class ComponenteCliente(ABC):
     @abstractmethod
     def obtener_usuario_base(self):
         pass
+    
+    def compilar(self):
+        """Vector plano de beneficios (por defecto, desde los getters)"""
+        return VectorBeneficios(
+            self.obtener_descuento(),
+            self.tiene_envio_gratis(),
+            self.obtener_cashback(),
+            self.obtener_descripcion()
+        )
+    
+    def firma(self):
+        """Valor que, al cambiar, obliga a volver a plegar las cadenas que lo envuelven"""
+        return None
 
 
 class ClienteBase(ComponenteCliente):
     """Wrapper para la clase usuario existente (sin modificarla)"""
     
+    descuentos_base = {
+        'nuevo': 5,
+        'frecuente': 10, 
+        'vip': 15
+    }
+    
     def __init__(self, usuario_existente):
         self.usuario = usuario_existente
+        self._vector = None
+        self._tipo_compilado = None
+    
+    def firma(self):
+        """El vector base depende solo del tipo de cliente"""
+        return self.usuario.getTipoCliente()
+    
+    def compilar(self):
+        """Vector base según el tipo de cliente original"""
+        tipo = self.usuario.getTipoCliente()
+        if self._vector is None or tipo != self._tipo_compilado:
+            self._vector = VectorBeneficios(
+                self.descuentos_base.get(tipo.lower(), 0),  # Descuento base por tipo
+                tipo.lower() == 'vip',                      # Solo VIP tiene envío gratis
+                0,                                          # Sin cashback por defecto
+                f"Cliente {tipo}"
+            )
+            self._tipo_compilado = tipo
+        return self._vector
     
     def obtener_descuento(self):
         """Descuento base según tipo de cliente original"""
-        tipo = self.usuario.getTipoCliente().lower()
-        descuentos_base = {
-            'nuevo': 5,
-            'frecuente': 10, 
-            'vip': 15
-        }
-        return descuentos_base.get(tipo, 0)
+        return self.compilar().descuento
     
     def tiene_envio_gratis(self):
         """Solo VIP tiene envío gratis por defecto"""
-        return self.usuario.getTipoCliente().lower() == 'vip'
+        return self.compilar().envio_gratis
     
     def obtener_cashback(self):
         """Sin cashback por defecto"""
-        return 0
+        return self.compilar().cashback
     
     def obtener_descripcion(self):
         """Descripción del cliente base"""
-        return f"Cliente {self.usuario.getTipoCliente()}"
+        return self.compilar().descripcion
     
     def obtener_usuario_base(self):
         """Retorna el usuario original"""
@@ -67,25 +114,44 @@ class ClienteBase(ComponenteCliente):
 
 
 class DecoradorBeneficio(ComponenteCliente):
-    """Decorator base para beneficios adicionales"""
+    """
+    Decorator base para beneficios adicionales.
+    Las subclases definen _plegar(interior) en vez de reenviar cada getter.
+    """
     
     def __init__(self, componente_cliente):
         self._componente = componente_cliente
+        # Componente más interno de la cadena (normalmente ClienteBase)
+        self._raiz = getattr(componente_cliente, '_raiz', componente_cliente)
+        self._vector = None
+        self._firma = None
+    
+    def _plegar(self, interior):
+        """Aplica este beneficio sobre el vector del componente interior"""
+        return interior
+    
+    def compilar(self):
+        """Vector de toda la cadena; solo se recalcula si cambió la raíz"""
+        firma = self._raiz.firma()
+        if self._vector is None or firma != self._firma:
+            self._vector = self._plegar(self._componente.compilar())
+            self._firma = firma
+        return self._vector
     
     def obtener_descuento(self):
-        return self._componente.obtener_descuento()
+        return self.compilar().descuento
     
     def tiene_envio_gratis(self):
-        return self._componente.tiene_envio_gratis()
+        return self.compilar().envio_gratis
     
     def obtener_cashback(self):
-        return self._componente.obtener_cashback()
+        return self.compilar().cashback
     
     def obtener_descripcion(self):
-        return self._componente.obtener_descripcion()
+        return self.compilar().descripcion
     
     def obtener_usuario_base(self):
-        return self._componente.obtener_usuario_base()
+        return self._raiz.obtener_usuario_base()
 
 
 class BeneficioDescuentoExtra(DecoradorBeneficio):
@@ -95,21 +161,21 @@ class BeneficioDescuentoExtra(DecoradorBeneficio):
         super().__init__(componente_cliente)
         self.descuento_extra = descuento_extra
     
-    def obtener_descuento(self):
-        return self._componente.obtener_descuento() + self.descuento_extra
-    
-    def obtener_descripcion(self):
-        return f"{self._componente.obtener_descripcion()} + Descuento Extra {self.descuento_extra}%"
+    def _plegar(self, interior):
+        return interior._replace(
+            descuento=interior.descuento + self.descuento_extra,
+            descripcion=f"{interior.descripcion} + Descuento Extra {self.descuento_extra}%"
+        )
 
 
 class BeneficioEnvioGratis(DecoradorBeneficio):
     """Decorator: Envío gratis temporal"""
     
-    def tiene_envio_gratis(self):
-        return True  # Fuerza envío gratis
-    
-    def obtener_descripcion(self):
-        return f"{self._componente.obtener_descripcion()} + Envío Gratis"
+    def _plegar(self, interior):
+        return interior._replace(
+            envio_gratis=True,  # Fuerza envío gratis
+            descripcion=f"{interior.descripcion} + Envío Gratis"
+        )
 
 
 class BeneficioCashback(DecoradorBeneficio):
@@ -119,42 +185,165 @@ class BeneficioCashback(DecoradorBeneficio):
         super().__init__(componente_cliente)
         self.cashback = porcentaje_cashback
     
-    def obtener_cashback(self):
-        return self._componente.obtener_cashback() + self.cashback
-    
-    def obtener_descripcion(self):
-        return f"{self._componente.obtener_descripcion()} + Cashback {self.cashback}%"
+    def _plegar(self, interior):
+        return interior._replace(
+            cashback=interior.cashback + self.cashback,
+            descripcion=f"{interior.descripcion} + Cashback {self.cashback}%"
+        )
 
 
 class BeneficioVIPMejorado(DecoradorBeneficio):
     """Decorator: Beneficio VIP temporal mejorado (ejemplo del caso de uso)"""
     
-    def obtener_descuento(self):
-        return max(self._componente.obtener_descuento(), 15)  # Mínimo 15%
-    
-    def tiene_envio_gratis(self):
-        return True
-    
-    def obtener_cashback(self):
-        return self._componente.obtener_cashback() + 3  # +3% cashback
-    
-    def obtener_descripcion(self):
-        return f"{self._componente.obtener_descripcion()} + VIP Mejorado Temporal"
+    def _plegar(self, interior):
+        return VectorBeneficios(
+            max(interior.descuento, 15),  # Mínimo 15%
+            True,
+            interior.cashback + 3,        # +3% cashback
+            f"{interior.descripcion} + VIP Mejorado Temporal"
+        )
 
 
 class GestorBeneficios:
-    """Gestor para aplicar beneficios dinámicos a clientes"""
+    """
+    Gestor para aplicar beneficios dinámicos a clientes.
+    Todo beneficio vence: si no se indica fin se usa duracion_por_defecto.
+    Los vencimientos se ordenan en un min-heap (IndiceVigencia) y se retiran
+    al consultar o con el barrido en segundo plano (iniciar_barrido).
+    """
     
-    def __init__(self):
-        self.beneficios_activos = {}  # {usuario_id: [lista_beneficios]}
+    DURACION_POR_DEFECTO = 30 * 24 * 3600  # 30 días
+    MAX_BENEFICIOS_POR_USUARIO = 16
+    PROMOCIONES_ESPECIALES = ('vip_premium_temporal', 'black_friday', 'cliente_nuevo_plus')
     
-    def aplicar_beneficio_temporal(self, usuario_original, tipo_beneficio, **kwargs):
+    def __init__(self, duracion_por_defecto=DURACION_POR_DEFECTO,
+                 max_beneficios_por_usuario=MAX_BENEFICIOS_POR_USUARIO, reloj=time.time):
+        self.beneficios_activos = {}  # {usuario_id: [lista_beneficios]}
+        self.duracion_por_defecto = duracion_por_defecto
+        self.max_beneficios_por_usuario = max_beneficios_por_usuario
+        self.reloj = reloj  # fuente de tiempo (reemplazable en simulaciones)
+        # Ventanas de vigencia: {(usuario_id, nombre): nombre}
+        self.vigencias = IndiceVigencia()
+        # Beneficios registrados (activos o pendientes): {usuario_id: {nombre: fin}}
+        self._registrados = {}
+        self._proximo_cambio = self.vigencias.proximo_cambio()
+        # Promociones por segmento: {(tipo_cliente, nombre_promocion): nombre_promocion}
+        self.segmentos = IndiceVigencia()
+        self._promociones_por_tipo = {}  # {tipo_cliente: (promociones vigentes,)}
+        self._exclusiones_segmento = {}  # {usuario_id: {promociones excluidas}}
+        self._proximo_cambio_segmentos = self.segmentos.proximo_cambio()
+        self._candado = threading.RLock()
+        self._barredor = None
+        self._detener_barrido = threading.Event()
+    
+    def _registrar_beneficio(self, user_id, nombre, inicio=None, fin=None):
+        """
+        Registra un beneficio con su vencimiento.
+        Volver a aplicar el mismo beneficio renueva su ventana (sin duplicados)
+        y al superar el máximo por usuario se descarta el que vence antes.
+        """
+        ahora = self.reloj()
+        if fin is None:
+            fin = a_segundos(inicio, ahora) + self.duracion_por_defecto
+        clave = (user_id, nombre)
+        
+        with self._candado:
+            # Los bordes cruzados hasta ahora se aplican antes de registrar, si no se perderían
+            self._aplicar_transiciones(*self.vigencias.avanzar(ahora))
+            registrados = self._registrados.setdefault(user_id, {})
+            if nombre not in registrados and len(registrados) >= self.max_beneficios_por_usuario:
+                self._quitar_beneficio(user_id, min(registrados, key=registrados.get))
+                registrados = self._registrados.setdefault(user_id, {})
+            
+            activo = self.vigencias.agregar(clave, nombre, inicio, fin)
+            ventana = self.vigencias.ventana(clave)
+            if ventana is None:
+                # La ventana ya había terminado
+                self._quitar_beneficio(user_id, nombre)
+            else:
+                registrados[nombre] = ventana[1]
+                beneficios = self.beneficios_activos.setdefault(user_id, [])
+                if activo and nombre not in beneficios:
+                    beneficios.append(nombre)
+                elif not activo and nombre in beneficios:
+                    beneficios.remove(nombre)
+                if not beneficios:
+                    del self.beneficios_activos[user_id]
+            self._proximo_cambio = self.vigencias.proximo_cambio()
+    
+    def _quitar_beneficio(self, user_id, nombre):
+        """Elimina un beneficio del índice y del estado del usuario"""
+        self.vigencias.quitar((user_id, nombre))
+        beneficios = self.beneficios_activos.get(user_id)
+        if beneficios is not None and nombre in beneficios:
+            beneficios.remove(nombre)
+            if not beneficios:
+                del self.beneficios_activos[user_id]
+        registrados = self._registrados.get(user_id)
+        if registrados is not None:
+            registrados.pop(nombre, None)
+            if not registrados:
+                del self._registrados[user_id]
+    
+    def barrer_vencidos(self, t=None):
+        """
+        Activa los beneficios cuya ventana comenzó y retira los vencidos.
+        Solo recorre los beneficios que cruzaron un borde, no todos.
+        
+        Returns:
+            int: cantidad de beneficios retirados
+        """
+        t = self.reloj() if t is None else t
+        if t < self._proximo_cambio:
+            return 0
+        
+        with self._candado:
+            retiradas = self._aplicar_transiciones(*self.vigencias.avanzar(t))
+            self._proximo_cambio = self.vigencias.proximo_cambio()
+        return retiradas
+    
+    def _aplicar_transiciones(self, activadas, retiradas):
+        """Activa y retira lo que devolvió vigencias.avanzar (con el candado tomado)"""
+        for user_id, nombre in activadas:
+            beneficios = self.beneficios_activos.setdefault(user_id, [])
+            if nombre not in beneficios:
+                beneficios.append(nombre)
+        for user_id, nombre in retiradas:
+            self._quitar_beneficio(user_id, nombre)
+        return len(retiradas)
+    
+    def iniciar_barrido(self, intervalo=1.0):
+        """Inicia un hilo que retira beneficios vencidos cada `intervalo` segundos"""
+        if self._barredor is not None and self._barredor.is_alive():
+            return
+        self._detener_barrido.clear()
+        self._barredor = threading.Thread(
+            target=self._bucle_barrido, args=(intervalo,), name="barrido-beneficios", daemon=True
+        )
+        self._barredor.start()
+    
+    def _bucle_barrido(self, intervalo):
+        while not self._detener_barrido.wait(intervalo):
+            self.barrer_vencidos()
+    
+    def detener_barrido(self):
+        """Detiene el hilo de barrido en segundo plano"""
+        self._detener_barrido.set()
+        if self._barredor is not None:
+            self._barredor.join()
+            self._barredor = None
+    
+    def aplicar_beneficio_temporal(self, usuario_original, tipo_beneficio, inicio=None, fin=None,
+                                   silencioso=False, **kwargs):
         """
         Aplica beneficios temporales a un cliente sin modificar la clase usuario.
         
         Args:
             usuario_original: Instancia de la clase usuario existente
             tipo_beneficio: 'descuento_extra', 'envio_gratis', 'cashback', 'vip_mejorado'
+            inicio: Comienzo de la vigencia (segundos epoch o datetime, None = ya)
+            fin: Término de la vigencia (None = inicio + duracion_por_defecto)
+            silencioso: True para no registrar la confirmación en la bitácora
             **kwargs: Parámetros adicionales (ej: descuento_extra=5)
         """
         # Crear wrapper del usuario existente
@@ -176,21 +365,30 @@ class GestorBeneficios:
             cliente = BeneficioVIPMejorado(cliente)
         
         # Registrar beneficio activo
-        user_id = usuario_original.getidUsuario()
-        if user_id not in self.beneficios_activos:
-            self.beneficios_activos[user_id] = []
-        self.beneficios_activos[user_id].append(tipo_beneficio)
+        self._registrar_beneficio(usuario_original.getidUsuario(), tipo_beneficio, inicio, fin)
         
-        print(f"✅ Beneficio '{tipo_beneficio}' aplicado a {usuario_original.getnombre()}")
+        if not silencioso:
+            _log.info("✅ Beneficio '%s' aplicado a %s", tipo_beneficio, usuario_original.getnombre())
         return cliente
     
-    def aplicar_promocion_especial(self, usuario_original, nombre_promocion):
+    def aplicar_promocion_especial(self, usuario_original, nombre_promocion, inicio=None, fin=None,
+                                   silencioso=False):
         """
         Aplica promociones predefinidas combinando múltiples beneficios.
         Ejemplo del caso de uso: VIP mejorado con 15% + envío gratis + cashback
+        inicio/fin limitan la vigencia de la promoción (fin por defecto: duracion_por_defecto).
         """
-        cliente = ClienteBase(usuario_original)
+        cliente = self.construir_promocion(ClienteBase(usuario_original), nombre_promocion)
+        self._registrar_beneficio(usuario_original.getidUsuario(), f"promocion_{nombre_promocion}", inicio, fin)
         
+        if not silencioso and _log.isEnabledFor(logging.INFO):
+            _log.info("🎉 Promoción '%s' aplicada a %s. Beneficios: %s",
+                      nombre_promocion, usuario_original.getnombre(), cliente.obtener_descripcion())
+        
+        return cliente
+    
+    def construir_promocion(self, cliente, nombre_promocion):
+        """Envuelve un cliente con los decoradores de una promoción predefinida"""
         if nombre_promocion == 'vip_premium_temporal':
             # Ejemplo del caso de uso: VIP: 15% + envío gratis + cashback
             cliente = BeneficioDescuentoExtra(cliente, 5)  # Asegurar mínimo 15%
@@ -206,24 +404,120 @@ class GestorBeneficios:
             cliente = BeneficioDescuentoExtra(cliente, 3)
             cliente = BeneficioEnvioGratis(cliente)
         
-        user_id = usuario_original.getidUsuario()
-        if user_id not in self.beneficios_activos:
-            self.beneficios_activos[user_id] = []
-        self.beneficios_activos[user_id].append(f"promocion_{nombre_promocion}")
+        return cliente
+    
+    def aplicar_promocion_segmento(self, tipo_cliente, nombre_promocion, inicio=None, fin=None,
+                                   silencioso=False):
+        """
+        Otorga una promoción a todo un segmento ("todos los clientes vip
+        reciben black_friday de t0 a t1"). La regla se guarda una sola vez,
+        O(1) sin importar el tamaño del segmento, y se evalúa al calcular precios.
         
-        print(f"🎉 Promoción '{nombre_promocion}' aplicada a {usuario_original.getnombre()}")
-        print(f"📋 Beneficios: {cliente.obtener_descripcion()}")
+        Args:
+            tipo_cliente: 'nuevo', 'frecuente' o 'vip'
+            nombre_promocion: Una de PROMOCIONES_ESPECIALES
+            inicio: Comienzo de la vigencia (None = ya)
+            fin: Término de la vigencia (None = inicio + duracion_por_defecto)
+            silencioso: True para no registrar la confirmación en la bitácora
         
-        return cliente
+        Returns:
+            bool: True si la regla quedó registrada
+        """
+        if nombre_promocion not in self.PROMOCIONES_ESPECIALES:
+            if not silencioso:
+                _log.warning("❌ Promoción desconocida: %s", nombre_promocion)
+            return False
+        
+        ahora = self.reloj()
+        if fin is None:
+            fin = a_segundos(inicio, ahora) + self.duracion_por_defecto
+        tipo_cliente = tipo_cliente.lower()
+        
+        with self._candado:
+            self.segmentos.agregar((tipo_cliente, nombre_promocion), nombre_promocion, inicio, fin)
+            self._proximo_cambio_segmentos = -INFINITO  # recalcular en la próxima consulta
+        
+        if not silencioso:
+            _log.info("🎉 Promoción '%s' aplicada al segmento %s", nombre_promocion, tipo_cliente)
+        return True
+    
+    def quitar_promocion_segmento(self, tipo_cliente, nombre_promocion):
+        """Elimina la regla de un segmento"""
+        with self._candado:
+            quitada = self.segmentos.quitar((tipo_cliente.lower(), nombre_promocion))
+            self._proximo_cambio_segmentos = -INFINITO
+        return quitada
+    
+    def excluir_de_segmento(self, usuario_id, nombre_promocion, excluir=True):
+        """
+        Excepción por usuario: excluir=True deja al usuario fuera de la
+        promoción de su segmento, excluir=False revierte la exclusión.
+        """
+        with self._candado:
+            if excluir:
+                self._exclusiones_segmento.setdefault(usuario_id, set()).add(nombre_promocion)
+            else:
+                excluidas = self._exclusiones_segmento.get(usuario_id)
+                if excluidas is not None:
+                    excluidas.discard(nombre_promocion)
+                    if not excluidas:
+                        del self._exclusiones_segmento[usuario_id]
+    
+    def _promociones_segmento_vigentes(self, t=None):
+        """Promociones vigentes por tipo; solo se recalcula al cruzar un borde"""
+        t = self.reloj() if t is None else t
+        if t < self._proximo_cambio_segmentos:
+            return self._promociones_por_tipo
+        
+        with self._candado:
+            por_tipo = {}
+            for tipo_cliente, nombre_promocion in self.segmentos.activos(t):
+                por_tipo.setdefault(tipo_cliente, []).append(nombre_promocion)
+            self._promociones_por_tipo = {
+                tipo_cliente: tuple(sorted(nombres)) for tipo_cliente, nombres in por_tipo.items()
+            }
+            self._proximo_cambio_segmentos = self.segmentos.proximo_cambio()
+        return self._promociones_por_tipo
+    
+    def promociones_para(self, usuario_id, tipo_cliente, t=None):
+        """
+        Promociones que aplican a un usuario en el instante t: las de su
+        segmento (menos las excluidas) y las propias vigentes. Una promoción
+        que el usuario también tiene individualmente se cuenta una sola vez
+        (la propia y su ventana tienen prioridad).
+        
+        Returns:
+            tuple: nombres de promoción, en orden estable
+        """
+        self.barrer_vencidos(t)
+        propias = tuple(sorted(
+            nombre[len("promocion_"):] for nombre in self.beneficios_activos.get(usuario_id, ())
+            if nombre.startswith("promocion_")
+        ))
+        if tipo_cliente is None:
+            return propias
+        promociones = self._promociones_segmento_vigentes(t).get(tipo_cliente.lower(), ())
+        if not promociones:
+            return propias
+        excluidas = self._exclusiones_segmento.get(usuario_id, ())
+        return tuple(
+            nombre for nombre in promociones
+            if nombre not in excluidas and nombre not in propias
+        ) + propias
     
     def remover_beneficios(self, usuario_id):
         """Remueve todos los beneficios temporales de un cliente"""
-        if usuario_id in self.beneficios_activos:
-            del self.beneficios_activos[usuario_id]
-            print(f"🗑️ Beneficios removidos para usuario {usuario_id}")
+        with self._candado:
+            for nombre in self._registrados.pop(usuario_id, {}):
+                self.vigencias.quitar((usuario_id, nombre))
+            self._proximo_cambio = self.vigencias.proximo_cambio()
+            removidos = self.beneficios_activos.pop(usuario_id, None)
+        if removidos is not None:
+            _log.info("🗑️ Beneficios removidos para usuario %s", usuario_id)
     
     def listar_beneficios_activos(self, usuario_id):
         """Lista los beneficios activos de un cliente"""
+        self.barrer_vencidos()
         return self.beneficios_activos.get(usuario_id, [])
     
     def mostrar_estado_beneficios(self):
@@ -231,6 +525,7 @@ class GestorBeneficios:
         print("\n" + "="*50)
         print("🎁 ESTADO DE BENEFICIOS DINÁMICOS")
         print("="*50)
+        self.barrer_vencidos()
         
         if not self.beneficios_activos:
             print("📋 No hay beneficios activos")
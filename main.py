@@ -4,6 +4,8 @@ MAIN - Sistema UVShop
 Punto de entrada principal que utiliza la Vista REST simplificada con arquitectura MVC
 """
 
+import os
+
 from vista.vista_rest_simple import crear_vista_rest_simple
 
 if __name__ == "__main__":
@@ -32,11 +34,17 @@ if __name__ == "__main__":
     print("="*80)
     
     try:
-        # Crear e inicializar la vista REST simplificada
-        vista_rest = crear_vista_rest_simple()
-        
-        # Ejecutar el servidor
-        vista_rest.ejecutar(host='0.0.0.0', port=5000, debug=False)
+        workers = int(os.environ.get("UVSHOP_WORKERS", "0"))
+        if workers > 0:
+            # Modo producción: varios workers y un proceso dueño del estado
+            from vista.servidor_produccion import ejecutar_produccion
+            ejecutar_produccion(host='0.0.0.0', port=5000, workers=workers)
+        else:
+            # Crear e inicializar la vista REST simplificada
+            vista_rest = crear_vista_rest_simple()
+            
+            # Ejecutar el servidor
+            vista_rest.ejecutar(host='0.0.0.0', port=5000, debug=False)
     except Exception as e:
         print(f"❌ Error al inicializar el sistema: {e}")
         print("💡 Verifica que todos los módulos estén correctamente instalados")
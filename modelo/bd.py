@@ -1,4 +1,10 @@
 from modelo.usuario import *
+from bisect import bisect_left, bisect_right, insort
+import logging
+import threading
+import time
+
+_log = logging.getLogger(__name__)
 class bd():
     _instancia = None
     def __new__(cls):
@@ -10,6 +16,15 @@ class bd():
         self.listaPedidos = {}
         self.listaUsuarios = {}
         self.idContadorUsuarios = 1
+        #indices para paginar pedidos: la posicion de registro es el cursor
+        #(los pedidos nuevos siempre quedan al final, asi el cursor es estable)
+        self.ordenPedidos = []          #id de pedido por posicion de registro
+        self.fechasPedidos = []         #instante de registro por posicion (no decreciente)
+        self.posicionPedidos = {}       #id de pedido -> posicion vigente
+        self.posicionesPorUsuario = {}  #idUsuario -> posiciones de sus pedidos (ordenadas)
+        self.posicionesPorEstado = {}   #estado -> posiciones de los pedidos en ese estado (ordenadas)
+        #los indices se escriben desde varios hilos (pedidos, lotes y cambios de estado)
+        self.candadoIndices = threading.RLock()
 
 
 
@@ -19,12 +34,110 @@ class bd():
             return 400
         # getidPedido() devuelve (id, status_code), necesitamos solo el id
         pedido_id = pedido.getidPedido()[0] if isinstance(pedido.getidPedido(), tuple) else pedido.getidPedido()
-        self.listaPedidos[pedido_id] = pedido
+        with self.candadoIndices:
+            anterior = self.listaPedidos.get(pedido_id)
+            if anterior is None:
+                self.indexarPedido(pedido_id, pedido)
+            elif anterior.estado != pedido.estado:
+                self.moverEstado(self.posicionPedidos[pedido_id], anterior.estado, pedido.estado)
+            self.listaPedidos[pedido_id] = pedido
+        return 200
+    #registra varios pedidos en una sola escritura (todos con el mismo instante)
+    def agregarPedidos(self, pedidos):
+        with self.candadoIndices:
+            for pedido in pedidos:
+                pedido_id = pedido.idPedido
+                if pedido_id not in self.listaPedidos:
+                    self.indexarPedido(pedido_id, pedido)
+            self.listaPedidos.update((pedido.idPedido, pedido) for pedido in pedidos)
         return 200
+    def indexarPedido(self, pedido_id, pedido):
+        with self.candadoIndices:
+            posicion = len(self.ordenPedidos)
+            ahora = time.time()
+            if self.fechasPedidos and ahora < self.fechasPedidos[-1]:
+                ahora = self.fechasPedidos[-1]
+            self.ordenPedidos.append(pedido_id)
+            self.fechasPedidos.append(ahora)
+            self.posicionPedidos[pedido_id] = posicion
+            id_usuario = pedido.getidUsuario()[0] if isinstance(pedido.getidUsuario(), tuple) else pedido.getidUsuario()
+            self.posicionesPorUsuario.setdefault(id_usuario, []).append(posicion)
+            self.posicionesPorEstado.setdefault(pedido.estado, []).append(posicion)
+    #pedido.setestado avisa aca para mover el pedido al indice de su nuevo estado
+    def cambioEstadoPedido(self, pedido, anterior):
+        with self.candadoIndices:
+            posicion = self.posicionPedidos.get(pedido.idPedido)
+            #solo los pedidos registrados (no copias ni pedidos a medio crear)
+            if posicion is not None and self.listaPedidos.get(pedido.idPedido) is pedido:
+                self.moverEstado(posicion, anterior, pedido.estado)
+    def moverEstado(self, posicion, anterior, estado):
+        with self.candadoIndices:
+            posiciones = self.posicionesPorEstado.get(anterior, [])
+            i = bisect_left(posiciones, posicion)
+            if i < len(posiciones) and posiciones[i] == posicion:
+                del posiciones[i]
+            insort(self.posicionesPorEstado.setdefault(estado, []), posicion)
+    #recorre los pedidos en orden de registro sin copiar la tabla; las posiciones
+    #solo crecen, asi se puede seguir registrando mientras se recorre
+    #(se entregan los pedidos registrados antes de empezar)
+    def iterarPedidos(self):
+        for posicion in range(len(self.ordenPedidos)):
+            pedido_id = self.ordenPedidos[posicion]
+            #un solo acceso: un DELETE concurrente puede borrar el pedido entre dos
+            pedido = self.listaPedidos.get(pedido_id)
+            if pedido is not None and self.posicionPedidos.get(pedido_id) == posicion:
+                yield pedido
+    #igual para los usuarios, que tienen ids consecutivos
+    def iterarUsuarios(self):
+        for idUsuario in range(1, self.idContadorUsuarios):
+            encontrado = self.listaUsuarios.get(idUsuario)
+            if encontrado is not None:
+                yield encontrado
+    def fechaPedido(self, idPedido):
+        #instante (epoch) en que se registro el pedido
+        posicion = self.posicionPedidos.get(idPedido)
+        return None if posicion is None else self.fechasPedidos[posicion]
+    #una pagina de pedidos desde la posicion `cursor`, en orden de registro
+    #idUsuario, estado y el rango de fechas usan indices (con idUsuario y estado a la
+    #vez se recorren los pedidos del usuario, que son menos, y se filtra el estado)
+    #retorna (pedidos, siguiente cursor o None si no hay mas)
+    def paginarPedidos(self, cursor=0, limite=50, estado=None, idUsuario=None, desde=None, hasta=None):
+        #el candado evita que un cambio de estado mueva las posiciones mientras se recorren
+        with self.candadoIndices:
+            inicio = cursor
+            if desde is not None:
+                inicio = max(inicio, bisect_left(self.fechasPedidos, desde))
+            fin = len(self.ordenPedidos)
+            if hasta is not None:
+                fin = bisect_right(self.fechasPedidos, hasta)
+            if idUsuario is not None:
+                posiciones = self.posicionesPorUsuario.get(idUsuario, [])
+            elif estado is not None:
+                posiciones = self.posicionesPorEstado.get(estado, [])
+            else:
+                posiciones = None
+            if posiciones is not None:
+                candidatas = (posiciones[i] for i in range(bisect_left(posiciones, inicio), bisect_left(posiciones, fin)))
+            else:
+                candidatas = range(inicio, fin)
+            pagina = []
+            for posicion in candidatas:
+                pedido_id = self.ordenPedidos[posicion]
+                #pedidos borrados o vueltos a registrar quedan en otra posicion
+                if self.posicionPedidos.get(pedido_id) != posicion or pedido_id not in self.listaPedidos:
+                    continue
+                pedido = self.listaPedidos[pedido_id]
+                if estado is not None and pedido.estado != estado:
+                    continue
+                if len(pagina) == limite:
+                    return pagina, posicion
+                pagina.append(pedido)
+            return pagina, None
     def recuperarPedido(self, idPedido):
         if idPedido not in self.listaPedidos:
             return 404
-        return jsonify(self.listaPedidos[idPedido]), 200
+        #se retorna el objeto, jsonify no puede serializar la clase pedido
+        return self.listaPedidos[idPedido], 200
 
     def mostrarPedidos(self):
         retorno = {}
@@ -51,9 +164,14 @@ class bd():
         self.listaUsuarios[nuevo.getidUsuario()] = nuevo
         return self.idContadorUsuarios-1, 201
 
+    #busqueda de varios usuarios de una vez: {idUsuario: usuario} solo con los que existen
+    def buscarUsuarios(self, idsUsuario):
+        return {idUsuario: self.listaUsuarios[idUsuario] for idUsuario in idsUsuario if idUsuario in self.listaUsuarios}
+
     def buscarUsuario(self,idUsuario):
         if idUsuario in self.listaUsuarios:
-            return jsonify(self.listaUsuarios[idUsuario]), 200
+            #se retorna el objeto, jsonify no puede serializar la clase usuario
+            return self.listaUsuarios[idUsuario], 200
         else:
-            print(f"No hay usuario registrado en la base de datos con la id: {idUsuario} ")
+            _log.info("No hay usuario registrado en la base de datos con la id: %s", idUsuario)
             return 404
@@ -1,4 +1,8 @@
 from modelo.inventario import *
+import logging
+
+_log = logging.getLogger(__name__)
+
 class carrito:
     def __init__(self,inventario):
         self.productosDisponibles = inventario
@@ -8,11 +12,11 @@ class carrito:
     def agregarItem(self, item,cantidad):
         agregar = self.productosDisponibles.getitem(item,cantidad)
         if(agregar is not None):
-            print(f"\nSe agregaron {cantidad} {item} al carrito")
+            _log.info("Se agregaron %s %s al carrito", cantidad, item)
             self.lista[agregar] = self.lista.get(agregar, 0) + cantidad
             self.totalPrecio += agregar.getprecioUnitario() * cantidad
         else:
-            print("el item no se pudo agregar")
+            _log.info("%s no se pudo agregar al carrito", item)
 
     def mostrarCarrito(self):
         if (len(self.lista) == 0):
@@ -35,17 +39,17 @@ class carrito:
         agregar = self.productosDisponibles.getitem(item,cantidad)
         if(agregar is not None and agregar in self.lista.keys()):
             if(self.lista[agregar] >= cantidad):
-                print(f"\nSe descontaron {cantidad} {agregar.getnombre()}  ")
+                _log.info("Se descontaron %s %s", cantidad, agregar.getnombre())
                 self.totalPrecio -= agregar.getprecioUnitario() * cantidad
                 self.lista[agregar] -= cantidad
                 if self.lista[agregar] <= 0:
                     del self.lista[agregar]
             else:
-                print(f"\nSe desconto {self.lista[agregar]} en vez de {cantidad}")
+                _log.info("Se desconto %s en vez de %s", self.lista[agregar], cantidad)
                 self.lista[agregar] -= self.lista[agregar]
 
         else:
-            print("el item no se pudo agregar")
+            _log.info("%s no se pudo quitar del carrito", item)
     #se usa copy() para no pasarle el original/carro del sistema
     def comprarCarrito(self):
         copia = {}
@@ -1,4 +1,8 @@
 from modelo.productos import *
+import logging
+
+_log = logging.getLogger(__name__)
+
 class inventario:
     def __init__(self):
         #En esta clase y en carrito se va a manejar el inventario por "punteros"
@@ -19,6 +23,13 @@ class inventario:
             ]
         #para manejar por nombres la lista, mas comodo
         self.items = {producto.nombre: producto for producto in self.itemsPrimero}
+        #version del catalogo, cambia cuando se crea, modifica o elimina un producto
+        self.version = 0
+        #reservas rechazadas por falta de stock (se exponen en /metrics)
+        self.conflictos = 0
+
+    def marcarCambio(self):
+        self.version += 1
 
     def mostrarInventario(self): #NOTA: las cosas raras son para imprimir el texto de forma bonita
         print("\nItems disponibles en el catálogo")
@@ -35,10 +46,11 @@ class inventario:
             if 0 < self.items[entrada].stock and  self.items[entrada].stock >= cantidad:
                 return self.items[entrada]
             else:
-                print("No existe stock disponible")
+                self.conflictos += 1
+                _log.info("No existe stock disponible de %s (pedido %s)", entrada, cantidad)
                 return None
         else:
-            print(f"'{entrada}' no es un producto valido ")
+            _log.info("'%s' no es un producto valido", entrada)
             return None
     #descotnar del stock, la entrada es el objeto producto
     def descontar(self, entrada, cantidad):
@@ -47,11 +59,12 @@ class inventario:
                 self.items[entrada].stock -= cantidad
                 return True
             else:
-                print(f"Error al descontar {entrada} con la cantidad {cantidad}")
+                self.conflictos += 1
+                _log.warning("Error al descontar %s con la cantidad %s", entrada, cantidad)
                 return False
 
         else:
-            print(f"El siguiente producto no existe: {entrada} ")
+            _log.warning("El siguiente producto no existe: %s", entrada)
             return False
     def agregar(self, entrada, cantidad):
         if entrada in self.items: #por si acaso 2 veces
@@ -59,11 +72,11 @@ class inventario:
                 self.items[entrada].stock += cantidad
                 return True
             else:
-                print(f"Error al agregar {entrada} con la cantidad {cantidad}")
+                _log.warning("Error al agregar %s con la cantidad %s", entrada, cantidad)
                 return False
 
         else:
-            print(f"El siguiente producto no existe: {entrada} ")
+            _log.warning("El siguiente producto no existe: %s", entrada)
             return False
 
 
@@ -1,5 +1,10 @@
 from abc import ABC
 from flask import Flask, app, jsonify, request
+import logging
+
+from modelo.bd import bd
+
+_log = logging.getLogger(__name__)
 
 class pedido:
     def __init__(self,idUsuario,direccion ,idPedido, estado, productos,precioEnvio, factura):
@@ -41,7 +46,11 @@ class pedido:
         self.direccion = direccion
 
     def setestado(self,estado):
+        anterior = self.estado
         self.estado = estado
+        #la bd indexa los pedidos por estado para paginarlos
+        if anterior != estado and bd._instancia is not None:
+            bd._instancia.cambioEstadoPedido(self, anterior)
 
     def setproductos(self,productos):
         self.productos = productos
@@ -130,7 +139,7 @@ class calcularEnvio():
             return PRECIOS[tipo.lower()][region.lower()]
         except KeyError:
             #raise ValueError(f"Combinación no válida: tipo={tipo}, región={region}")
-            print(f"Combinación no válida: tipo={tipo}, región={region}")
+            _log.warning("Combinación no válida: tipo=%s, región=%s", tipo, region)
             return 999999999
 
     def modificarPrecio(self,tipo,region):
@@ -10,11 +10,18 @@ class proxy():
         self.listaPedidos = {}
         self.contadorPedidos = 0
         self.datos = datos
+        #aciertos y fallos del cache (se exponen en /metrics)
+        self.aciertosUsuarios = 0
+        self.fallosUsuarios = 0
+        self.aciertosPedidos = 0
+        self.fallosPedidos = 0
 
     def buscarUsuario(self, idUsuario):
         if idUsuario in self.listaUsuarios:
+            self.aciertosUsuarios += 1
             return self.listaUsuarios[idUsuario], 200
         else:
+            self.fallosUsuarios += 1
             nuevo = None
             if(len(self.listaUsuarios) > 5):
                 borrar = random.choice(list(self.listaUsuarios))
@@ -25,8 +32,10 @@ class proxy():
 
     def recuperarPedido(self, idUsuario):
         if idUsuario in self.listaPedidos:
+            self.aciertosPedidos += 1
             return self.listaPedidos[idUsuario], 200
         else:
+            self.fallosPedidos += 1
             nuevo = None
             if(len(self.listaPedidos) > 5):
                 borrar = random.choice(list(self.listaPedidos))
@@ -38,6 +47,12 @@ class proxy():
     def agregarPedido(self, pedido):
         r = self.datos.agregarPedido(pedido)
         return r
+    def agregarPedidos(self, pedidos):
+        r = self.datos.agregarPedidos(pedidos)
+        return r
+    def buscarUsuarios(self, idsUsuario):
+        r = self.datos.buscarUsuarios(idsUsuario)
+        return r
     def mostrarPedidos(self):
         r = self.datos.mostrarPedidos()
         return r
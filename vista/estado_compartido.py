@@ -0,0 +1,229 @@
+"""
+ESTADO COMPARTIDO - Proceso dueño del estado y RPC local para los workers
+=========================================================================
+Con varios procesos de servidor cada uno tendría sus propios singletons de
+bd, proxy e inventario y los datos divergirían. En modo producción un único
+proceso es dueño del estado (una VistaRESTSimple completa) y los workers le
+hablan por un socket local autenticado (AF_UNIX, o named pipe en Windows):
+
+- Lecturas (GET): el worker atiende la ruta con su propia VistaRESTSimple y
+  solo pide los datos (una página de pedidos, los productos, un bloque de
+  usuarios). Routing, JSON y HTTP corren en el worker, que es lo costoso,
+  por eso las lecturas escalan con la cantidad de workers.
+- Escrituras (POST/PUT/PATCH/DELETE): el worker reenvía la solicitud entera y
+  el dueño la ejecuta con sus rutas de siempre.
+
+Cada worker conectado tiene su hilo en el dueño y las operaciones corren en
+paralelo, igual que las solicitudes del servidor de un solo proceso (con
+threaded=True): los índices de bd y los controladores tienen sus propios
+candados. Así un lote de pagos esperando la pasarela no frena las lecturas.
+
+Protocolo: cada mensaje es un frame con largo (multiprocessing.connection)
+que contiene un pickle de (operación, argumentos); la operación es un entero
+de una sola cifra. La respuesta es (True, resultado) o (False, mensaje).
+"""
+
+import signal
+import threading
+from multiprocessing.connection import Client, Listener
+from multiprocessing import AuthenticationError
+
+from modelo.usuario import usuario
+
+OP_PING = 0
+OP_PAGINAR_PEDIDOS = 1
+OP_USUARIOS = 2
+OP_PRODUCTOS = 3
+OP_FECHA_PEDIDO = 4
+OP_HTTP = 5
+
+# Tamaño de bloque al recorrer pedidos o usuarios remotos (exportaciones)
+BLOQUE_ITERACION = 1000
+# Métodos que el worker atiende él mismo; el resto se reenvía al dueño
+METODOS_LOCALES = ('GET', 'HEAD', 'OPTIONS')
+# Encabezados que no se copian al reenviar (los recalcula quien arma la respuesta)
+ENCABEZADOS_EXCLUIDOS = ('content-length', 'transfer-encoding', 'connection', 'host')
+
+
+class ErrorEstadoRemoto(RuntimeError):
+    """El proceso dueño del estado no pudo ejecutar la operación"""
+
+
+class ServidorEstado:
+    """Atiende las operaciones de los workers sobre la vista (y el estado) del dueño"""
+
+    def __init__(self, vista, authkey, direccion=None):
+        """
+        Args:
+            vista: VistaRESTSimple con el estado real (bd, inventario, controladores)
+            authkey: Clave compartida con los workers
+            direccion: Dirección del socket (None = una temporal del sistema)
+        """
+        self.vista = vista
+        self.listener = Listener(direccion, authkey=authkey)
+        self.direccion = self.listener.address
+        self.operaciones = 0
+        # Solo protege el contador: las operaciones no se serializan
+        self._candado = threading.Lock()
+        self._operaciones = {
+            OP_PING: lambda: "pong",
+            OP_PAGINAR_PEDIDOS: self._paginar_pedidos,
+            OP_USUARIOS: self._usuarios,
+            OP_PRODUCTOS: lambda: list(self.vista.inventario_instance.itemsPrimero),
+            OP_FECHA_PEDIDO: self.vista.bd_instance.fechaPedido,
+            OP_HTTP: self._http
+        }
+
+    def _paginar_pedidos(self, *argumentos):
+        """(pedidos, siguiente, {idPedido: fecha}) para no pedir las fechas de a una"""
+        pedidos, siguiente = self.vista.bd_instance.paginarPedidos(*argumentos)
+        fechaPedido = self.vista.bd_instance.fechaPedido
+        return pedidos, siguiente, {pedido.idPedido: fechaPedido(pedido.idPedido) for pedido in pedidos}
+
+    def _usuarios(self, desde=None, limite=None):
+        """
+        Todos los usuarios {id: usuario}, o ({id: usuario} de ids
+        [desde, desde + limite), próximo id a asignar) para recorrerlos por bloques
+        """
+        datos = self.vista.bd_instance
+        if desde is None:
+            return {idUsuario: _sin_compras(cliente) for idUsuario, cliente in datos.listaUsuarios.items()}
+        hasta = min(desde + limite, datos.idContadorUsuarios)
+        bloque = {idUsuario: _sin_compras(datos.listaUsuarios[idUsuario])
+                  for idUsuario in range(desde, hasta) if idUsuario in datos.listaUsuarios}
+        return bloque, datos.idContadorUsuarios
+
+    def _http(self, metodo, ruta, query_string, encabezados, cuerpo):
+        """Ejecuta una solicitud reenviada con las rutas del dueño"""
+        respuesta = self.vista.app.test_client().open(
+            ruta, method=metodo, query_string=query_string, headers=encabezados, data=cuerpo
+        )
+        encabezados_respuesta = [(nombre, valor) for nombre, valor in respuesta.headers
+                                 if nombre.lower() not in ENCABEZADOS_EXCLUIDOS]
+        return respuesta.status_code, encabezados_respuesta, respuesta.get_data()
+
+    def _atender(self, conexion):
+        """Un hilo por worker conectado"""
+        with conexion:
+            while True:
+                try:
+                    operacion, argumentos = conexion.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    resultado = (True, self._operaciones[operacion](*argumentos))
+                    with self._candado:
+                        self.operaciones += 1
+                except Exception as e:
+                    resultado = (False, f"{type(e).__name__}: {e}")
+                conexion.send(resultado)
+
+    def servir(self):
+        """Acepta workers hasta que el proceso termine (SIGTERM cierra el socket)"""
+        signal.signal(signal.SIGTERM, _salir)
+        try:
+            while True:
+                try:
+                    conexion = self.listener.accept()
+                except AuthenticationError:
+                    continue
+                threading.Thread(target=self._atender, args=(conexion,), daemon=True).start()
+        finally:
+            self.listener.close()
+
+
+def _sin_compras(cliente):
+    """Copia del usuario sin su historial de compras (las vistas no lo usan y pesaría en el pickle)"""
+    return usuario(cliente.idUsuario, cliente.nombre, cliente.direccion, cliente.tipoCliente)
+
+
+def _salir(*_):
+    raise SystemExit(0)
+
+
+class ClienteEstado:
+    """Conexión de un worker con el dueño del estado (una por hilo)"""
+
+    def __init__(self, direccion, authkey):
+        self.direccion = direccion
+        self.authkey = authkey
+        self._local = threading.local()
+
+    def llamar(self, operacion, *argumentos):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = self._local.conexion = Client(self.direccion, authkey=self.authkey)
+        try:
+            conexion.send((operacion, argumentos))
+            ok, resultado = conexion.recv()
+        except (EOFError, OSError):
+            # El dueño se reinició o cerró la conexión: la próxima llamada reconecta
+            self._local.conexion = None
+            raise
+        if not ok:
+            raise ErrorEstadoRemoto(resultado)
+        return resultado
+
+
+class BdRemota:
+    """Lo que las rutas de lectura usan de bd, resuelto en el proceso dueño"""
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+        # Fechas de la última página pedida en cada hilo (las usa _pedido_a_json)
+        self._fechas = threading.local()
+
+    def paginarPedidos(self, cursor=0, limite=50, estado=None, idUsuario=None, desde=None, hasta=None):
+        pedidos, siguiente, fechas = self.cliente.llamar(
+            OP_PAGINAR_PEDIDOS, cursor, limite, estado, idUsuario, desde, hasta
+        )
+        self._fechas.ultimas = fechas
+        return pedidos, siguiente
+
+    def fechaPedido(self, idPedido):
+        fechas = getattr(self._fechas, 'ultimas', {})
+        if idPedido in fechas:
+            return fechas[idPedido]
+        return self.cliente.llamar(OP_FECHA_PEDIDO, idPedido)
+
+    def iterarPedidos(self):
+        cursor = 0
+        while cursor is not None:
+            pedidos, cursor = self.paginarPedidos(cursor, BLOQUE_ITERACION)
+            yield from pedidos
+
+    def iterarUsuarios(self):
+        desde, siguiente = 1, 2
+        while desde < siguiente:
+            bloque, siguiente = self.cliente.llamar(OP_USUARIOS, desde, BLOQUE_ITERACION)
+            yield from bloque.values()
+            desde += BLOQUE_ITERACION
+
+    @property
+    def listaUsuarios(self):
+        return self.cliente.llamar(OP_USUARIOS)
+
+
+class InventarioRemoto:
+    """Catálogo del dueño para las rutas de lectura de productos"""
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    @property
+    def itemsPrimero(self):
+        return self.cliente.llamar(OP_PRODUCTOS)
+
+    @property
+    def items(self):
+        return {producto.nombre: producto for producto in self.itemsPrimero}
+
+
+def reenviar_solicitud(cliente, request):
+    """(cuerpo, código, encabezados) de una solicitud Flask ejecutada por el dueño"""
+    encabezados = [(nombre, valor) for nombre, valor in request.headers
+                   if nombre.lower() not in ENCABEZADOS_EXCLUIDOS]
+    codigo, encabezados_respuesta, cuerpo = cliente.llamar(
+        OP_HTTP, request.method, request.path, request.query_string, encabezados, request.get_data()
+    )
+    return cuerpo, codigo, encabezados_respuesta
@@ -11,6 +11,7 @@ from controlador.gestor_central_pedidos import obtener_gestor_central
 from controlador.sistema_beneficios import obtener_gestor_beneficios
 from controlador.calculadora_descuentos_avanzada import crear_calculadora_descuentos_avanzada
 from controlador.factory_tipos_pedido import obtener_factory_tipos_pedido
+from controlador.bitacora import configurar_bitacora, FORMATO_CONSOLA
 
 # FUNCIONES HELPER PARA INICIALIZACIÓN DE SINGLETONS
 def inicializar_singleton_seguro(clase, *args):
@@ -26,6 +27,8 @@ def inicializar_singleton_seguro(clase, *args):
     return instancia
 
 # INICIALIZACIÓN DEL SISTEMA
+# Los mensajes de carrito, inventario y pedidos se muestran como antes (solo el texto)
+configurar_bitacora(formato=FORMATO_CONSOLA)
 datos = bd()
 inventario = inventario()
 carro = carrito(inventario)
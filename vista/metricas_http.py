@@ -0,0 +1,75 @@
+"""
+MÉTRICAS HTTP - Instrumentación de Flask y endpoint /metrics
+============================================================
+Cuenta cada solicitud por (ruta, método, código) y observa su duración por
+(ruta, método). La ruta es la plantilla de Flask (/api/pedidos/<int:pedido_id>),
+no la URL, para que la cantidad de series no crezca con los ids.
+En respuestas en streaming la duración llega hasta que se entrega la
+respuesta, no hasta el último bloque enviado.
+"""
+
+import time
+
+from flask import Response, g, request
+
+from controlador.metricas import obtener_registro_metricas
+
+TIPO_CONTENIDO_METRICAS = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def instrumentar_app(app, proxy=None, inventario=None, ruta="/metrics"):
+    """
+    Registra los hooks de medición y la ruta de exposición en una app Flask.
+
+    Args:
+        app: Aplicación Flask
+        proxy: Instancia de proxy cuyos aciertos/fallos de cache se exponen
+        inventario: Instancia de inventario cuyos conflictos de stock se exponen
+        ruta: Ruta del endpoint de métricas
+    """
+    registro = obtener_registro_metricas()
+    solicitudes = registro.contador(
+        "uvshop_http_solicitudes_total", "Solicitudes HTTP atendidas",
+        ("ruta", "metodo", "codigo")
+    )
+    duraciones = registro.histograma(
+        "uvshop_http_duracion_segundos", "Duración de las solicitudes HTTP",
+        ("ruta", "metodo")
+    )
+
+    if proxy is not None:
+        registro.derivada(
+            "uvshop_proxy_cache_total", "Consultas al cache del proxy por resultado",
+            "counter", ("cache", "resultado"),
+            lambda: {
+                ("usuarios", "acierto"): proxy.aciertosUsuarios,
+                ("usuarios", "fallo"): proxy.fallosUsuarios,
+                ("pedidos", "acierto"): proxy.aciertosPedidos,
+                ("pedidos", "fallo"): proxy.fallosPedidos
+            }
+        )
+    if inventario is not None:
+        registro.derivada(
+            "uvshop_inventario_conflictos_total", "Reservas de stock rechazadas por falta de unidades",
+            "counter", (), lambda: {(): inventario.conflictos}
+        )
+
+    @app.before_request
+    def _iniciar_medicion():
+        g.inicio_metricas = time.perf_counter()
+
+    @app.after_request
+    def _registrar_medicion(respuesta):
+        inicio = g.pop("inicio_metricas", None)
+        if inicio is not None:
+            regla = request.url_rule.rule if request.url_rule is not None else "desconocida"
+            solicitudes.con(regla, request.method, str(respuesta.status_code)).inc()
+            duraciones.con(regla, request.method).observar(time.perf_counter() - inicio)
+        return respuesta
+
+    @app.route(ruta, methods=['GET'])
+    def exponer_metricas():
+        """Métricas en formato de texto de Prometheus"""
+        return Response(registro.renderizar(), mimetype=None, content_type=TIPO_CONTENIDO_METRICAS)
+
+    return registro
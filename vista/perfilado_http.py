@@ -0,0 +1,277 @@
+"""
+PERFILADO HTTP - Muestreo con cProfile y captura bajo demanda
+=============================================================
+Dos modos, ambos apagados por defecto:
+
+- Muestreo (UVSHOP_PERFIL_CADA=N): una de cada N solicitudes de cada ruta
+  (plantilla de Flask) se perfila con cProfile y se suma al perfil de la ruta.
+  GET /debug/profile muestra las pilas más costosas de cada ruta.
+- Captura (UVSHOP_PERFIL_DEBUG=1): POST /debug/profile?seconds=30 perfila
+  todo el tráfico durante esa ventana y retorna el perfil agregado en
+  formato pstats (para pstats/snakeviz), pilas colapsadas (para
+  flamegraph.pl/speedscope) o texto.
+
+Con los dos modos apagados no se registra ningún hook: el costo es cero.
+Se perfila una solicitud a la vez (desde Python 3.12 cProfile es global al
+proceso); las que llegan mientras otra se perfila se cuentan como omitidas.
+En respuestas en streaming solo se mide hasta que se entrega la respuesta.
+"""
+
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import threading
+import time
+
+from flask import Response, g, jsonify, request
+
+SEGUNDOS_CAPTURA_DEFECTO = 30
+SEGUNDOS_CAPTURA_MAXIMO = 300
+PILAS_POR_RUTA = 10
+PROFUNDIDAD_MAXIMA = 64
+FORMATOS_PERFIL = ('pstats', 'collapsed', 'text')
+
+
+class PerfiladorSolicitudes:
+    """Perfiles de cProfile por ruta (muestreo) y por ventana de tiempo (captura)"""
+
+    def __init__(self, cada=0):
+        """
+        Args:
+            cada: Perfilar una de cada `cada` solicitudes (0 = sin muestreo)
+        """
+        self.cada = cada
+        self.omitidas = 0
+        # Turno de muestreo por ruta, para que cada ruta tenga su 1 de cada N
+        self._turnos = {}
+        # Un solo perfil activo a la vez
+        self._ocupado = threading.Lock()
+        self._candado = threading.Lock()
+        # {ruta: [muestras, pstats.Stats]}
+        self._por_ruta = {}
+        # Captura en curso: {'solicitudes', 'omitidas', 'estadisticas'}
+        self._captura = None
+
+    def iniciar(self):
+        """before_request: empieza a perfilar si la solicitud toca (muestreo o captura)"""
+        muestreada = False
+        if self.cada:
+            regla = request.url_rule.rule if request.url_rule is not None else "desconocida"
+            turno = self._turnos.get(regla) or self._turnos.setdefault(regla, itertools.count(1))
+            muestreada = next(turno) % self.cada == 0
+        if not muestreada and self._captura is None:
+            return
+        if request.path.startswith("/debug/"):
+            return
+        if not self._ocupado.acquire(blocking=False):
+            with self._candado:
+                self.omitidas += 1
+                if self._captura is not None:
+                    self._captura['omitidas'] += 1
+            return
+        g.perfil_muestreado = muestreada
+        g.perfil_solicitud = perfil = cProfile.Profile()
+        perfil.enable()
+
+    def terminar(self, _error=None):
+        """teardown_request: cierra el perfil y lo suma a su ruta y/o a la captura"""
+        perfil = g.pop("perfil_solicitud", None)
+        if perfil is None:
+            return
+        perfil.disable()
+        self._ocupado.release()
+        estadisticas = pstats.Stats(perfil)
+        ruta = request.url_rule.rule if request.url_rule is not None else "desconocida"
+        with self._candado:
+            if g.pop("perfil_muestreado", False):
+                entrada = self._por_ruta.get(ruta)
+                if entrada is None:
+                    self._por_ruta[ruta] = [1, estadisticas]
+                else:
+                    entrada[0] += 1
+                    entrada[1].add(estadisticas)
+            captura = self._captura
+            if captura is not None:
+                captura['solicitudes'] += 1
+                if captura['estadisticas'] is None:
+                    captura['estadisticas'] = pstats.Stats(perfil)
+                else:
+                    captura['estadisticas'].add(estadisticas)
+
+    def capturar(self, segundos):
+        """
+        Perfila todo el tráfico durante `segundos` (bloquea al llamador).
+
+        Returns:
+            dict: {'solicitudes', 'omitidas', 'estadisticas' (pstats.Stats o None)}
+
+        Raises:
+            RuntimeError: si ya hay una captura en curso
+        """
+        with self._candado:
+            if self._captura is not None:
+                raise RuntimeError("Ya hay una captura de perfil en curso")
+            captura = self._captura = {'solicitudes': 0, 'omitidas': 0, 'estadisticas': None}
+        try:
+            time.sleep(segundos)
+        finally:
+            with self._candado:
+                self._captura = None
+        return captura
+
+    def rutas(self):
+        """{ruta: (muestras, pstats.Stats)} de lo muestreado hasta ahora"""
+        with self._candado:
+            return {ruta: (muestras, estadisticas) for ruta, (muestras, estadisticas) in self._por_ruta.items()}
+
+    def pilas_por_ruta(self, cantidad=PILAS_POR_RUTA):
+        """Las `cantidad` pilas con más tiempo propio de cada ruta muestreada"""
+        resumen = {}
+        for ruta, (muestras, estadisticas) in self.rutas().items():
+            with self._candado:
+                pilas = colapsar(estadisticas)
+            mayores = sorted(pilas.items(), key=lambda pila: pila[1], reverse=True)[:cantidad]
+            resumen[ruta] = {
+                'muestras': muestras,
+                'pilas': [{'pila': pila, 'microsegundos': tiempo} for pila, tiempo in mayores]
+            }
+        return resumen
+
+
+def _nombre_funcion(funcion):
+    archivo, linea, nombre = funcion
+    if archivo == "~":
+        return nombre.replace(";", ",")
+    return f"{os.path.basename(archivo)}:{linea}:{nombre}".replace(";", ",")
+
+
+def colapsar(estadisticas, minimo_us=1):
+    """
+    Pilas colapsadas ("a;b;c microsegundos") a partir de un perfil de cProfile.
+
+    cProfile guarda solo aristas llamador -> llamado, así que el tiempo de cada
+    función se reparte entre sus llamadores en proporción al tiempo acumulado
+    de cada arista. Se descartan las ramas de menos de `minimo_us`.
+
+    Returns:
+        dict: {pila: microsegundos de tiempo propio}
+    """
+    datos = estadisticas.stats
+    llamados = {}
+    for funcion, (_, _, _, _, llamadores) in datos.items():
+        for llamador, arista in llamadores.items():
+            llamados.setdefault(llamador, []).append((funcion, arista[3]))
+    minimo = minimo_us / 1e6
+    pendientes = [
+        (funcion, (), entrada[3], frozenset())
+        for funcion, entrada in datos.items()
+        if not any(llamador in datos for llamador in entrada[4])
+    ]
+    pilas = {}
+    while pendientes:
+        funcion, pila, peso, visitadas = pendientes.pop()
+        _, _, propio, acumulado, _ = datos[funcion]
+        fraccion = min(1.0, peso / acumulado) if acumulado else 0.0
+        pila += (_nombre_funcion(funcion),)
+        if propio * fraccion >= minimo:
+            clave = ";".join(pila)
+            pilas[clave] = pilas.get(clave, 0.0) + propio * fraccion
+        if len(pila) >= PROFUNDIDAD_MAXIMA:
+            continue
+        visitadas = visitadas | {funcion}
+        for llamada, acumulado_arista in llamados.get(funcion, ()):
+            peso_llamada = acumulado_arista * fraccion
+            if peso_llamada >= minimo and llamada not in visitadas:
+                pendientes.append((llamada, pila, peso_llamada, visitadas))
+    return {pila: round(tiempo * 1e6) for pila, tiempo in pilas.items()}
+
+
+def respuesta_perfil(estadisticas, formato, encabezados=None):
+    """Respuesta Flask con un perfil en formato 'pstats', 'collapsed' o 'text'"""
+    if formato == 'pstats':
+        # Mismo contenido que pstats.Stats.dump_stats
+        return Response(marshal.dumps(estadisticas.stats), mimetype='application/octet-stream', headers={
+            'Content-Disposition': 'attachment; filename=perfil.pstats', **(encabezados or {})
+        })
+    if formato == 'collapsed':
+        pilas = colapsar(estadisticas)
+        cuerpo = "".join(f"{pila} {tiempo}\n" for pila, tiempo in sorted(pilas.items()))
+        return Response(cuerpo, mimetype='text/plain', headers=encabezados)
+    salida = io.StringIO()
+    estadisticas.stream = salida
+    estadisticas.sort_stats("cumulative").print_stats(60)
+    return Response(salida.getvalue(), mimetype='text/plain', headers=encabezados)
+
+
+def instrumentar_perfilado(app, cada=None, depuracion=None):
+    """
+    Registra el muestreo y/o los endpoints /debug/profile en una app Flask.
+
+    Args:
+        app: Aplicación Flask
+        cada: Perfilar una de cada `cada` solicitudes (por defecto UVSHOP_PERFIL_CADA, 0 = apagado)
+        depuracion: Registrar /debug/profile (por defecto UVSHOP_PERFIL_DEBUG=1)
+
+    Returns:
+        PerfiladorSolicitudes, o None si todo está apagado (no se registra nada)
+    """
+    if cada is None:
+        cada = int(os.environ.get("UVSHOP_PERFIL_CADA", "0"))
+    if depuracion is None:
+        depuracion = os.environ.get("UVSHOP_PERFIL_DEBUG", "0") == "1"
+    if not cada and not depuracion:
+        return None
+
+    perfilador = PerfiladorSolicitudes(cada)
+    app.before_request(perfilador.iniciar)
+    app.teardown_request(perfilador.terminar)
+    if not depuracion:
+        return perfilador
+
+    @app.route('/debug/profile', methods=['GET'])
+    def obtener_perfiles():
+        """Pilas más costosas por ruta, o el perfil de una ruta (?route=&format=)"""
+        ruta = request.args.get('route')
+        if ruta is None:
+            return jsonify({
+                'cada': perfilador.cada,
+                'omitidas': perfilador.omitidas,
+                'rutas': perfilador.pilas_por_ruta()
+            })
+        formato = request.args.get('format', 'collapsed')
+        if formato not in FORMATOS_PERFIL:
+            return jsonify({'error': f"format debe ser uno de {', '.join(FORMATOS_PERFIL)}"}), 400
+        rutas = perfilador.rutas()
+        if ruta not in rutas:
+            return jsonify({'error': f"La ruta {ruta} no tiene muestras"}), 404
+        muestras, estadisticas = rutas[ruta]
+        return respuesta_perfil(estadisticas, formato, {'X-Solicitudes-Perfiladas': str(muestras)})
+
+    @app.route('/debug/profile', methods=['POST'])
+    def capturar_perfil():
+        """Perfil agregado del tráfico de los próximos ?seconds= segundos"""
+        try:
+            segundos = float(request.args.get('seconds', SEGUNDOS_CAPTURA_DEFECTO))
+        except ValueError:
+            return jsonify({'error': 'seconds debe ser un número'}), 400
+        if not 0 < segundos <= SEGUNDOS_CAPTURA_MAXIMO:
+            return jsonify({'error': f'seconds debe estar entre 0 y {SEGUNDOS_CAPTURA_MAXIMO}'}), 400
+        formato = request.args.get('format', 'pstats')
+        if formato not in FORMATOS_PERFIL:
+            return jsonify({'error': f"format debe ser uno de {', '.join(FORMATOS_PERFIL)}"}), 400
+        try:
+            captura = perfilador.capturar(segundos)
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 409
+        encabezados = {
+            'X-Solicitudes-Perfiladas': str(captura['solicitudes']),
+            'X-Solicitudes-Omitidas': str(captura['omitidas'])
+        }
+        if captura['estadisticas'] is None:
+            return Response(status=204, headers=encabezados)
+        return respuesta_perfil(captura['estadisticas'], formato, encabezados)
+
+    return perfilador
@@ -0,0 +1,151 @@
+"""
+SERVIDOR DE PRODUCCIÓN - Varios workers en un mismo puerto
+==========================================================
+app.run() atiende todo en un solo proceso, así que las lecturas compiten por
+el mismo GIL. En modo producción:
+
+- Un proceso dueño del estado con la VistaRESTSimple completa (bd, proxy,
+  inventario, controladores), que solo responde por el socket local de
+  vista/estado_compartido.py.
+- N workers que comparten el socket de escucha (lo abre el padre antes de
+  crearlos) y el kernel reparte las conexiones. Cada worker atiende las
+  lecturas con su propia app Flask y le reenvía las escrituras al dueño.
+
+GET /metrics y /debug/profile son de cada worker (el que atienda la
+solicitud). Necesita fork (Linux/macOS).
+Ejecutar: python -m vista.servidor_produccion --workers 4
+   o:     UVSHOP_WORKERS=4 python main.py
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+
+from werkzeug.serving import make_server
+
+from controlador.bitacora import configurar_bitacora
+from vista.estado_compartido import OP_PING, ClienteEstado, ServidorEstado
+from vista.vista_rest_simple import crear_vista_rest_simple
+
+# Segundos que se espera a que el dueño del estado quede escuchando
+ESPERA_ARRANQUE = 30
+# Conexiones pendientes en el socket compartido
+BACKLOG = 1024
+
+
+def _salir(*_):
+    raise SystemExit(0)
+
+
+def _proceso_dueno(authkey, aviso):
+    """Crea el estado, avisa la dirección de su socket y atiende a los workers"""
+    configurar_bitacora()
+    servidor = ServidorEstado(crear_vista_rest_simple(), authkey)
+    aviso.send(servidor.direccion)
+    aviso.close()
+    servidor.servir()
+
+
+def _proceso_worker(escucha, direccion, authkey, host, port):
+    """Atiende HTTP en el socket compartido con una vista conectada al dueño"""
+    signal.signal(signal.SIGTERM, _salir)
+    configurar_bitacora()
+    estado = ClienteEstado(direccion, authkey)
+    estado.llamar(OP_PING)
+    vista = crear_vista_rest_simple(estado)
+    servidor = make_server(host, port, vista.app, threaded=True, fd=escucha.fileno())
+    try:
+        servidor.serve_forever()
+    finally:
+        servidor.server_close()
+
+
+class ServidorProduccion:
+    """Proceso dueño del estado + `workers` procesos HTTP en el mismo puerto"""
+
+    def __init__(self, host='0.0.0.0', port=5000, workers=None):
+        """
+        Args:
+            host: Interfaz de escucha
+            port: Puerto (0 = uno libre, queda en self.port al iniciar)
+            workers: Procesos HTTP (por defecto uno por CPU)
+        """
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.dueno = None
+        self.procesos = []
+        self.escucha = None
+
+    def iniciar(self):
+        """Arranca el dueño del estado y los workers (retorna sin bloquear)"""
+        try:
+            contexto = multiprocessing.get_context("fork")
+        except ValueError:
+            raise RuntimeError("El modo producción necesita fork (Linux/macOS); "
+                               "en Windows usar vista_rest_simple.ejecutar()") from None
+        authkey = os.urandom(32)
+
+        recepcion, aviso = contexto.Pipe(duplex=False)
+        self.dueno = contexto.Process(target=_proceso_dueno, args=(authkey, aviso), name="uvshop-estado")
+        self.dueno.start()
+        aviso.close()
+        if not recepcion.poll(ESPERA_ARRANQUE):
+            self.detener()
+            raise RuntimeError("El proceso dueño del estado no arrancó")
+        direccion = recepcion.recv()
+        recepcion.close()
+
+        self.escucha = socket.create_server((self.host, self.port), backlog=BACKLOG)
+        self.port = self.escucha.getsockname()[1]
+        for numero in range(self.workers):
+            proceso = contexto.Process(
+                target=_proceso_worker, name=f"uvshop-worker-{numero + 1}",
+                args=(self.escucha, direccion, authkey, self.host, self.port)
+            )
+            proceso.start()
+            self.procesos.append(proceso)
+        return self
+
+    def esperar(self):
+        """Bloquea hasta que terminen los workers (Ctrl+C o SIGTERM los detiene)"""
+        signal.signal(signal.SIGTERM, _salir)
+        try:
+            for proceso in self.procesos:
+                proceso.join()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self.detener()
+
+    def detener(self):
+        """Termina los workers y después el dueño del estado"""
+        for proceso in self.procesos + ([self.dueno] if self.dueno else []):
+            if proceso.is_alive():
+                proceso.terminate()
+            proceso.join()
+        self.procesos = []
+        self.dueno = None
+        if self.escucha is not None:
+            self.escucha.close()
+            self.escucha = None
+
+
+def ejecutar_produccion(host='0.0.0.0', port=5000, workers=None):
+    """Ejecuta el servidor con varios workers hasta Ctrl+C"""
+    servidor = ServidorProduccion(host, port, workers).iniciar()
+    print("🚀 Iniciando servidor REST UVShop (modo producción)...")
+    print(f"📡 API disponible en: http://localhost:{servidor.port}/api")
+    print(f"👷 Workers: {servidor.workers} (estado compartido en el proceso {servidor.dueno.pid})")
+    servidor.esperar()
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description="Servidor REST UVShop con varios workers")
+    argumentos.add_argument("--host", default="0.0.0.0")
+    argumentos.add_argument("--port", type=int, default=5000)
+    argumentos.add_argument("--workers", type=int, default=None, help="por defecto, uno por CPU")
+    opciones = argumentos.parse_args()
+    ejecutar_produccion(opciones.host, opciones.port, opciones.workers)
@@ -49,6 +49,9 @@ except ImportError as e:
 from modelo.bd import bd
 from modelo.proxy import proxy
 from modelo.inventario import inventario
+from vista.metricas_http import instrumentar_app
+from vista.perfilado_http import instrumentar_perfilado
+from controlador.bitacora import configurar_bitacora
 
 class VistaREST:
     """Vista REST que sigue el patrón MVC"""
@@ -65,6 +68,12 @@ class VistaREST:
         
         # Registrar rutas
         self.registrar_rutas()
+        
+        # Métricas de Prometheus por ruta y GET /metrics
+        instrumentar_app(self.app, self.proxy_instance, self.inventario_instance)
+        
+        # Perfilado con cProfile (apagado salvo UVSHOP_PERFIL_CADA / UVSHOP_PERFIL_DEBUG)
+        self.perfilador = instrumentar_perfilado(self.app)
     
     def inicializar_sistema(self):
         """Inicializar componentes del sistema"""
@@ -360,6 +369,7 @@ class VistaREST:
             'usuarios': '/api/usuarios',
             'productos': '/api/productos',
             'pedidos': '/api/pedidos',
+            'metricas': '/metrics',
             'casos_uso': {
                 'factory_pedidos': '/api/casos-uso/factory-pedidos',
                 'gestor_central': '/api/casos-uso/gestor-central'
@@ -376,6 +386,8 @@ class VistaREST:
     
     def ejecutar(self, host='0.0.0.0', port=5000, debug=False):
         """Ejecutar el servidor REST"""
+        # Logs de modelo/controlador/vista por la cola (nivel en UVSHOP_LOG_NIVEL)
+        configurar_bitacora()
         print("🚀 Iniciando servidor REST UVShop (Arquitectura MVC)...")
         print("📡 API disponible en: http://localhost:5000/api")
         print("🏗️ Arquitectura: Model-View-Controller")
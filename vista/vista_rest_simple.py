@@ -4,30 +4,71 @@ VISTA REST SIMPLIFICADA - Sistema UVShop MVC
 Vista REST que sigue el patrón MVC correctamente (versión simplificada)
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from datetime import datetime
+import json
+import zlib
 
 # Importar modelos base para inicialización
 from modelo.bd import bd
 from modelo.proxy import proxy
 from modelo.inventario import inventario
+from vista.metricas_http import instrumentar_app
+from vista.perfilado_http import instrumentar_perfilado
+from controlador.bitacora import configurar_bitacora
+from vista.estado_compartido import METODOS_LOCALES, BdRemota, InventarioRemoto, reenviar_solicitud
+
+# Paginación de GET /api/pedidos
+LIMITE_PEDIDOS_DEFECTO = 50
+LIMITE_PEDIDOS_MAXIMO = 500
+CAMPOS_PEDIDO = ('idPedido', 'idUsuario', 'direccion', 'estado', 'productos', 'fecha')
+
+# Máximo de pedidos por POST /api/pedidos/lote
+MAXIMO_PEDIDOS_LOTE = 10000
+
+# Los ids de pedido (~2^58) superan el entero exacto de JavaScript (2^53 - 1):
+# junto a 'idPedido' se devuelve 'idPedidoTexto' con el mismo id como string
+MAXIMO_ENTERO_JS = 2**53 - 1
+
+# Exportación NDJSON: bytes de líneas que se juntan antes de enviar (y comprimir) un bloque
+TAM_BLOQUE_EXPORTACION = 64 * 1024
 
 class VistaRESTSimple:
     """Vista REST simplificada que sigue el patrón MVC"""
     
-    def __init__(self):
+    def __init__(self, estado=None):
+        """
+        Args:
+            estado: ClienteEstado del proceso dueño del estado (modo producción con
+                varios workers). None = este proceso es dueño de bd, proxy e inventario.
+        """
         self.app = Flask(__name__)
         CORS(self.app)
+        self.estado = estado
         
-        # Inicializar SOLO los modelos base
-        self.inicializar_sistema()
-        
-        # Inicializar controladores de forma segura
-        self.inicializar_controladores()
+        if estado is None:
+            # Inicializar SOLO los modelos base
+            self.inicializar_sistema()
+            
+            # Inicializar controladores de forma segura
+            self.inicializar_controladores()
+        else:
+            self.inicializar_remoto()
         
         # Registrar rutas
         self.registrar_rutas()
+        
+        # Métricas de Prometheus por ruta y GET /metrics
+        instrumentar_app(self.app, self.proxy_instance,
+                         self.inventario_instance if estado is None else None)
+        
+        # Perfilado con cProfile (apagado salvo UVSHOP_PERFIL_CADA / UVSHOP_PERFIL_DEBUG)
+        self.perfilador = instrumentar_perfilado(self.app)
+        
+        if estado is not None:
+            # Las escrituras se ejecutan en el dueño del estado (después de las métricas)
+            self.app.before_request(self._reenviar_escritura)
     
     def inicializar_sistema(self):
         """Inicializar componentes del sistema"""
@@ -40,6 +81,26 @@ class VistaRESTSimple:
             print(f"⚠️ Error al inicializar sistema: {e}")
             raise
     
+    def inicializar_remoto(self):
+        """Worker: lecturas a través del dueño del estado, sin controladores locales"""
+        self.bd_instance = BdRemota(self.estado)
+        self.inventario_instance = InventarioRemoto(self.estado)
+        self.proxy_instance = None
+        self.gestor_usuarios = None
+        self.gestor_central = None
+        self.gestor_dueno = None
+        self.factory_pedidos = None
+    
+    def _reenviar_escritura(self):
+        """before_request de los workers: todo lo que no es lectura lo atiende el dueño"""
+        # /debug/profile perfila al worker que la recibe
+        if request.method in METODOS_LOCALES or request.path.startswith('/debug/'):
+            return None
+        try:
+            return reenviar_solicitud(self.estado, request)
+        except Exception as e:
+            return self._error_response(f'Estado compartido no disponible: {str(e)}', 503)
+    
     def inicializar_controladores(self):
         """Inicializar controladores de forma segura"""
         try:
@@ -51,6 +112,16 @@ class VistaRESTSimple:
             print(f"⚠️ Error al inicializar controlador principal: {e}")
             self.gestor_usuarios = None
         
+        # Gestor central (operaciones en lote)
+        try:
+            from controlador.gestor_central_pedidos import obtener_gestor_central
+            self.gestor_central = obtener_gestor_central()
+            if self.gestor_usuarios:
+                self.gestor_central.registrar_gestor_usuarios(self.gestor_usuarios)
+        except Exception as e:
+            print(f"⚠️ Error al inicializar gestor central: {e}")
+            self.gestor_central = None
+        
         # Controladores opcionales
         self.gestor_dueno = None
         self.factory_pedidos = None
@@ -80,8 +151,10 @@ class VistaRESTSimple:
         def obtener_usuarios():
             try:
                 usuarios = []
-                if self.bd_instance and hasattr(self.bd_instance, 'listaUsuarios'):
-                    for user_id, usuario in self.bd_instance.listaUsuarios.items():
+                # Una sola lectura de listaUsuarios (en un worker es una llamada al dueño)
+                lista_usuarios = getattr(self.bd_instance, 'listaUsuarios', None)
+                if lista_usuarios:
+                    for user_id, usuario in lista_usuarios.items():
                         usuarios.append({
                             'id': user_id,
                             'nombre': getattr(usuario, 'nombre', 'Sin nombre'),
@@ -139,8 +212,9 @@ class VistaRESTSimple:
             try:
                 productos_list = []
                 
-                if self.inventario_instance and hasattr(self.inventario_instance, 'itemsPrimero'):
-                    for producto in self.inventario_instance.itemsPrimero:
+                items_primero = getattr(self.inventario_instance, 'itemsPrimero', None)
+                if items_primero:
+                    for producto in items_primero:
                         productos_list.append({
                             'codigo': producto.getcodigo(),
                             'nombre': producto.getnombre(),
@@ -186,6 +260,7 @@ class VistaRESTSimple:
                         self.inventario_instance.itemsPrimero.append(nuevo_producto)
                     if hasattr(self.inventario_instance, 'items'):
                         self.inventario_instance.items[nuevo_producto.getnombre()] = nuevo_producto
+                    self.inventario_instance.marcarCambio()
                 
                 return jsonify({
                     'mensaje': 'Producto creado exitosamente via modelo MVC',
@@ -204,35 +279,38 @@ class VistaRESTSimple:
         # =================== PEDIDOS ===================
         @self.app.route('/api/pedidos', methods=['GET'])
         def obtener_pedidos():
+            """
+            Listar pedidos paginados por cursor (orden de registro en bd).
+            Parámetros: cursor, limite, estado, idUsuario, desde/hasta (ISO o epoch)
+            y fields (ej. fields=idPedido,estado).
+            """
             try:
-                pedidos_list = []
-                
-                # A través del proxy (controlador de acceso a datos)
-                if self.proxy_instance and hasattr(self.proxy_instance, 'listaPedidos'):
-                    for pedido_id, pedido in self.proxy_instance.listaPedidos.items():
-                        pedidos_list.append({
-                            'idPedido': pedido.getidPedido(),
-                            'idUsuario': pedido.getidUsuario(),
-                            'direccion': pedido.getdireccion(),
-                            'estado': pedido.getestado(),
-                            'productos': pedido.getproductos()
-                        })
-                
-                # Si no hay en proxy, usar bd (modelo)
-                if not pedidos_list and self.bd_instance and hasattr(self.bd_instance, 'listaPedidos'):
-                    for pedido_id, pedido in self.bd_instance.listaPedidos.items():
-                        pedidos_list.append({
-                            'idPedido': pedido.getidPedido(),
-                            'idUsuario': pedido.getidUsuario(),
-                            'direccion': pedido.getdireccion(),
-                            'estado': pedido.getestado(),
-                            'productos': pedido.getproductos()
-                        })
+                try:
+                    cursor = int(request.args.get('cursor', 0))
+                    limite = min(int(request.args.get('limite', LIMITE_PEDIDOS_DEFECTO)), LIMITE_PEDIDOS_MAXIMO)
+                    id_usuario = request.args.get('idUsuario')
+                    id_usuario = int(id_usuario) if id_usuario is not None else None
+                    desde = self._parsear_fecha(request.args.get('desde'))
+                    hasta = self._parsear_fecha(request.args.get('hasta'))
+                except ValueError as e:
+                    return self._error_response(f'Parámetro inválido: {str(e)}', 400)
+                if cursor < 0 or limite < 1:
+                    return self._error_response('cursor y limite deben ser positivos', 400)
+                
+                campos, invalidos = self._campos_solicitados()
+                if invalidos:
+                    return self._error_response(f'Campos no válidos: {", ".join(invalidos)}', 400)
+                
+                # El modelo (bd) es la fuente completa; el proxy solo cachea algunos pedidos
+                pagina, siguiente = self.bd_instance.paginarPedidos(
+                    cursor, limite, request.args.get('estado'), id_usuario, desde, hasta
+                )
                 
                 return jsonify({
-                    'pedidos': pedidos_list,
-                    'total': len(pedidos_list),
-                    'controlador_usado': 'proxy->bd (MVC)',
+                    'pedidos': [self._pedido_a_json(pedido, campos) for pedido in pagina],
+                    'total': len(pagina),
+                    'siguiente': siguiente,
+                    'controlador_usado': 'bd.paginarPedidos (MVC)',
                     'timestamp': datetime.now().isoformat()
                 })
             except Exception as e:
@@ -255,9 +333,12 @@ class VistaRESTSimple:
                     )
                     
                     if resultado and resultado != 400:
+                        # Los getters del pedido retornan (valor, 200)
+                        id_pedido = resultado['idPedido']
+                        id_pedido = id_pedido[0] if isinstance(id_pedido, tuple) else id_pedido
                         return jsonify({
                             'mensaje': 'Pedido creado exitosamente via controlador MVC',
-                            'pedido': resultado,
+                            'pedido': {**resultado, 'idPedidoTexto': str(id_pedido)},
                             'controlador_usado': 'gestionPedidosUsuarios (MVC)',
                             'timestamp': datetime.now().isoformat()
                         }), 201
@@ -266,9 +347,9 @@ class VistaRESTSimple:
                 else:
                     # Método alternativo usando modelo directamente
                     from modelo.pedido import pedido
-                    import random
+                    from controlador.ids_pedido import obtener_generador_ids
                     
-                    nuevo_id_pedido = random.randint(1000, 9999)
+                    nuevo_id_pedido = obtener_generador_ids().siguiente()
                     
                     nuevo_pedido = pedido(
                         data.get('idUsuario'),
@@ -286,6 +367,7 @@ class VistaRESTSimple:
                         'mensaje': 'Pedido creado exitosamente via modelo directo',
                         'pedido': {
                             'idPedido': nuevo_pedido.getidPedido(),
+                            'idPedidoTexto': str(nuevo_pedido.getidPedido()),
                             'idUsuario': nuevo_pedido.getidUsuario(),
                             'direccion': nuevo_pedido.getdireccion(),
                             'estado': nuevo_pedido.getestado(),
@@ -298,6 +380,113 @@ class VistaRESTSimple:
             except Exception as e:
                 return self._error_response(f'Error al crear pedido: {str(e)}')
         
+        @self.app.route('/api/pedidos/lote', methods=['POST'])
+        def crear_pedidos_lote():
+            """Crear muchos pedidos en una solicitud, con estado por item"""
+            try:
+                data = request.get_json()
+                items = data.get('pedidos') if isinstance(data, dict) else data
+                if not isinstance(items, list) or not items:
+                    return self._error_response('Se requiere una lista de pedidos', 400)
+                if len(items) > MAXIMO_PEDIDOS_LOTE:
+                    return self._error_response(f'Máximo {MAXIMO_PEDIDOS_LOTE} pedidos por lote', 413)
+                if not self.gestor_usuarios:
+                    return self._error_response('Controlador de pedidos no disponible', 503)
+                
+                resultados = self.gestor_usuarios.crearPedidosLote(items, self.inventario_instance.items)
+                respuesta = []
+                for indice, (codigo, valor) in enumerate(resultados):
+                    if codigo == 201:
+                        respuesta.append({'indice': indice, 'status': codigo,
+                                          'pedido': self._pedido_a_json(valor, ('idPedido', 'idUsuario', 'estado'))})
+                    else:
+                        respuesta.append({'indice': indice, 'status': codigo, 'error': valor})
+                creados = sum(1 for codigo, _ in resultados if codigo == 201)
+                
+                return jsonify({
+                    'resultados': respuesta,
+                    'creados': creados,
+                    'rechazados': len(resultados) - creados,
+                    'controlador_usado': 'gestionPedidosUsuarios.crearPedidosLote (MVC)',
+                    'timestamp': datetime.now().isoformat()
+                }), 201 if creados == len(resultados) else 207
+            except Exception as e:
+                return self._error_response(f'Error al crear pedidos en lote: {str(e)}')
+        
+        @self.app.route('/api/pedidos/comandos', methods=['POST'])
+        def ejecutar_comandos_pedidos():
+            """
+            Ejecutar una lista de operaciones de pedidos en un solo lote.
+            "idPedido": "$N" se refiere al pedido creado por el comando N de la
+            misma lista: esos comandos se ejecutan en una segunda pasada.
+            """
+            try:
+                data = request.get_json()
+                if not data or not isinstance(data.get('comandos'), list):
+                    return self._error_response('Se requiere una lista de comandos', 400)
+                if not self.gestor_central:
+                    return self._error_response('Gestor central no disponible', 503)
+                
+                crudos = data['comandos']
+                comandos = [self._comando_desde_json(comando) for comando in crudos]
+                referencias = {posicion: self._referencia_comando(comando)
+                               for posicion, comando in enumerate(crudos)}
+                referencias = {posicion: ref for posicion, ref in referencias.items() if ref is not None}
+                
+                resultados = [None] * len(comandos)
+                directos = [posicion for posicion in range(len(comandos)) if posicion not in referencias]
+                for posicion, resultado in zip(directos, self.gestor_central.ejecutar_lote(
+                        [comandos[posicion] for posicion in directos])):
+                    resultados[posicion] = resultado
+                if referencias:
+                    for posicion, ref in referencias.items():
+                        creado = self._pedido_creado(crudos, resultados, ref)
+                        if creado is None:
+                            comandos[posicion] = None  # referencia inválida: 400
+                        else:
+                            comandos[posicion]['id_pedido'] = creado
+                    diferidos = list(referencias)
+                    for posicion, resultado in zip(diferidos, self.gestor_central.ejecutar_lote(
+                            [comandos[posicion] for posicion in diferidos])):
+                        resultados[posicion] = resultado
+                
+                return jsonify({
+                    'resultados': [
+                        self._resultado_a_json(resultado, crudos[posicion].get('tipo') == 'crear'
+                                               if isinstance(crudos[posicion], dict) else False)
+                        for posicion, resultado in enumerate(resultados)
+                    ],
+                    'total': len(resultados),
+                    'controlador_usado': 'gestor_central_pedidos.ejecutar_lote (MVC)',
+                    'timestamp': datetime.now().isoformat()
+                })
+            except Exception as e:
+                return self._error_response(f'Error al ejecutar comandos: {str(e)}')
+        
+        # =================== EXPORTACIÓN ===================
+        @self.app.route('/api/export/pedidos.ndjson', methods=['GET'])
+        def exportar_pedidos():
+            """Todos los pedidos, uno por línea, sin armar la lista en memoria (?fields=, ?gzip=1)"""
+            campos, invalidos = self._campos_solicitados()
+            if invalidos:
+                return self._error_response(f'Campos no válidos: {", ".join(invalidos)}', 400)
+            registros = (self._pedido_a_json(pedido, campos) for pedido in self.bd_instance.iterarPedidos())
+            return self._respuesta_ndjson(registros, 'pedidos.ndjson')
+        
+        @self.app.route('/api/export/usuarios.ndjson', methods=['GET'])
+        def exportar_usuarios():
+            """Todos los usuarios, uno por línea (?gzip=1)"""
+            registros = (
+                {
+                    'id': usuario.idUsuario,
+                    'nombre': usuario.nombre,
+                    'direccion': usuario.direccion,
+                    'tipo': usuario.tipoCliente
+                }
+                for usuario in self.bd_instance.iterarUsuarios()
+            )
+            return self._respuesta_ndjson(registros, 'usuarios.ndjson')
+        
         # =================== MÉTODOS DISPONIBLES ===================
         @self.app.route('/api/metodos', methods=['GET'])
         def obtener_metodos_disponibles():
@@ -311,12 +500,17 @@ class VistaRESTSimple:
                         '/api/metodos - Lista de métodos disponibles',
                         '/api/usuarios - Lista de usuarios',
                         '/api/productos - Lista de productos',
-                        '/api/pedidos - Lista de pedidos'
+                        '/api/pedidos - Lista de pedidos paginada (?cursor=&limite=&estado=&idUsuario=&desde=&hasta=&fields=)',
+                        '/api/export/pedidos.ndjson - Exportar todos los pedidos (NDJSON, ?gzip=1)',
+                        '/api/export/usuarios.ndjson - Exportar todos los usuarios (NDJSON, ?gzip=1)',
+                        '/metrics - Métricas en formato Prometheus'
                     ],
                     'POST': [
                         '/api/usuarios - Crear nuevo usuario',
                         '/api/productos - Crear nuevo producto',
-                        '/api/pedidos - Crear nuevo pedido'
+                        '/api/pedidos - Crear nuevo pedido',
+                        '/api/pedidos/lote - Crear muchos pedidos (estado por item)',
+                        '/api/pedidos/comandos - Ejecutar operaciones de pedidos en lote'
                     ],
                     'PUT': [
                         '/api/productos/<codigo> - Actualizar producto completo',
@@ -340,6 +534,18 @@ class VistaRESTSimple:
                             'tipo': 'cliente'
                         }
                     },
+                    'POST_comandos': {
+                        'url': '/api/pedidos/comandos',
+                        'method': 'POST',
+                        'body': {
+                            'comandos': [
+                                {'tipo': 'crear', 'idUsuario': 1, 'direccion': 'Calle 123',
+                                 'productos': {'celulares': 1}, 'envio': ['nacional', 'centro'],
+                                 'tipoEnvio': 'estandar'},
+                                {'tipo': 'cancelar', 'idPedido': '$0'}
+                            ]
+                        }
+                    },
                     'PUT_producto': {
                         'url': '/api/productos/<codigo>',
                         'method': 'PUT',
@@ -381,6 +587,7 @@ class VistaRESTSimple:
                     producto_encontrado.precioUnitario = data['precio']
                 if 'stock' in data:
                     producto_encontrado.stock = data['stock']
+                self.inventario_instance.marcarCambio()
                 
                 return jsonify({
                     'mensaje': 'Producto actualizado exitosamente via MVC',
@@ -474,6 +681,7 @@ class VistaRESTSimple:
                 
                 if not producto_eliminado:
                     return self._error_response('Producto no encontrado', 404)
+                self.inventario_instance.marcarCambio()
                 
                 return jsonify({
                     'mensaje': 'Producto eliminado exitosamente via modelo MVC',
@@ -600,16 +808,152 @@ class VistaRESTSimple:
                 'DELETE': '/api/productos/<codigo> - Eliminar producto'
             },
             'pedidos': {
-                'GET': '/api/pedidos - Listar pedidos',
+                'GET': '/api/pedidos - Listar pedidos (cursor, limite, estado, idUsuario, desde, hasta, fields)',
                 'POST': '/api/pedidos - Crear pedido',
+                'POST_LOTE': '/api/pedidos/lote - Crear pedidos en lote',
+                'POST_COMANDOS': '/api/pedidos/comandos - Operaciones en lote',
                 'PUT': '/api/pedidos/<id> - Actualizar pedido',
                 'DELETE': '/api/pedidos/<id> - Eliminar pedido',
                 'PATCH': '/api/pedidos/<id>/estado - Cambiar estado'
             },
-            'total_endpoints': 13,
+            'exportacion': {
+                'GET': '/api/export/pedidos.ndjson, /api/export/usuarios.ndjson - NDJSON en streaming'
+            },
+            'metricas': '/metrics - Métricas en formato Prometheus',
+            'total_endpoints': 18,
             'metodos_http': ['GET', 'POST', 'PUT', 'DELETE', 'PATCH']
         }
     
+    def _campos_solicitados(self):
+        """(campos de ?fields= o todos, campos no válidos)"""
+        if not request.args.get('fields'):
+            return CAMPOS_PEDIDO, []
+        campos = tuple(campo.strip() for campo in request.args['fields'].split(',') if campo.strip())
+        return campos, [campo for campo in campos if campo not in CAMPOS_PEDIDO]
+    
+    def _respuesta_ndjson(self, registros, nombre_archivo):
+        """
+        Respuesta en streaming (transferencia chunked): cada bloque se arma,
+        se comprime si corresponde y se envía, por lo que la memoria no
+        depende de la cantidad de registros.
+        Se comprime con gzip si el cliente pide ?gzip=1, o si lo acepta y no
+        pide ?gzip=0.
+        """
+        gzip = request.args.get('gzip')
+        comprimir = gzip == '1' or (gzip != '0' and request.accept_encodings['gzip'] > 0)
+        
+        def generar():
+            compresor = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None  # 31 = formato gzip
+            codificar = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str).encode
+            bloque = []
+            tamano = 0
+            for registro in registros:
+                linea = codificar(registro) + "\n"
+                bloque.append(linea)
+                tamano += len(linea)
+                if tamano >= TAM_BLOQUE_EXPORTACION:
+                    datos = "".join(bloque).encode("utf-8")
+                    bloque = []
+                    tamano = 0
+                    if compresor is not None:
+                        datos = compresor.compress(datos)
+                    if datos:
+                        yield datos
+            datos = "".join(bloque).encode("utf-8")
+            if compresor is not None:
+                datos = compresor.compress(datos) + compresor.flush()
+            if datos:
+                yield datos
+        
+        respuesta = Response(generar(), mimetype='application/x-ndjson')
+        respuesta.headers['Content-Disposition'] = f'attachment; filename={nombre_archivo}'
+        if comprimir:
+            respuesta.headers['Content-Encoding'] = 'gzip'
+            respuesta.headers['Vary'] = 'Accept-Encoding'
+        return respuesta
+    
+    def _parsear_fecha(self, valor):
+        """Fecha ISO 8601 o epoch en segundos -> epoch (None si no viene)"""
+        if valor is None:
+            return None
+        try:
+            return float(valor)
+        except ValueError:
+            return datetime.fromisoformat(valor).timestamp()
+    
+    def _pedido_a_json(self, pedido, campos=CAMPOS_PEDIDO):
+        """Solo los campos pedidos; los productos se devuelven por nombre"""
+        datos = {}
+        for campo in campos:
+            if campo == 'productos':
+                productos = pedido.productos
+                if isinstance(productos, dict):
+                    datos[campo] = {getattr(producto, 'nombre', str(producto)): cantidad
+                                    for producto, cantidad in productos.items()}
+                else:
+                    datos[campo] = [getattr(producto, 'nombre', producto) for producto in productos or []]
+            elif campo == 'fecha':
+                fecha = self.bd_instance.fechaPedido(pedido.idPedido)
+                datos[campo] = datetime.fromtimestamp(fecha).isoformat() if fecha is not None else None
+            else:
+                datos[campo] = getattr(pedido, campo)
+        if 'idPedido' in datos:
+            datos['idPedidoTexto'] = str(datos['idPedido'])
+        return datos
+    
+    def _comando_desde_json(self, comando):
+        """Traduce un comando JSON (camelCase) al formato de GestorCentralPedidos.ejecutar_lote"""
+        if not isinstance(comando, dict):
+            return None
+        from modelo.pedido import calcularEnvio
+        traducido = {'tipo': comando.get('tipo'), 'es_dueno': bool(comando.get('esDueno'))}
+        for campo_json, campo in (('idUsuario', 'id_usuario'), ('idPedido', 'id_pedido'),
+                                  ('direccion', 'direccion'), ('tipoEnvio', 'tipo_envio'),
+                                  ('operacion', 'operacion'), ('cambio', 'cambio'),
+                                  ('tipoPago', 'tipo_pago'), ('claveIdempotencia', 'clave_idempotencia')):
+            if campo_json in comando:
+                traducido[campo] = comando[campo_json]
+        # El id también puede venir como string (idPedidoTexto, para clientes JavaScript)
+        if isinstance(traducido.get('id_pedido'), str) and traducido['id_pedido'].isdigit():
+            traducido['id_pedido'] = int(traducido['id_pedido'])
+        productos = comando.get('productos')
+        if isinstance(productos, dict) and all(nombre in self.inventario_instance.items for nombre in productos):
+            traducido['carro'] = {self.inventario_instance.items[nombre]: cantidad for nombre, cantidad in productos.items()}
+        envio = comando.get('envio')
+        if isinstance(envio, list) and len(envio) == 2:
+            traducido['precio_envio'] = calcularEnvio(*envio)
+        return traducido
+    
+    def _referencia_comando(self, comando):
+        """N si el comando usa "idPedido": "$N" (el pedido creado por el comando N)"""
+        if not isinstance(comando, dict):
+            return None
+        id_pedido = comando.get('idPedido')
+        if isinstance(id_pedido, str) and id_pedido.startswith('$') and id_pedido[1:].isdigit():
+            return int(id_pedido[1:])
+        return None
+    
+    def _pedido_creado(self, crudos, resultados, ref):
+        """Id del pedido creado por el comando `ref` (None si no era un 'crear' exitoso)"""
+        if not 0 <= ref < len(crudos) or not isinstance(crudos[ref], dict) or crudos[ref].get('tipo') != 'crear':
+            return None
+        creado = resultados[ref]
+        # nuevoPedido retorna el id o un código de error (400/404)
+        if not isinstance(creado, int) or creado in (0, 400, 404, 500):
+            return None
+        return creado
+    
+    def _resultado_a_json(self, resultado, es_creacion=False):
+        """Los pedidos consultados se devuelven como dict; el resto tal cual"""
+        if es_creacion and isinstance(resultado, int) and resultado > MAXIMO_ENTERO_JS:
+            # Id de un pedido creado: también como string para clientes JavaScript
+            return {'idPedido': resultado, 'idPedidoTexto': str(resultado)}
+        if hasattr(resultado, 'getidPedido'):
+            return self._pedido_a_json(resultado, ('idPedido', 'idUsuario', 'direccion', 'estado'))
+        if isinstance(resultado, tuple):
+            return list(resultado)
+        return resultado
+    
     def _error_response(self, mensaje, codigo=500):
         """Generar respuesta de error estándar"""
         return jsonify({
@@ -620,6 +964,8 @@ class VistaRESTSimple:
     
     def ejecutar(self, host='0.0.0.0', port=5000, debug=False):
         """Ejecutar el servidor REST"""
+        # Logs de modelo/controlador/vista por la cola (nivel en UVSHOP_LOG_NIVEL)
+        configurar_bitacora()
         print("🚀 Iniciando servidor REST UVShop (Arquitectura MVC Simplificada)...")
         print("📡 API disponible en: http://localhost:5000/api")
         print("🏗️ Arquitectura: Model-View-Controller (estable)")
@@ -627,9 +973,9 @@ class VistaRESTSimple:
 
 
 # Función para crear la vista REST
-def crear_vista_rest_simple():
+def crear_vista_rest_simple(estado=None):
     """Factory function para crear la vista REST simplificada"""
-    return VistaRESTSimple()
+    return VistaRESTSimple(estado)
 
 
 if __name__ == '__main__':